@@ -1,12 +1,11 @@
+from convergence_policy import convergence_policy
 from data_moduels.agent_state import AgentState
 
 def automatic_decision_function(state: AgentState) -> str:
-    # Check iteration limit
-    if state["iteration_count"] >= state["max_iterations"]:
+    # Keine Fehler, Iterationslimit oder keine Fortschritte mehr (Wiederholung, Zyklus, Plateau)
+    stop_reason = convergence_policy.stop_reason(state)
+    if stop_reason is not None:
         return "finalize"
 
     # If there are errors, retry
-    if state["validation_errors"]:
-        return "transform"
-
-    return "finalize"
\ No newline at end of file
+    return "transform"
@@ -1,14 +1,21 @@
+from langchain_core.runnables import RunnableConfig
+
 from data_moduels.agent_state import AgentState
+from data_moduels.matching_mode import MatchingMode
 from recipe_validator import LLMRecipeValidator
-from shared_session_collector import session_collector
+from shared_session_collector import get_session_collector
+from validation_section_node import pre_validate_sections, reuse_unchanged_sections
+
+def automatic_validator_node(state: AgentState, config: RunnableConfig = None) -> dict:
+    """Fan-out: startet das Timing und berechnet die Qualitätsmetriken.
+    Die LLM-Prüfungen laufen danach parallel in den validate_<section>-Branches."""
+    session_collector = get_session_collector(config)
 
-def automatic_validator_node(state: AgentState) -> AgentState:
     # Start node timing
     session_collector.start_node("validate", state["validation_mode"])
-    error_messages = ''
 
     if not state.get("current_json_output"):
-        return state
+        return {}
 
     validators = {
         "recipe": LLMRecipeValidator(),
@@ -19,33 +26,31 @@ def automatic_validator_node(state: AgentState) -> AgentState:
     # Calculate quality metrics (jetzt ein Dict mit allen Metriken)
     quality_metrics = validator.calculate_quality_score(
         state["current_json_output"],
-        recipe_name=state.get("recipe_name", "unknown")
+        recipe_name=state.get("recipe_name", "unknown"),
+        matching_mode=state.get("matching_mode") or MatchingMode.GREEDY
     )
 
     print(f"Validator -> Iteration: {state['iteration_count']}")
-    errors = validator.validate(state["current_json_output"], state["raw_text"])
-
-    total_validation_cost = getattr(validator, 'last_validation_cost', 0)
-    validation_input_tokens = getattr(validator, 'last_input_tokens', 0)
-    validation_output_tokens = getattr(validator, 'last_output_tokens', 0)
-
-    for error in errors:
-        error_messages += "error_type: " + error.type + "; field_path: " + error.field_path + "; error_message: " + error.message + ""
-
-    # Log to session collector mit allen Metriken
-    session_collector.end_validation_node(
-        quality_metrics=quality_metrics,  # Jetzt das komplette Dict
-        cost=total_validation_cost,
-        input_tokens=validation_input_tokens,
-        output_tokens=validation_output_tokens,
-        errors=error_messages
+
+    # Unveränderte Abschnitte nicht erneut per LLM prüfen
+    reused_sections = reuse_unchanged_sections(state)
+    if reused_sections:
+        print(f"Reusing validation results (unchanged): {', '.join(reused_sections)}")
+
+    # Lokaler Vorab-Check: unauffällige Abschnitte brauchen keinen LLM-Aufruf
+    checked_sections = tuple(reused_sections) + tuple(
+        section for section, section_result in (state.get("section_results") or {}).items()
+        if section_result.get("iteration") == state["iteration_count"]
     )
+    prevalidated_sections, pre_validation_errors = pre_validate_sections(state, skip=checked_sections)
+    if prevalidated_sections:
+        print(f"Pre-validation found nothing (skipping LLM): {', '.join(prevalidated_sections)}")
 
     result = {
-        **state,
-        "validation_errors": errors,
+        "section_results": {**reused_sections, **prevalidated_sections},
+        "pre_validation_errors": pre_validation_errors,
         "quality_score": quality_metrics.get('overall_f1', 0.0),  # Für Kompatibilität
         "quality_metrics": quality_metrics  # Neue vollständige Metriken
     }
 
-    return result
\ No newline at end of file
+    return result
@@ -0,0 +1,154 @@
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+import uuid
+from typing import Optional, Tuple
+
+
+class BatchManifest:
+    """
+    Fortschritt eines Batches für das Fortsetzen nach Absturz / Abbruch.
+
+    Liegt in derselben SQLite-Datei wie die Checkpoints des Graphen. Schlüssel ist der
+    SHA-256 des Rezept-Texts zusammen mit dem Lauf-Schlüssel (Modi, Run-Optionen und Zielschema),
+    damit ein geändertes Rezept oder ein anderes Experiment nicht als erledigt gilt. Ein Rezept ist
+    "running", bis alle Modi durchgelaufen sind; seine session_id bestimmt die thread_ids,
+    unter denen der Checkpointer den letzten Stand jedes Modus hält. Die Metriken jedes Modus
+    (SessionCollector.mode_snapshot) liegen in batch_modes, damit ein fortgesetzter Modus sie
+    weiterführt und ein bereits exportierter Modus nicht doppelt gezählt wird.
+    """
+
+    def __init__(self, db_path: str, run_key: str):
+        self.db_path = db_path
+        self.run_key = run_key
+
+        self._conn = None
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def recipe_hash(recipe_text: str) -> str:
+        return hashlib.sha256(recipe_text.encode('utf-8')).hexdigest()
+
+    @staticmethod
+    def make_run_key(test_cases: list, run_options: Optional[dict] = None, target_schema: Optional[dict] = None) -> str:
+        # Das Zielschema gehört dazu: fortgesetzte Checkpoints referenzieren es nur über seinen Hash
+        # (input_store), ein geändertes Schema wäre beim Fortsetzen nicht mehr auffindbar
+        payload = json.dumps([[mode.value for _, mode in test_cases], run_options or {}, target_schema or {}],
+                             sort_keys=True, default=lambda value: getattr(value, 'value', str(value)))
+        return hashlib.sha256(payload.encode('utf-8')).hexdigest()[:16]
+
+    def _connection(self) -> sqlite3.Connection:
+        if self._conn is None:
+            self._conn = sqlite3.connect(self.db_path, check_same_thread=False)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute('''
+                CREATE TABLE IF NOT EXISTS batch_manifest (
+                    recipe_hash TEXT,
+                    run_key TEXT,
+                    recipe_name TEXT,
+                    session_id TEXT,
+                    status TEXT,
+                    attempts INTEGER,
+                    started_at REAL,
+                    finished_at REAL,
+                    PRIMARY KEY (recipe_hash, run_key)
+                )
+            ''')
+            self._conn.execute('''
+                CREATE TABLE IF NOT EXISTS batch_modes (
+                    recipe_hash TEXT,
+                    run_key TEXT,
+                    validation_mode TEXT,
+                    status TEXT,
+                    metrics TEXT,
+                    PRIMARY KEY (recipe_hash, run_key, validation_mode)
+                )
+            ''')
+            self._conn.commit()
+        return self._conn
+
+    def begin(self, recipe_hash: str, recipe_name: str) -> Optional[Tuple[str, bool]]:
+        """
+        Startet oder setzt ein Rezept fort. Gibt (session_id, resumed) zurück, oder None,
+        wenn das Rezept in diesem Lauf-Schlüssel bereits abgeschlossen ist.
+        """
+        with self._lock:
+            conn = self._connection()
+            row = conn.execute(
+                "SELECT session_id, status FROM batch_manifest WHERE recipe_hash = ? AND run_key = ?",
+                (recipe_hash, self.run_key)
+            ).fetchone()
+
+            if row is not None and row[1] == 'done':
+                return None
+
+            if row is not None:
+                conn.execute(
+                    "UPDATE batch_manifest SET attempts = attempts + 1 WHERE recipe_hash = ? AND run_key = ?",
+                    (recipe_hash, self.run_key)
+                )
+                conn.commit()
+                return row[0], True
+
+            session_id = str(uuid.uuid4())
+            conn.execute(
+                "INSERT INTO batch_manifest VALUES (?, ?, ?, ?, 'running', 1, ?, NULL)",
+                (recipe_hash, self.run_key, recipe_name, session_id, time.time())
+            )
+            conn.commit()
+            return session_id, False
+
+    def finish(self, recipe_hash: str):
+        with self._lock:
+            conn = self._connection()
+            conn.execute(
+                "UPDATE batch_manifest SET status = 'done', finished_at = ? WHERE recipe_hash = ? AND run_key = ?",
+                (time.time(), recipe_hash, self.run_key)
+            )
+            conn.commit()
+
+    def save_mode(self, recipe_hash: str, validation_mode: str, metrics: dict):
+        """Speichert den aktuellen Metrik-Stand eines laufenden Modus"""
+        with self._lock:
+            conn = self._connection()
+            conn.execute(
+                "INSERT OR REPLACE INTO batch_modes VALUES (?, ?, ?, 'running', ?)",
+                (recipe_hash, self.run_key, validation_mode, json.dumps(metrics, ensure_ascii=False))
+            )
+            conn.commit()
+
+    def load_mode(self, recipe_hash: str, validation_mode: str) -> Optional[Tuple[str, dict]]:
+        """Gibt (status, metrics) des Modus zurück, oder None, wenn er noch nicht gestartet wurde"""
+        with self._lock:
+            row = self._connection().execute(
+                "SELECT status, metrics FROM batch_modes WHERE recipe_hash = ? AND run_key = ? AND validation_mode = ?",
+                (recipe_hash, self.run_key, validation_mode)
+            ).fetchone()
+        if row is None:
+            return None
+        return row[0], json.loads(row[1])
+
+    def mode_exported(self, recipe_hash: str, validation_mode: str):
+        with self._lock:
+            conn = self._connection()
+            conn.execute(
+                "UPDATE batch_modes SET status = 'exported' WHERE recipe_hash = ? AND run_key = ? AND validation_mode = ?",
+                (recipe_hash, self.run_key, validation_mode)
+            )
+            conn.commit()
+
+    def counts(self) -> dict:
+        """Anzahl der Rezepte pro Status für diesen Lauf-Schlüssel"""
+        with self._lock:
+            rows = self._connection().execute(
+                "SELECT status, COUNT(*) FROM batch_manifest WHERE run_key = ? GROUP BY status", (self.run_key,)
+            ).fetchall()
+        return dict(rows)
+
+    def close(self):
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
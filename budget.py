@@ -0,0 +1,81 @@
+import threading
+from typing import Any, Optional
+
+from utils.calculate_cost import calculate_openai_cost
+from utils.token_estimation import token_estimator
+
+
+class BudgetExceededError(Exception):
+    """Ein geplanter LLM-Aufruf würde ein Session-, Rezept- oder Batch-Budget überschreiten"""
+
+    def __init__(self, scope: str, metric: str, limit: float, projected: float):
+        super().__init__(f"{scope} budget exceeded: {metric} {projected:.6g} > {limit:.6g}")
+        self.scope = scope
+        self.metric = metric
+        self.limit = limit
+        self.projected = projected
+
+
+class BudgetLimits:
+    """
+    Obergrenzen für Kosten (USD) und Tokens (Input + Output); None = unbegrenzt.
+    session: ein Graph-Lauf (ein Validierungsmodus), recipe: alle Modi eines Rezepts, batch: der ganze Lauf.
+    """
+
+    def __init__(self):
+        self.session_cost: Optional[float] = None
+        self.session_tokens: Optional[int] = None
+        self.recipe_cost: Optional[float] = None
+        self.recipe_tokens: Optional[int] = None
+        self.batch_cost: Optional[float] = None
+        self.batch_tokens: Optional[int] = None
+
+    def configure(self, **limits):
+        for name, value in limits.items():
+            if not hasattr(self, name):
+                raise ValueError(f"Unbekanntes Budget: {name}")
+            setattr(self, name, value)
+
+
+class BatchLedger:
+    """Verbrauch aller Sessions des laufenden Batches (thread-safe)"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.cost = 0.0
+        self.tokens = 0
+
+    def add(self, cost: float, tokens: int):
+        with self._lock:
+            self.cost += cost
+            self.tokens += tokens
+
+    def totals(self) -> tuple:
+        with self._lock:
+            return self.tokens, self.cost
+
+    def reset(self):
+        with self._lock:
+            self.cost = 0.0
+            self.tokens = 0
+
+
+def enforce_budget(session_collector, model: str, prompt: str, schema: Any):
+    """
+    Schätzt Tokens und Kosten des Aufrufs und lässt den SessionCollector gegen die Budgets prüfen.
+    Wirft BudgetExceededError, bevor der Aufruf gemacht wird.
+    """
+    if session_collector is None:
+        return
+
+    kind = schema.get("name") if isinstance(schema, dict) else None
+    input_tokens = token_estimator.count_tokens(prompt, model)
+    output_tokens = token_estimator.expected_output_tokens(kind)
+    cost = calculate_openai_cost({'input_tokens': input_tokens, 'output_tokens': output_tokens}, model)
+
+    session_collector.check_budget(input_tokens + output_tokens, cost)
+
+
+# Global instance
+budget_limits = BudgetLimits()
+batch_ledger = BatchLedger()
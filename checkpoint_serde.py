@@ -0,0 +1,61 @@
+import ormsgpack
+from langgraph.checkpoint.serde.jsonplus import JsonPlusSerializer
+
+from data_moduels.error_severity import ErrorSeverity
+from data_moduels.matching_mode import MatchingMode
+from data_moduels.repair_mode import RepairMode
+from data_moduels.stop_reason import StopReason
+from data_moduels.validation_error import ValidationError
+from data_moduels.validation_mode import ValidationMode
+from data_moduels.validator_strategy import ValidatorStrategy
+
+# Kennung in der type-Spalte des Checkpointers. Alles mit anderer Kennung (z.B. "msgpack" aus
+# älteren Läufen) dekodiert JsonPlusSerializer unverändert.
+SERDE_TYPE = "valiloop-msgpack"
+
+# Eigene msgpack-Ext-Codes: ValidationError nur als Werte-Tupel statt (Modul, Klasse, Dict mit
+# Feldnamen); alle übrigen Nicht-Standardtypen (Enums, datetime, ...) als eingebettetes Ergebnis von
+# JsonPlusSerializer.dumps_typed. Nur öffentliche API von langgraph und ormsgpack.
+EXT_VALIDATION_ERROR = 64
+EXT_JSONPLUS = 65
+
+# Wie JsonPlusSerializer: diese Typen nicht nativ (als Wert/String) kodieren, sondern über default
+_OPTION = (ormsgpack.OPT_NON_STR_KEYS | ormsgpack.OPT_PASSTHROUGH_DATACLASS | ormsgpack.OPT_PASSTHROUGH_DATETIME
+           | ormsgpack.OPT_PASSTHROUGH_ENUM | ormsgpack.OPT_PASSTHROUGH_UUID | ormsgpack.OPT_REPLACE_SURROGATES)
+
+
+class CheckpointSerializer(JsonPlusSerializer):
+    """
+    JsonPlusSerializer mit kompakter Kodierung der ValidationErrors (validation_errors,
+    section_results, pre_validation_errors). Checkpoints im alten Format bleiben lesbar.
+    """
+
+    def dumps_typed(self, obj):
+        if obj is None or isinstance(obj, (bytes, bytearray)):
+            return super().dumps_typed(obj)
+        return SERDE_TYPE, ormsgpack.packb(obj, default=self._pack_default, option=_OPTION)
+
+    def loads_typed(self, data):
+        type_, data_ = data
+        if type_ != SERDE_TYPE:
+            return super().loads_typed(data)
+        return ormsgpack.unpackb(data_, ext_hook=self._unpack_ext, option=ormsgpack.OPT_NON_STR_KEYS)
+
+    def _pack_default(self, obj):
+        if isinstance(obj, ValidationError):
+            return ormsgpack.Ext(EXT_VALIDATION_ERROR, ormsgpack.packb(obj.to_row()))
+        return ormsgpack.Ext(EXT_JSONPLUS, ormsgpack.packb(list(super().dumps_typed(obj))))
+
+    def _unpack_ext(self, code: int, data: bytes):
+        if code == EXT_VALIDATION_ERROR:
+            return ValidationError.from_row(tuple(ormsgpack.unpackb(data)))
+        if code == EXT_JSONPLUS:
+            type_, data_ = ormsgpack.unpackb(data)
+            return super().loads_typed((type_, data_))
+        raise ValueError(f"Unknown checkpoint ext code {code}")
+
+
+# Global instance; die Typen des AgentState explizit erlauben (ValidationError für Checkpoints im alten Format)
+checkpoint_serializer = CheckpointSerializer(allowed_msgpack_modules=(
+    ValidationError, ErrorSeverity, MatchingMode, RepairMode, StopReason, ValidationMode, ValidatorStrategy
+))
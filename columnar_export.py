@@ -0,0 +1,186 @@
+import os
+import threading
+import uuid
+from typing import Dict, Iterable, List, Optional, Tuple
+
+try:
+    import pyarrow as pa
+    import pyarrow.dataset as ds
+    import pyarrow.ipc as ipc
+    import pyarrow.parquet as pq
+except ImportError:  # optional: ohne pyarrow gibt es nur den SQLite/JSONL-Export
+    pa = None
+
+from metrics_schema import ITERATION_COLUMNS, NODE_EXECUTION_COLUMNS, SESSION_COLUMNS
+
+# Spaltenorientierter Export der Experiment-Metriken (gleiche Tabellen wie metrics_schema).
+# Jede Tabelle ist ein Dataset unter base_dir, Hive-partitioniert nach validation_mode:
+#   <base_dir>/iterations/validation_mode=AUTOMATIC/part-<run>.parquet
+# Ein Lauf schreibt pro Partition genau eine Datei, jeder write() hängt eine Row-Group
+# (Parquet) bzw. einen Record-Batch (Arrow IPC) an. Weitere Läufe legen neue Dateien an.
+
+FORMATS = ("parquet", "arrow")
+PARTITION_COLUMN = 'validation_mode'
+
+DATASETS = {
+    'sessions': SESSION_COLUMNS,
+    'iterations': ITERATION_COLUMNS,
+    'node_executions': NODE_EXECUTION_COLUMNS,
+}
+
+STRING_COLUMNS = {
+    'session_id', 'validation_mode', 'recipe_name', 'timestamp', 'errors', 'validator_strategy',
+    'matching_mode', 'stop_reason', 'budget_exceeded', 'transform_model', 'node',
+}
+FLOAT_COLUMNS = {
+    'total_cost', 'total_time', 'validation_time', 'setup_time', 'setup_time_saved',
+    'early_validation_overlap', 'final_f1', 'started_at', 'duration', 'cost',
+    'overall_f1', 'overall_precision', 'overall_recall',
+    'ingredients_f1', 'ingredients_precision', 'ingredients_recall',
+    'steps_f1', 'steps_precision', 'steps_recall',
+    'metadata_f1', 'metadata_precision', 'metadata_recall',
+}
+
+
+def _require_pyarrow():
+    if pa is None:
+        raise RuntimeError("Columnar export requires pyarrow (pip install pyarrow)")
+
+
+def _arrow_type(column: str):
+    if column in STRING_COLUMNS:
+        return pa.string()
+    if column in FLOAT_COLUMNS:
+        return pa.float64()
+    return pa.int64()
+
+
+def arrow_schema(dataset: str, with_partition: bool = False):
+    """Arrow-Schema eines Datasets; die Partitionsspalte steckt im Pfad, nicht in der Datei"""
+    _require_pyarrow()
+    return pa.schema([
+        (column, _arrow_type(column)) for column in DATASETS[dataset]
+        if with_partition or column != PARTITION_COLUMN
+    ])
+
+
+class ColumnarWriter:
+    """
+    Streaming-Writer für die Datasets sessions, iterations und node_executions.
+
+    Nimmt dieselben Exporte wie der SQLite-Export (SessionCollector.export_records) und hält
+    pro Dataset und Partition eine offene Datei, an die jeder write() anhängt. Erst close()
+    schreibt den Footer, vorher sind die Dateien nicht lesbar.
+    """
+
+    def __init__(self, base_dir: str = "experiment_results_columnar", format: str = "parquet",
+                 compression: str = "zstd"):
+        _require_pyarrow()
+        if format not in FORMATS:
+            raise ValueError(f"Unknown columnar format: {format}")
+        self.base_dir = base_dir
+        self.format = format
+        # Nur für Parquet; Arrow IPC bleibt unkomprimiert, damit Leser die Puffer direkt
+        # aus der gemappten Datei nutzen können
+        self.compression = compression
+        self.run_id = uuid.uuid4().hex[:12]
+        self._writers: Dict[Tuple[str, str], object] = {}
+        self._lock = threading.Lock()
+
+    def write(self, records: Iterable[Dict]):
+        """Hängt die Exporte mehrerer Sessions an (ein Batch pro Dataset und Partition)"""
+        records = list(records)
+        with self._lock:
+            for dataset in DATASETS:
+                rows = [row for record in records for row in record[dataset]]
+                for partition, partition_rows in _partition(dataset, rows).items():
+                    self._writer(dataset, partition).write_table(_to_table(dataset, partition_rows))
+
+    def close(self):
+        with self._lock:
+            writers, self._writers = self._writers, {}
+        for writer in writers.values():
+            writer.close()
+
+    def _writer(self, dataset: str, partition: str):
+        key = (dataset, partition)
+        if key not in self._writers:
+            directory = os.path.join(self.base_dir, dataset, f"{PARTITION_COLUMN}={partition}")
+            os.makedirs(directory, exist_ok=True)
+            path = os.path.join(directory, f"part-{self.run_id}.{self.format}")
+            schema = arrow_schema(dataset)
+            if self.format == "parquet":
+                self._writers[key] = pq.ParquetWriter(path, schema, compression=self.compression)
+            else:
+                self._writers[key] = ipc.new_file(path, schema)
+        return self._writers[key]
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def _partition(dataset: str, rows: List[tuple]) -> Dict[str, List[tuple]]:
+    index = DATASETS[dataset].index(PARTITION_COLUMN)
+    partitions: Dict[str, List[tuple]] = {}
+    for row in rows:
+        partitions.setdefault(row[index], []).append(row)
+    return partitions
+
+
+def _to_table(dataset: str, rows: List[tuple]):
+    # Spaltenweise aufbauen: aus den Zeilen-Tupeln direkt die Arrow-Arrays, ohne Zwischen-Dicts
+    schema = arrow_schema(dataset)
+    columns = DATASETS[dataset]
+    arrays = [
+        pa.array([row[index] for row in rows], type=schema.field(column).type)
+        for index, column in enumerate(columns) if column != PARTITION_COLUMN
+    ]
+    return pa.Table.from_arrays(arrays, schema=schema)
+
+
+def open_dataset(dataset: str, base_dir: str = "experiment_results_columnar", format: str = "parquet"):
+    """
+    Öffnet ein Dataset lazy (pyarrow.dataset) inklusive der Partitionsspalte. Filter und
+    Spaltenauswahl werden beim Scannen auf Partitionen und Row-Groups angewendet.
+    """
+    _require_pyarrow()
+    partitioning = ds.partitioning(pa.schema([(PARTITION_COLUMN, pa.string())]), flavor="hive")
+    return ds.dataset(os.path.join(base_dir, dataset), format="parquet" if format == "parquet" else "ipc",
+                      partitioning=partitioning, schema=arrow_schema(dataset, with_partition=True))
+
+
+def read_table(dataset: str, base_dir: str = "experiment_results_columnar", format: str = "parquet",
+               columns: Optional[List[str]] = None, filter=None):
+    """
+    Liest ein Dataset als pyarrow.Table. Im Arrow-Format werden die Dateien per mmap geöffnet
+    und die Tabelle verweist direkt auf die gemappten Puffer (zero-copy); Parquet muss dekodiert werden.
+    """
+    if not os.path.isdir(os.path.join(base_dir, dataset)):
+        # Noch nie geschrieben (z.B. keine node_executions): leere Tabelle statt FileNotFoundError
+        return _empty_table(dataset, columns)
+    dataset_ = open_dataset(dataset, base_dir, format)
+    if format == "arrow" and filter is None:
+        return _read_mapped(dataset_, dataset, columns)
+    return dataset_.to_table(columns=columns, filter=filter)
+
+
+def _read_mapped(dataset_, dataset: str, columns: Optional[List[str]]):
+    tables = []
+    for fragment in dataset_.get_fragments():
+        partition = ds.get_partition_keys(fragment.partition_expression)[PARTITION_COLUMN]
+        table = ipc.open_file(pa.memory_map(fragment.path, 'r')).read_all()
+        table = table.append_column(PARTITION_COLUMN, pa.array([partition] * table.num_rows, pa.string()))
+        tables.append(table.select(list(arrow_schema(dataset, with_partition=True).names)))
+
+    if not tables:
+        return _empty_table(dataset, columns)
+    table = pa.concat_tables(tables)
+    return table.select(columns) if columns else table
+
+
+def _empty_table(dataset: str, columns: Optional[List[str]]):
+    table = arrow_schema(dataset, with_partition=True).empty_table()
+    return table.select(columns) if columns else table
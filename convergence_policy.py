@@ -0,0 +1,97 @@
+import hashlib
+import json
+from typing import Any, Dict, List, Optional
+
+from data_moduels.agent_state import AgentState
+from data_moduels.stop_reason import StopReason
+from data_moduels.validation_mode import ValidationMode
+from llm_manager import llm_manager
+
+
+class ConvergencePolicy:
+    """
+    Erkennt Iterationen, die keinen Fortschritt mehr bringen.
+
+    Jede Iteration wird als Eintrag in state["iteration_history"] festgehalten (Hash der Ausgabe,
+    Hash der Fehlermenge, Anzahl Fehler). Die Entscheidungsfunktionen brechen ab, sobald sich
+    Ausgabe und Fehler wiederholen, die Ausgabe zu einer früheren Version zurückspringt oder die
+    Fehleranzahl über plateau_window Iterationen nicht sinkt.
+    """
+
+    def __init__(self, plateau_window: int = 2):
+        self.plateau_window = plateau_window
+
+    @staticmethod
+    def output_hash(json_output: Optional[Dict]) -> str:
+        payload = json.dumps(json_output, sort_keys=True, ensure_ascii=False)
+        return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+    @staticmethod
+    def error_hash(errors: List) -> str:
+        # Formulierungen des Validators schwanken - verglichen werden Typ und Feld
+        keys = sorted({(error.type, error.field_path) for error in errors})
+        return hashlib.sha256(json.dumps(keys, ensure_ascii=False).encode('utf-8')).hexdigest()
+
+    def record(self, state: AgentState, errors: List = None, feedback: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Gibt die um die aktuelle Iteration erweiterte Historie zurück"""
+        if state["validation_mode"] == ValidationMode.HUMAN:
+            # Kein Fehlerset im HUMAN-Modus: das Feedback übernimmt seine Rolle
+            error_hash = hashlib.sha256((feedback or '').strip().encode('utf-8')).hexdigest()
+            error_count = None
+        else:
+            error_hash = self.error_hash(errors or [])
+            error_count = len(errors or [])
+
+        entry = {
+            "iteration": state["iteration_count"],
+            "output_hash": self.output_hash(state.get("current_json_output")),
+            "error_hash": error_hash,
+            "error_count": error_count,
+        }
+        return list(state.get("iteration_history") or []) + [entry]
+
+    def detect(self, history: List[Dict[str, Any]]) -> Optional[StopReason]:
+        """Konvergenz-/Oszillationsgrund oder None, wenn weiter iteriert werden soll"""
+        if len(history) < 2:
+            return None
+
+        current, previous = history[-1], history[-2]
+        if current["output_hash"] == previous["output_hash"] and current["error_hash"] == previous["error_hash"]:
+            return StopReason.FIXED_POINT
+
+        if any(entry["output_hash"] == current["output_hash"] for entry in history[:-2]):
+            return StopReason.CYCLE
+
+        if current["error_count"] is not None and current["error_hash"] == previous["error_hash"]:
+            return StopReason.REPEATED_ERRORS
+
+        window = history[-(self.plateau_window + 1):]
+        counts = [entry["error_count"] for entry in window]
+        if len(window) == self.plateau_window + 1 and None not in counts and min(counts[1:]) >= counts[0]:
+            return StopReason.PLATEAU
+
+        return None
+
+    def stop_reason(self, state: AgentState) -> Optional[StopReason]:
+        """Grund für das Beenden nach der aktuellen Iteration (None = weiter transformieren)"""
+        if state.get("budget_exhausted"):
+            return StopReason.BUDGET_EXHAUSTED
+
+        if state["validation_mode"] == ValidationMode.HUMAN:
+            if state.get("is_complete"):
+                return StopReason.COMPLETED
+        elif not state["validation_errors"]:
+            return StopReason.COMPLETED
+
+        if state["iteration_count"] >= state["max_iterations"]:
+            return StopReason.MAX_ITERATIONS
+
+        reason = self.detect(state.get("iteration_history") or [])
+        # Stillstand mit dem kleinen Modell: erst eskalieren (Modell-Kaskade), dann abbrechen
+        if reason is not None and llm_manager.cascade.can_escalate(state):
+            return None
+        return reason
+
+
+# Global instance
+convergence_policy = ConvergencePolicy()
@@ -1,26 +1,34 @@
+from langchain_core.runnables import RunnableLambda
 from langgraph.constants import START, END
 from langgraph.graph import StateGraph
 
 from automatic_decision_function import automatic_decision_function
 from automatic_validator_node import automatic_validator_node
 from decision_node import decision_node
-from finalizer_node import finalizer_node
-from human_feedback_node import human_feedback_node, human_decision_function
-from json_transformer_node import json_transformer_node
+from finalizer_node import finalizer_node, afinalizer_node
+from human_feedback_node import human_feedback_node, ahuman_feedback_node, human_decision_function
+from json_transformer_node import json_transformer_node, ajson_transformer_node
 from data_moduels.agent_state import AgentState
 from input_processor_node import input_processor_node
+from recipe_validator import VALIDATION_SECTIONS, COMBINED_SECTION
+from validation_join_node import validation_join_node, validation_fanout
+from validation_section_node import make_validation_section_node, VALIDATION_RETRY_POLICY
 
 def create_json_processing_graph():
 
     # Initialize graph
     workflow = StateGraph(AgentState)
 
-    # Add nodes
+    # Add nodes (sync + async Variante: der Graph läuft mit invoke/stream und ainvoke/astream)
     workflow.add_node("input_processor", input_processor_node)
-    workflow.add_node("transform", json_transformer_node)
+    workflow.add_node("transform", RunnableLambda(json_transformer_node, afunc=ajson_transformer_node))
     workflow.add_node("validate", automatic_validator_node)
-    workflow.add_node("human_feedback", human_feedback_node)
-    workflow.add_node("finalize", finalizer_node)
+    for section in VALIDATION_SECTIONS + (COMBINED_SECTION,):
+        workflow.add_node(f"validate_{section}", make_validation_section_node(section),
+                          retry_policy=VALIDATION_RETRY_POLICY)
+    workflow.add_node("validation_join", validation_join_node)
+    workflow.add_node("human_feedback", RunnableLambda(human_feedback_node, afunc=ahuman_feedback_node))
+    workflow.add_node("finalize", RunnableLambda(finalizer_node, afunc=afinalizer_node))
 
     # Add edges
     workflow.add_edge(START, "input_processor")
@@ -36,8 +44,17 @@ def create_json_processing_graph():
         }
     )
 
+    # Fan-out auf die Abschnittsprüfungen, Fan-in im validation_join
     workflow.add_conditional_edges(
         "validate",
+        validation_fanout,
+        [f"validate_{section}" for section in VALIDATION_SECTIONS + (COMBINED_SECTION,)] + ["validation_join"]
+    )
+    for section in VALIDATION_SECTIONS + (COMBINED_SECTION,):
+        workflow.add_edge(f"validate_{section}", "validation_join")
+
+    workflow.add_conditional_edges(
+        "validation_join",
         automatic_decision_function,
         {
             "transform": "transform",
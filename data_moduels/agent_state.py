@@ -1,15 +1,25 @@
-from typing import TypedDict, Dict, Any, Optional, List
+from typing import TypedDict, Dict, Any, Optional, List, Annotated
 
+from data_moduels.matching_mode import MatchingMode
+from data_moduels.repair_mode import RepairMode
 from data_moduels.validation_error import ValidationError
 from data_moduels.validation_mode import ValidationMode
+from data_moduels.validator_strategy import ValidatorStrategy
+
+
+def merge_section_results(left: Optional[Dict[str, Any]], right: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+    """Reducer für die parallelen Validation-Branches: jeder Branch schreibt nur seinen Abschnitt"""
+    merged = dict(left or {})
+    merged.update(right or {})
+    return merged
 
 
 class AgentState(TypedDict):
     # Input
     recipe_name: str
-    raw_text: str
-    text: str
-    target_schema: Dict[str, Any]
+    # Rezept-Text und Zielschema nur als Referenz in den input_store, nicht in jedem Checkpoint
+    raw_text_ref: str
+    target_schema_ref: str
     domain: str
 
     # Processing
@@ -17,12 +27,29 @@ class AgentState(TypedDict):
     validation_errors: List[ValidationError]
     iteration_count: int
     max_iterations: int
+    # Pro Iteration: {"iteration", "output_hash", "error_hash", "error_count"} (ConvergencePolicy)
+    iteration_history: List[Dict[str, Any]]
+
+    # Validation-Branches: {section: {"iteration", "errors", "cost", "input_tokens", "output_tokens"}}
+    section_results: Annotated[Dict[str, Dict[str, Any]], merge_section_results]
 
     # Feedback
     human_feedback: Optional[str]
     validation_mode: ValidationMode
+    validator_strategy: Optional[ValidatorStrategy]
+    matching_mode: Optional[MatchingMode]
+    repair_mode: Optional[RepairMode]
+    stream_transform: Optional[bool]
+    pre_validate: Optional[bool]
+    # Befunde des lokalen Vorab-Checks pro Abschnitt (RuleBasedRecipeValidator)
+    pre_validation_errors: Optional[Dict[str, List[ValidationError]]]
+    # Ein LLM-Aufruf wurde wegen eines Budgets (budget.py) nicht gemacht -> Finalizer
+    budget_exhausted: Optional[bool]
+    # Modell-Kaskade: Transform-Modell jeder bisherigen Iteration (LLMManager.cascade)
+    transform_models: List[str]
 
     # Results
     final_output: Optional[Dict[str, Any]]
     is_complete: bool
-    quality_score: Optional[float]
\ No newline at end of file
+    quality_score: Optional[float]
+    quality_metrics: Optional[Dict[str, float]]
@@ -0,0 +1,6 @@
+from enum import Enum
+
+
+class MatchingMode(Enum):
+    GREEDY = "greedy"    # erster Treffer in Listenreihenfolge (bisheriges Verhalten)
+    OPTIMAL = "optimal"  # Maximum-Weight-Assignment über die volle Ähnlichkeitsmatrix
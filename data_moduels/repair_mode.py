@@ -0,0 +1,6 @@
+from enum import Enum
+
+
+class RepairMode(Enum):
+    FULL = "full"    # Reparatur-Iterationen erzeugen das komplette JSON neu
+    PATCH = "patch"  # Modell liefert JSON-Patch-Operationen, die lokal angewendet werden
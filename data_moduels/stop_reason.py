@@ -0,0 +1,11 @@
+from enum import Enum
+
+
+class StopReason(Enum):
+    COMPLETED = "completed"              # Keine Fehler mehr bzw. vom Menschen freigegeben
+    MAX_ITERATIONS = "max_iterations"    # Iterationslimit erreicht
+    FIXED_POINT = "fixed_point"          # Gleiche Ausgabe und gleiche Fehler wie in der Vorrunde
+    REPEATED_ERRORS = "repeated_errors"  # Ausgabe geändert, aber dieselben Fehler gemeldet
+    CYCLE = "cycle"                      # Ausgabe springt zu einer früheren Version zurück
+    PLATEAU = "plateau"                  # Fehleranzahl sinkt über mehrere Iterationen nicht
+    BUDGET_EXHAUSTED = "budget_exhausted"  # Nächster LLM-Aufruf hätte ein Budget überschritten
@@ -1,13 +1,126 @@
-from pydantic.v1 import BaseModel
+import json
+from typing import Any, Dict, Iterable, List, Tuple
 
 from data_moduels.error_severity import ErrorSeverity
 
+_FIELDS = ('type', 'message', 'severity', 'field_path', 'suggested_fix')
+_DEFAULTS = {'suggested_fix': ""}
+_SEVERITIES = {severity.value for severity in ErrorSeverity}
 
-class ValidationError(BaseModel):
-    class Config:
-        use_enum_values = True
-    type: str
-    message: str
-    severity: ErrorSeverity
-    field_path: str
-    suggested_fix: str = ""
\ No newline at end of file
+
+class ValidationError:
+    """
+    Validierungsfehler als schlanke Klasse mit __slots__ (vorher pydantic-v1-BaseModel).
+
+    Die bisher genutzte pydantic-API bleibt: Keyword-Konstruktor mit Prüfung der Felder,
+    severity als String (wie use_enum_values), dict(), json(), copy(), parse_obj(), construct()
+    und Gleichheit über die Felder. Für viele Fehler auf einmal gibt es from_rows() / to_rows() /
+    dicts() ohne Prüfung bzw. ohne Zwischenobjekte pro Feld.
+    """
+
+    __slots__ = _FIELDS
+    __hash__ = None  # wie pydantic: __eq__ über die Felder, nicht hashbar
+
+    def __init__(self, **data):
+        for name in _FIELDS:
+            if name in data:
+                value = data[name]
+            elif name in _DEFAULTS:
+                value = _DEFAULTS[name]
+            else:
+                raise ValueError(f"ValidationError.{name}: field required")
+            setattr(self, name, _severity(value) if name == 'severity' else _string(name, value))
+
+    # --- Schneller Weg (keine Prüfung, Werte müssen bereits passen) ---
+
+    @classmethod
+    def construct(cls, **values) -> "ValidationError":
+        error = object.__new__(cls)
+        for name in _FIELDS:
+            setattr(error, name, values.get(name, _DEFAULTS.get(name)))
+        return error
+
+    @classmethod
+    def from_row(cls, row: Tuple[str, str, str, str, str]) -> "ValidationError":
+        error = object.__new__(cls)
+        error.type, error.message, error.severity, error.field_path, error.suggested_fix = row
+        return error
+
+    @classmethod
+    def from_rows(cls, rows: Iterable[Tuple[str, str, str, str, str]]) -> List["ValidationError"]:
+        """Viele Fehler auf einmal aus (type, message, severity, field_path, suggested_fix)"""
+        from_row = cls.from_row
+        return [from_row(row) for row in rows]
+
+    def to_row(self) -> Tuple[str, str, str, str, str]:
+        return self.type, self.message, self.severity, self.field_path, self.suggested_fix
+
+    @staticmethod
+    def to_rows(errors: Iterable["ValidationError"]) -> List[Tuple[str, str, str, str, str]]:
+        return [error.to_row() for error in errors]
+
+    @staticmethod
+    def dicts(errors: Iterable["ValidationError"]) -> List[Dict[str, str]]:
+        """Wie [error.dict() for error in errors], ohne die Optionen von dict() pro Fehler auszuwerten"""
+        return [dict(zip(_FIELDS, error.to_row())) for error in errors]
+
+    # --- pydantic-kompatible API ---
+
+    @classmethod
+    def parse_obj(cls, obj: Any) -> "ValidationError":
+        if isinstance(obj, cls):
+            return obj
+        if not isinstance(obj, dict):
+            raise ValueError(f"ValidationError expected dict not {type(obj).__name__}")
+        return cls(**obj)
+
+    def dict(self, *, include=None, exclude=None, **_) -> Dict[str, str]:
+        values = dict(zip(_FIELDS, self.to_row()))
+        if include is not None:
+            values = {name: value for name, value in values.items() if name in include}
+        if exclude is not None:
+            values = {name: value for name, value in values.items() if name not in exclude}
+        return values
+
+    def json(self, **kwargs) -> str:
+        dict_options = {key: kwargs.pop(key) for key in ('include', 'exclude') if key in kwargs}
+        return json.dumps(self.dict(**dict_options), **kwargs)
+
+    def copy(self, *, update: Dict[str, Any] = None, **_) -> "ValidationError":
+        error = self.from_row(self.to_row())
+        for name, value in (update or {}).items():
+            if name in _FIELDS:
+                setattr(error, name, value)
+        return error
+
+    def __iter__(self):
+        return iter(zip(_FIELDS, self.to_row()))
+
+    def __eq__(self, other) -> bool:
+        if isinstance(other, ValidationError):
+            return self.to_row() == other.to_row()
+        return self.dict() == other
+
+    def __repr__(self) -> str:
+        return f"ValidationError({', '.join(f'{name}={value!r}' for name, value in self)})"
+
+    def __reduce__(self):
+        # Kompakt für pickle: nur das Werte-Tupel, keine Feldnamen
+        return self.from_row, (self.to_row(),)
+
+
+def _string(name: str, value: Any) -> str:
+    # Wie pydantic v1: Zahlen werden zu Strings, alles andere außer str ist ein Fehler
+    if isinstance(value, str):
+        return value
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return str(value)
+    raise ValueError(f"ValidationError.{name}: str type expected")
+
+
+def _severity(value: Any) -> str:
+    if isinstance(value, ErrorSeverity):
+        return value.value
+    if value in _SEVERITIES:
+        return value
+    raise ValueError(f"ValidationError.severity: value is not a valid enumeration member: {value!r}")
@@ -0,0 +1,6 @@
+from enum import Enum
+
+
+class ValidatorStrategy(Enum):
+    SECTIONED = "sectioned"  # drei getrennte LLM-Aufrufe (ingredients, cooking_steps, completeness)
+    COMBINED = "combined"    # ein LLM-Aufruf mit zusammengeführtem Schema
@@ -3,6 +3,10 @@ from data_moduels.validation_mode import ValidationMode
 
 def decision_node(state: AgentState) -> str:
 
+    # Budget erschöpft: keine weiteren LLM-Aufrufe
+    if state.get("budget_exhausted"):
+        return "finalize"
+
     # Check iteration limit
     if state["iteration_count"] > state["max_iterations"]:
         return "finalize"
@@ -0,0 +1,178 @@
+import atexit
+import os
+import queue
+import sqlite3
+import threading
+import time
+from typing import Dict, List, Optional
+
+from session_collector import SessionCollector
+
+
+class ExperimentWriter:
+    """
+    Write-behind-Export der Session-Metriken.
+
+    Die Sessions legen nur eine Momentaufnahme (SessionCollector.export_records) in die Queue.
+    Ein Hintergrund-Thread hält eine langlebige SQLite-Verbindung im WAL-Modus und schreibt
+    gesammelt per executemany in einer Transaktion, sobald batch_size Sessions anstehen oder
+    flush_interval Sekunden seit der ältesten vergangen sind. Die JSON-Datensätze werden an einen
+    JSONL-Stream angehängt. close() schreibt alles Ausstehende und synchronisiert beide Dateien.
+
+    Schlägt SQLite fehl (auch das Öffnen der Verbindung), bleiben die Sessions ausstehend und werden
+    nach flush_interval erneut geschrieben; JSONL und Columnar erhalten sie erst danach, damit die
+    Stores nicht auseinanderlaufen. Was bis close() nicht geschrieben werden konnte, meldet close()
+    als Fehler.
+    """
+
+    def __init__(self, db_path: str = "experiment_results.db", jsonl_path: str = "experiment_results.jsonl",
+                 batch_size: int = 16, flush_interval: float = 2.0):
+        self.db_path = db_path
+        self.jsonl_path = jsonl_path
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._queue: "queue.Queue" = queue.Queue()
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+        # Letzter SQLite-Fehler und Anzahl der beim Beenden nicht geschriebenen Sessions
+        self._error: Optional[sqlite3.Error] = None
+        self._unwritten = 0
+        # Optionaler spaltenorientierter Export (columnar_export.ColumnarWriter), gleiche Batches wie SQLite
+        self.columnar = None
+
+    def configure(self, columnar_dir: Optional[str] = None, columnar_format: str = "parquet"):
+        """Aktiviert den Parquet/Arrow-Export; muss vor dem ersten submit() aufgerufen werden"""
+        if columnar_dir:
+            from columnar_export import ColumnarWriter
+            self.columnar = ColumnarWriter(columnar_dir, columnar_format)
+
+    def submit(self, records: Dict):
+        """Übergibt den Export einer Session (nicht blockierend)"""
+        self._ensure_started()
+        self._queue.put(('records', records))
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """Wartet, bis alles bisher Übergebene committet ist; False, wenn noch Sessions ausstehen"""
+        if self._thread is None:
+            return True
+        thread = self._thread
+        done = threading.Event()
+        self._queue.put(('flush', done))
+        # Nicht auf einen beendeten Thread warten
+        deadline = None if timeout is None else time.time() + timeout
+        while not done.wait(0.5) and thread.is_alive():
+            if deadline is not None and time.time() >= deadline:
+                break
+        # _write schreibt alle ausstehenden Sessions zusammen: ohne Fehler ist nichts mehr offen
+        return done.is_set() and self._error is None
+
+    def close(self):
+        """Schreibt alles Ausstehende, synchronisiert auf die Platte und beendet den Thread"""
+        with self._lock:
+            thread, self._thread = self._thread, None
+        if thread is None:
+            return
+        self._queue.put(('stop', None))
+        thread.join()
+
+        if self._unwritten:
+            unwritten, error = self._unwritten, self._error
+            self._unwritten, self._error = 0, None
+            raise RuntimeError(f"{unwritten} sessions could not be exported to {self.db_path}: {error}") from error
+
+    def _ensure_started(self):
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="experiment-writer", daemon=True)
+                self._thread.start()
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.db_path)
+        try:
+            conn.execute("PRAGMA journal_mode=WAL")
+            # WAL + NORMAL: kein fsync pro Commit; close() macht den Checkpoint mit voller Synchronisierung
+            conn.execute("PRAGMA synchronous=NORMAL")
+            SessionCollector.ensure_schema(conn)
+            conn.commit()
+        except sqlite3.Error:
+            conn.close()
+            raise
+        return conn
+
+    def _run(self):
+        conn = None
+        jsonl = open(self.jsonl_path, 'a', encoding='utf-8')
+        pending: List[Dict] = []
+        oldest = None
+
+        try:
+            while True:
+                timeout = None if oldest is None else max(0.0, oldest + self.flush_interval - time.time())
+                try:
+                    kind, payload = self._queue.get(timeout=timeout)
+                except queue.Empty:
+                    kind, payload = 'timeout', None
+
+                if kind == 'records':
+                    pending.append(payload)
+                    oldest = oldest or time.time()
+                    if len(pending) < self.batch_size:
+                        continue
+
+                conn, pending = self._write(conn, jsonl, pending)
+                # Fehlgeschlagene Sessions nach flush_interval erneut versuchen
+                oldest = time.time() if pending else None
+
+                if kind == 'flush':
+                    payload.set()
+                elif kind == 'stop':
+                    break
+        finally:
+            conn, pending = self._write(conn, jsonl, pending)
+            self._unwritten = len(pending)
+            # Dauerhafter Abschluss: WAL in die DB zurückschreiben, JSONL auf die Platte
+            try:
+                if conn is not None:
+                    conn.execute("PRAGMA synchronous=FULL")
+                    conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+                    conn.close()
+            finally:
+                # Unabhängig von SQLite schließen, sonst fehlt den Parquet-Dateien der Footer
+                try:
+                    if self.columnar is not None:
+                        self.columnar.close()
+                finally:
+                    jsonl.flush()
+                    os.fsync(jsonl.fileno())
+                    jsonl.close()
+
+    def _write(self, conn: Optional[sqlite3.Connection], jsonl, records: List[Dict]) -> tuple:
+        """Schreibt records in alle Stores; gibt (Verbindung, nicht geschriebene records) zurück"""
+        if not records:
+            return conn, records
+        try:
+            if conn is None:
+                conn = self._connect()
+            with conn:
+                SessionCollector.write_export_records(conn, records)
+        except sqlite3.Error as e:
+            print(f"Export of {len(records)} sessions to {self.db_path} failed: {e} - retrying")
+            self._error = e
+            return conn, records
+        print(f"{len(records)} sessions exported to {self.db_path}")
+        self._error = None
+
+        if self.columnar is not None:
+            try:
+                self.columnar.write(records)
+            except Exception as e:
+                print(f"Columnar export of {len(records)} sessions failed: {e}")
+
+        jsonl.writelines(record['json'] + '\n' for record in records)
+        jsonl.flush()
+        return conn, []
+
+
+# Global instance
+experiment_writer = ExperimentWriter()
+atexit.register(experiment_writer.close)
@@ -1,10 +1,20 @@
+from langchain_core.runnables import RunnableConfig
+
+from convergence_policy import convergence_policy
 from data_moduels.agent_state import AgentState
-from shared_session_collector import session_collector
+from data_moduels.stop_reason import StopReason
+from data_moduels.validation_error import ValidationError
+from shared_session_collector import get_session_collector
+
+# Abbrüche vor dem Iterationslimit; nur hier wurden Iterationen eingespart (bei COMPLETED war nichts mehr zu tun)
+EARLY_STOP_REASONS = (StopReason.FIXED_POINT, StopReason.CYCLE, StopReason.REPEATED_ERRORS, StopReason.PLATEAU,
+                      StopReason.BUDGET_EXHAUSTED)
 
-def finalizer_node(state: AgentState) -> AgentState:
+def finalizer_node(state: AgentState, config: RunnableConfig = None) -> dict:
 
     quality_score = state.get("quality_score", 0.0)
-    success = quality_score > 0.8
+    # Nach einem Budget-Abbruch ist das Ergebnis höchstens teilweise geprüft
+    success = quality_score > 0.8 and not state.get("budget_exhausted")
 
     # Set final quality score in collector
     # session_collector.set_final_quality_score(
@@ -12,18 +22,31 @@ def finalizer_node(state: AgentState) -> AgentState:
     #     quality_score
     # )
 
+    # Warum die Schleife endet; bei Konvergenz die nicht mehr benötigten Iterationen
+    stop_reason = convergence_policy.stop_reason(state) or StopReason.MAX_ITERATIONS
+    iterations_saved = 0
+    if stop_reason in EARLY_STOP_REASONS:
+        iterations_saved = max(0, state["max_iterations"] - state["iteration_count"])
+        print(f"Stopping early ({stop_reason.value}), {iterations_saved} iterations saved")
+    get_session_collector(config).set_stop_reason(state["validation_mode"], stop_reason.value, iterations_saved)
+
     final_output = {
         "status": "success" if success else "partial_success",
         "data": state.get("current_json_output", {}),
         "quality_score": quality_score,
         "iterations_used": state["iteration_count"],
-        "remaining_errors": [error.dict() for error in state.get("validation_errors", [])]
+        "stop_reason": stop_reason.value,
+        "remaining_errors": ValidationError.dicts(state.get("validation_errors", []))
     }
 
     result = {
-        **state,
         "final_output": final_output,
         "is_complete": True
     }
 
-    return result
\ No newline at end of file
+    return result
+
+
+async def afinalizer_node(state: AgentState, config: RunnableConfig = None) -> dict:
+    """Async-Variante: der Finalizer ruft kein LLM auf, daher nur ein Wrapper"""
+    return finalizer_node(state, config)
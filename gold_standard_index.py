@@ -0,0 +1,125 @@
+import hashlib
+import json
+import os
+import threading
+import unicodedata
+from typing import Dict, List, Optional
+
+UMLAUT_REPLACEMENTS = {'ä': 'ae', 'ö': 'oe', 'ü': 'ue', 'ß': 'ss'}
+
+
+def normalize_recipe_name(name: str) -> str:
+    """Toleranter Lookup-Schlüssel: Groß/Klein, Leerzeichen/Unterstriche und Umlaut-Schreibweisen egal"""
+    key = unicodedata.normalize('NFC', name).lower().strip()
+    for umlaut, replacement in UMLAUT_REPLACEMENTS.items():
+        key = key.replace(umlaut, replacement)
+    return '_'.join(key.replace('_', ' ').split())
+
+
+def flatten_step_texts(steps: list) -> List[str]:
+    """Titel und sub_steps aller Kochschritte als klein geschriebene Texte (Reihenfolge bleibt)"""
+    texts = []
+    for step in steps or []:
+        if isinstance(step, dict):
+            if step.get('title'):
+                texts.append(step['title'].lower())
+            sub_steps = step.get('sub_steps', [])
+            if isinstance(sub_steps, list):
+                for sub in sub_steps:
+                    if sub:
+                        texts.append(str(sub).lower())
+    return texts
+
+
+class GoldStandard:
+    """Ein geladener Goldstandard mit den für das Scoring vorbereiteten Formen"""
+
+    def __init__(self, path: str, data: Dict, mtime: float):
+        self.path = path
+        self.data = data
+        self.mtime = mtime
+
+        self.ingredients = data.get('ingredients', []) or []
+        self.ingredient_names = [
+            (ingredient.get('name') or '').lower() if isinstance(ingredient, dict) else None
+            for ingredient in self.ingredients
+        ]
+        self.cooking_steps = data.get('cooking_steps', []) or []
+        self.step_texts = flatten_step_texts(self.cooking_steps)
+        self.name_normalized = str(data.get('name')).lower().strip() if data.get('name') is not None else None
+
+        # Ändert sich nur, wenn sich der Inhalt ändert (nicht bei reinem touch)
+        payload = json.dumps(data, sort_keys=True, ensure_ascii=False, separators=(',', ':'))
+        self.content_hash = hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+class GoldStandardIndex:
+    """
+    Goldstandards aus assets/gold_standards/, einmal geladen und im Speicher gehalten.
+    Eine Datei wird nur neu gelesen, wenn sich ihre mtime ändert; neue oder gelöschte
+    Dateien werden über die mtime des Verzeichnisses erkannt.
+    """
+
+    def __init__(self, directory: str = os.path.join("assets", "gold_standards")):
+        self.directory = directory
+        self._paths: Dict[str, str] = {}
+        self._entries: Dict[str, GoldStandard] = {}
+        self._dir_mtime = None
+        self._lock = threading.Lock()
+
+    def get(self, recipe_name: str) -> Optional[GoldStandard]:
+        if not recipe_name:
+            return None
+
+        key = normalize_recipe_name(recipe_name)
+        with self._lock:
+            self._refresh_directory()
+            path = self._paths.get(key)
+            if path is None:
+                return None
+
+            try:
+                mtime = os.stat(path).st_mtime
+            except OSError:
+                return None
+
+            entry = self._entries.get(key)
+            if entry is None or entry.mtime != mtime:
+                entry = self._load(path, mtime)
+                if entry is None:
+                    self._entries.pop(key, None)
+                    return None
+                self._entries[key] = entry
+
+            return entry
+
+    def _refresh_directory(self):
+        try:
+            dir_mtime = os.stat(self.directory).st_mtime
+        except OSError:
+            self._paths, self._entries, self._dir_mtime = {}, {}, None
+            return
+
+        if dir_mtime == self._dir_mtime:
+            return
+
+        paths = {}
+        for filename in os.listdir(self.directory):
+            if filename.endswith('.json'):
+                paths[normalize_recipe_name(filename[:-5])] = os.path.join(self.directory, filename)
+
+        self._paths = paths
+        self._entries = {key: entry for key, entry in self._entries.items() if key in paths}
+        self._dir_mtime = dir_mtime
+
+    @staticmethod
+    def _load(path: str, mtime: float) -> Optional[GoldStandard]:
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                return GoldStandard(path, json.load(f), mtime)
+        except (OSError, ValueError):
+            return None
+
+
+# Global instance
+gold_standard_index = GoldStandardIndex()
@@ -1,34 +1,63 @@
+import asyncio
 import json
 import time
+
+from langchain_core.runnables import RunnableConfig
+
+from convergence_policy import convergence_policy
 from data_moduels.agent_state import AgentState
+from data_moduels.matching_mode import MatchingMode
 from gui.human_feedback_gui import launch_human_feedback_gui
+from input_store import state_raw_text
 from recipe_validator import LLMRecipeValidator
-from shared_session_collector import session_collector
+from shared_session_collector import get_session_collector
+
+def human_feedback_node(state: AgentState, config: RunnableConfig = None) -> dict:
+    session_collector = get_session_collector(config)
 
-def human_feedback_node(state: AgentState) -> AgentState:
     # Start node timing
     session_collector.start_node("human_feedback", state["validation_mode"])
 
-    validators = {
-        "recipe": LLMRecipeValidator(),
-    }
+    try:
+        result = _gui_feedback(state)
+    except Exception as e:
+        print(f"GUI feedback failed: {e}")
+        print("Falling back to console input...")
+        result = _console_feedback(state)
+
+    return _finish_feedback(state, result, session_collector)
 
-    validator = validators.get(state["domain"], LLMRecipeValidator())
+
+async def ahuman_feedback_node(state: AgentState, config: RunnableConfig = None) -> dict:
+    """Async-Variante für Graphen, die mit ainvoke/astream ausgeführt werden"""
+    session_collector = get_session_collector(config)
+
+    # Start node timing
+    session_collector.start_node("human_feedback", state["validation_mode"])
 
     try:
+        # Tkinter muss im Hauptthread laufen, daher kein to_thread für die GUI
         result = _gui_feedback(state)
-        quality_metrics = validator.calculate_quality_score(
-            state["current_json_output"],
-            recipe_name=state.get("recipe_name", "unknown")
-        )
     except Exception as e:
         print(f"GUI feedback failed: {e}")
         print("Falling back to console input...")
-        result = _console_feedback(state)
-        quality_metrics = validator.calculate_quality_score(
-            state["current_json_output"],
-            recipe_name=state.get("recipe_name", "unknown")
-        )
+        result = await asyncio.to_thread(_console_feedback, state)
+
+    return _finish_feedback(state, result, session_collector)
+
+
+def _finish_feedback(state: AgentState, result: dict, session_collector) -> dict:
+    validators = {
+        "recipe": LLMRecipeValidator(),
+    }
+
+    validator = validators.get(state["domain"], LLMRecipeValidator())
+
+    quality_metrics = validator.calculate_quality_score(
+        state["current_json_output"],
+        recipe_name=state.get("recipe_name", "unknown"),
+        matching_mode=state.get("matching_mode") or MatchingMode.GREEDY
+    )
 
     # Process the result
     if result['action'] == 'approve':
@@ -39,14 +68,15 @@ def human_feedback_node(state: AgentState) -> AgentState:
         feedback = result.get('feedback', '')
 
     # End node timing mit allen Metriken
-    session_collector.end_human_feedback_node(quality_metrics=quality_metrics)
+    session_collector.end_human_feedback_node(quality_metrics=quality_metrics,
+                                              json_output=state["current_json_output"])
 
     result_state = {
-        **state,
         "human_feedback": feedback,
         "quality_score": quality_metrics.get('overall_f1', 0.0),  # Für Kompatibilität
         "quality_metrics": quality_metrics,  # Neue vollständige Metriken
-        "is_complete": is_approved
+        "is_complete": is_approved,
+        "iteration_history": convergence_policy.record(state, feedback=feedback)
     }
 
     return result_state
@@ -57,7 +87,7 @@ def _gui_feedback(state: AgentState) -> dict:
     print(f"Opening GUI window...")
 
     result = launch_human_feedback_gui(
-        raw_text=state["text"],
+        raw_text=state_raw_text(state),
         json_output=state.get("current_json_output", {}),
         domain=state['domain'],
         iteration=state["iteration_count"]
@@ -93,10 +123,8 @@ def _console_feedback(state: AgentState) -> dict:
 
 
 def human_decision_function(state: AgentState) -> str:
-    if state["iteration_count"] >= state["max_iterations"]:
-        return "finalize"
-
-    if state["is_complete"]:
+    # Freigabe, Iterationslimit oder unverändertes Ergebnis trotz gleichem Feedback
+    if convergence_policy.stop_reason(state) is not None:
         return "finalize"
 
     return "transform"
\ No newline at end of file
@@ -1,15 +1,16 @@
 from data_moduels.agent_state import AgentState
 
-def input_processor_node(state: AgentState) -> AgentState:
+def input_processor_node(state: AgentState) -> dict:
 
-    #processed_text = " ".join(state["raw_text"].split())
-    processed_text = state["raw_text"]
+    # Der Rezept-Text bleibt unverändert im input_store (raw_text_ref)
+    #processed_text = " ".join(state_raw_text(state).split())
 
+    # Partielles Update: nur geänderte Keys, der Checkpointer speichert keine Kopie des ganzen States
     result = {
-        **state,
-        "raw_text": processed_text,
         "iteration_count": 0,
         "validation_errors": [],
+        "iteration_history": [],
+        "transform_models": [],
         "is_complete": False
     }
     # result = {
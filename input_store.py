@@ -0,0 +1,64 @@
+import hashlib
+import json
+import threading
+from typing import Any, Dict
+
+# Große, unveränderliche Eingaben des Graphen (Rezept-Text, Zielschema) liegen einmal pro Inhalt
+# hier; der AgentState trägt nur die Referenz (SHA-256). Damit serialisiert der Checkpointer
+# pro Super-Step ein paar Bytes statt Text und Schema. Nach einem Neustart legt main.py dieselben
+# Inhalte erneut ab und erhält dieselben Referenzen, fortgesetzte Checkpoints bleiben gültig.
+
+
+class InputStore:
+
+    def __init__(self):
+        self._values: Dict[str, Any] = {}
+        self._refcounts: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def make_ref(value: Any) -> str:
+        if isinstance(value, str):
+            payload = value
+        else:
+            payload = json.dumps(value, sort_keys=True, ensure_ascii=False, separators=(',', ':'))
+        return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+    def put(self, value: Any) -> str:
+        """Legt den Inhalt ab (falls neu) und gibt seine Referenz zurück; jedes put() braucht ein release()"""
+        ref = self.make_ref(value)
+        with self._lock:
+            self._values.setdefault(ref, value)
+            self._refcounts[ref] = self._refcounts.get(ref, 0) + 1
+        return ref
+
+    def get(self, ref: str) -> Any:
+        with self._lock:
+            try:
+                return self._values[ref]
+            except KeyError:
+                raise KeyError(f"Input {ref[:12]} is not in the input store") from None
+
+    def release(self, *refs: str):
+        with self._lock:
+            for ref in refs:
+                count = self._refcounts.get(ref, 0) - 1
+                if count > 0:
+                    self._refcounts[ref] = count
+                else:
+                    self._refcounts.pop(ref, None)
+                    self._values.pop(ref, None)
+
+
+def state_raw_text(state) -> str:
+    """Rezept-Text der Session (AgentState.raw_text_ref)"""
+    return input_store.get(state["raw_text_ref"])
+
+
+def state_target_schema(state) -> Dict[str, Any]:
+    """Zielschema der Session (AgentState.target_schema_ref)"""
+    return input_store.get(state["target_schema_ref"])
+
+
+# Global instance
+input_store = InputStore()
@@ -0,0 +1,107 @@
+import copy
+import json
+import re
+from typing import Any, Dict, List
+
+# Teilmenge von JSON-Patch (RFC 6902) für die Reparatur-Iterationen des Transformers:
+# add / remove / replace mit JSON-Pointer-Pfaden.
+
+_FIELD_PATH_TOKEN = re.compile(r"[^.\[\]]+|\[\d+\]")
+
+
+class JsonPatchError(ValueError):
+    """Patch lässt sich nicht auf das Dokument anwenden"""
+
+
+def field_path_to_pointer(field_path: str) -> str:
+    """'ingredients[2].quantity' -> '/ingredients/2/quantity' (field_path der ValidationErrors)"""
+    if field_path.startswith('/'):
+        return field_path
+
+    tokens = []
+    for token in _FIELD_PATH_TOKEN.findall(field_path or ''):
+        token = token.strip('[]') if token.startswith('[') else token
+        tokens.append(token.replace('~', '~0').replace('/', '~1'))
+    return '/' + '/'.join(tokens) if tokens else ''
+
+
+def apply_patch(document: Dict, operations: List[Dict]) -> Dict:
+    """Wendet die Operationen auf eine Kopie an; bei jedem Fehler JsonPatchError"""
+    result = copy.deepcopy(document)
+
+    for operation in operations:
+        op = operation.get('op')
+        path = field_path_to_pointer(operation.get('path') or '')
+        if not path:
+            raise JsonPatchError(f"Patch auf das gesamte Dokument nicht erlaubt: {operation}")
+
+        parent, key = _resolve_parent(result, path)
+
+        if op == 'add':
+            value = _decode_value(operation)
+            if isinstance(parent, list):
+                index = len(parent) if key == '-' else _list_index(parent, key, allow_end=True)
+                parent.insert(index, value)
+            else:
+                parent[key] = value
+
+        elif op == 'replace':
+            value = _decode_value(operation)
+            if isinstance(parent, list):
+                parent[_list_index(parent, key)] = value
+            elif key in parent:
+                parent[key] = value
+            else:
+                raise JsonPatchError(f"replace auf nicht vorhandenen Pfad: {path}")
+
+        elif op == 'remove':
+            if isinstance(parent, list):
+                del parent[_list_index(parent, key)]
+            elif key in parent:
+                del parent[key]
+            else:
+                raise JsonPatchError(f"remove auf nicht vorhandenen Pfad: {path}")
+
+        else:
+            raise JsonPatchError(f"Nicht unterstützte Operation: {op}")
+
+    return result
+
+
+def _resolve_parent(document: Any, pointer: str):
+    tokens = [t.replace('~1', '/').replace('~0', '~') for t in pointer.lstrip('/').split('/')]
+    target = document
+
+    for token in tokens[:-1]:
+        if isinstance(target, list):
+            target = target[_list_index(target, token)]
+        elif isinstance(target, dict) and token in target:
+            target = target[token]
+        else:
+            raise JsonPatchError(f"Pfad existiert nicht: {pointer}")
+
+    if not isinstance(target, (dict, list)):
+        raise JsonPatchError(f"Pfad zeigt nicht auf ein Objekt oder Array: {pointer}")
+
+    return target, tokens[-1]
+
+
+def _list_index(target: list, token: str, allow_end: bool = False) -> int:
+    if not token.isdigit():
+        raise JsonPatchError(f"Ungültiger Array-Index: {token}")
+    index = int(token)
+    if index > len(target) or (index == len(target) and not allow_end):
+        raise JsonPatchError(f"Array-Index außerhalb des Bereichs: {token}")
+    return index
+
+
+def _decode_value(operation: Dict) -> Any:
+    # Werte kommen JSON-kodiert (Strict-Schema erlaubt keinen beliebigen Typ);
+    # nicht dekodierbare Werte werden als einfacher String übernommen
+    value = operation.get('value')
+    if not isinstance(value, str):
+        return value
+    try:
+        return json.loads(value)
+    except ValueError:
+        return value
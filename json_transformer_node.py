@@ -1,37 +1,238 @@
 import json
 
-from langchain_openai import ChatOpenAI
+from langchain_core.runnables import RunnableConfig
 
+from budget import BudgetExceededError
 from data_moduels.agent_state import AgentState
 from data_moduels.error_severity import ErrorSeverity
+from data_moduels.repair_mode import RepairMode
 from data_moduels.validation_error import ValidationError
-from shared_session_collector import session_collector
-from utils.calculate_cost import calculate_openai_cost
+from input_store import state_raw_text, state_target_schema
+from json_patch import JsonPatchError, apply_patch, field_path_to_pointer
+from llm_cache import cached_structured_invoke, acached_structured_invoke
+from llm_manager import llm_manager
+from schema_registry import schema_registry
+from shared_session_collector import get_session_collector
+from streaming_transformer import stream_structured_invoke, astream_structured_invoke
+from utils.calculate_cost import calculate_openai_cost, response_model
+from utils.schema_check import schema_errors
+from validation_section_node import EarlySectionValidation
 
-def json_transformer_node(state: AgentState) -> AgentState:
+TRANSFORM_TEMPERATURE = 0.0
+PATCH_SCHEMA_PATH = 'assets/patch_schema.json'
+
+def json_transformer_node(state: AgentState, config: RunnableConfig = None) -> dict:
+    session_collector = get_session_collector(config)
 
     # Start node timing
     session_collector.start_node("transform", state["validation_mode"])
 
-    schema_dict = state['target_schema']
-    llm = ChatOpenAI(
-        model="gpt-5-nano",
-        temperature=0.0,
-    ).with_structured_output(schema=schema_dict, include_raw=True)
+    try:
+        return _transform(state, config, session_collector)
+    except BudgetExceededError as e:
+        return _budget_exhausted_result(state, e)
+
+
+def _transform(state: AgentState, config: RunnableConfig, session_collector) -> dict:
+    model = _select_model(state)
+
+    if _use_patch_repair(state):
+        print(f"Calling the transformer (patch repair)")
+        patch_schema = schema_registry.get_schema(PATCH_SCHEMA_PATH)
+        response = cached_structured_invoke(_patch_llm(model, session_collector), _build_patch_prompt(state),
+                                            model, TRANSFORM_TEMPERATURE, patch_schema, session_collector)
+        result = _handle_patch_response(state, response, session_collector, model)
+        if result is not None:
+            return result
+
+    if state.get("stream_transform"):
+        return _stream_transform(state, config, session_collector, model)
+
+    llm = _transform_llm(state, model, session_collector)
+    prompt = _build_transform_prompt(state)
+
+    try:
+        print(f"Calling the transformer ({model})")
+        response = cached_structured_invoke(llm, prompt, model, TRANSFORM_TEMPERATURE,
+                                            state_target_schema(state), session_collector)
+        print(f"Transformer returned the result")
+
+        return _handle_transform_response(state, response, session_collector, model)
+
+    except json.JSONDecodeError as e:
+        return _transform_error_result(state, e, model)
+
+
+async def ajson_transformer_node(state: AgentState, config: RunnableConfig = None) -> dict:
+    """Async-Variante: gleicher Prompt, aber nicht-blockierender LLM-Aufruf"""
+    session_collector = get_session_collector(config)
+
+    # Start node timing
+    session_collector.start_node("transform", state["validation_mode"])
+
+    try:
+        return await _atransform(state, config, session_collector)
+    except BudgetExceededError as e:
+        return _budget_exhausted_result(state, e)
+
+
+async def _atransform(state: AgentState, config: RunnableConfig, session_collector) -> dict:
+    model = _select_model(state)
+
+    if _use_patch_repair(state):
+        print(f"Calling the transformer (patch repair, async)")
+        patch_schema = schema_registry.get_schema(PATCH_SCHEMA_PATH)
+        response = await acached_structured_invoke(_patch_llm(model, session_collector), _build_patch_prompt(state),
+                                                   model, TRANSFORM_TEMPERATURE, patch_schema,
+                                                   session_collector)
+        result = _handle_patch_response(state, response, session_collector, model)
+        if result is not None:
+            return result
+
+    if state.get("stream_transform"):
+        return await _astream_transform(state, config, session_collector, model)
+
+    llm = _transform_llm(state, model, session_collector)
+    prompt = _build_transform_prompt(state)
+
+    try:
+        print(f"Calling the transformer ({model}, async)")
+        response = await acached_structured_invoke(llm, prompt, model, TRANSFORM_TEMPERATURE,
+                                                   state_target_schema(state), session_collector)
+        print(f"Transformer returned the result")
+
+        return _handle_transform_response(state, response, session_collector, model)
+
+    except json.JSONDecodeError as e:
+        return _transform_error_result(state, e, model)
+
+
+def _stream_transform(state: AgentState, config: RunnableConfig, session_collector, model: str) -> dict:
+    """Streamt die Antwort; fertige Abschnitte werden schon während der Generierung geprüft"""
+    early_validation = EarlySectionValidation(state, config)
+    on_field = _field_callback(state, early_validation.on_field)
+
+    try:
+        print(f"Calling the transformer (streaming)")
+        response = stream_structured_invoke(_build_transform_prompt(state), model, TRANSFORM_TEMPERATURE,
+                                            state_target_schema(state), on_field, session_collector)
+        print(f"Transformer returned the result")
+
+        result = _handle_transform_response(state, response, session_collector, model)
+        return {**result, "section_results": early_validation.collect(result)}
+
+    except json.JSONDecodeError as e:
+        return _transform_error_result(state, e, model)
+    finally:
+        early_validation.close()
+
+
+async def _astream_transform(state: AgentState, config: RunnableConfig, session_collector,
+                             model: str) -> dict:
+    early_validation = EarlySectionValidation(state, config)
+    on_field = _field_callback(state, early_validation.aon_field)
+
+    try:
+        print(f"Calling the transformer (streaming, async)")
+        response = await astream_structured_invoke(_build_transform_prompt(state), model,
+                                                   TRANSFORM_TEMPERATURE, state_target_schema(state), on_field,
+                                                   session_collector)
+        print(f"Transformer returned the result")
+
+        result = _handle_transform_response(state, response, session_collector, model)
+        return {**result, "section_results": await early_validation.acollect(result)}
+
+    except json.JSONDecodeError as e:
+        return _transform_error_result(state, e, model)
+    finally:
+        early_validation.close()
+
+
+def _field_callback(state: AgentState, start_validation):
+    if state['validation_mode'].value == 'automatic':
+        return start_validation
+    return _preview_field
+
+
+def _preview_field(key: str, value):
+    # HUMAN: Die Tkinter-GUI läuft modal im Hauptthread und öffnet erst nach dem Transform;
+    # fertige Zutaten werden vorab auf der Konsole angezeigt
+    if key != 'ingredients' or not isinstance(value, list):
+        return
+    print(f"\n--- Vorschau Zutaten ({len(value)}) ---")
+    for ingredient in value:
+        if isinstance(ingredient, dict):
+            amount = ' '.join(str(ingredient.get(k)) for k in ('quantity', 'unit') if ingredient.get(k))
+            print(f"  - {ingredient.get('name', '')} {amount}".rstrip())
+
+
+def _select_model(state: AgentState) -> str:
+    # Modell-Kaskade (LLMManager): günstiges Modell zuerst, Eskalation bei anhaltenden Fehlern
+    model = llm_manager.select_transform_model(state)
+    previous = (state.get("transform_models") or [None])[-1]
+    if previous is not None and model != previous:
+        print(f"Escalating transformer: {previous} -> {model}")
+    return model
+
+
+def _transform_llm(state: AgentState, model: str, session_collector=None):
+    # Einmal pro (model, schema) gebaut, danach aus der Registry
+    return schema_registry.get_structured_llm(
+        model, TRANSFORM_TEMPERATURE, state_target_schema(state), session_collector
+    )
     #llm = llm_manager.get_transform_llm(state["validation_mode"]).with_structured_output(schema=schema_dict, include_raw=True)
-    # Build prompt
 
+
+def _patch_llm(model: str, session_collector=None):
+    return schema_registry.get_structured_llm(
+        model, TRANSFORM_TEMPERATURE, schema_registry.get_schema(PATCH_SCHEMA_PATH), session_collector
+    )
+
+
+def _use_patch_repair(state: AgentState) -> bool:
+    """Patch-Reparatur nur für AUTOMATIC-Iterationen mit Validierungsfehlern auf einem vorhandenen JSON"""
+    return (state.get("repair_mode") == RepairMode.PATCH
+            and state['validation_mode'].value == 'automatic'
+            and state['iteration_count'] > 0
+            and bool(state.get('current_json_output'))
+            and bool(state['validation_errors'])
+            and not any(e.type == "json_parse_error" for e in state['validation_errors']))
+
+
+def _build_patch_prompt(state: AgentState) -> str:
+    # Kompaktes JSON: der Prompt muss das Dokument nur adressierbar machen
+    data = json.dumps(state['current_json_output'], ensure_ascii=False, separators=(',', ':'))
+
+    prompt = f""" Originaltext: {state_raw_text(state)}\n\n Aktuelles JSON: {data}\n\n===WICHTIG: Beheben Sie diese spezifischen Fehler ===\n"""
+    for error in state['validation_errors']:
+        prompt += f"- [{field_path_to_pointer(error.field_path)}] {error.message}\n"
+        if error.suggested_fix:
+            prompt += f"  → Korrigiere: {error.suggested_fix}\n"
+
+    prompt += """
+        \nAUSGABE:
+            - Geben Sie NICHT das vollständige JSON zurück, sondern nur JSON-Patch-Operationen (add, remove, replace), die genau diese Fehler beheben.
+            - path ist ein JSON-Pointer in das aktuelle JSON, Array-Indizes beginnen bei 0, "/ingredients/-" hängt am Ende an.
+            - value ist der neue Wert JSON-kodiert (Strings in Anführungszeichen, z.B. "\\"200\\"", fehlende Werte als "null"); bei remove null.
+            - Alles, was nicht von einem Fehler betroffen ist, bleibt unverändert.
+            - Nutze nur wörtliche Belege aus dem ORIGINALTEXT.
+        """
+
+    return prompt
+
+
+def _build_transform_prompt(state: AgentState) -> str:
     if state['iteration_count'] == 0:
         prompt = f"""
         Konvertieren Sie den folgenden Text gemäß dem Schema in das JSON-Format.
         
-        Text: {state['raw_text']}
+        Text: {state_raw_text(state)}
         Domain: {state['domain']}
         """
 
     if state['validation_mode'].value == 'automatic' and state['validation_errors'] and state['iteration_count'] > 0:
         data = state['current_json_output']
-        prompt = (f""" Originaltext: {state['raw_text']}\n\n Zukorrigierende JSON: {json.dumps(data, indent=4, ensure_ascii=False)} \n\n===WICHTIG: Beheben Sie diese spezifischen Fehler ===\n""")
+        prompt = (f""" Originaltext: {state_raw_text(state)}\n\n Zukorrigierende JSON: {json.dumps(data, indent=4, ensure_ascii=False)} \n\n===WICHTIG: Beheben Sie diese spezifischen Fehler ===\n""")
         ingredient_errors = [e for e in state['validation_errors'] if 'ingredients' in e.field_path]
         instruction_errors = [e for e in state['validation_errors'] if 'cooking_steps' in e.field_path]
         completeness_errors = [e for e in state['validation_errors'] if e.field_path in
@@ -64,7 +265,7 @@ def json_transformer_node(state: AgentState) -> AgentState:
 
     if state['validation_mode'].value == 'human' and state['iteration_count'] > 0:
         data = state['current_json_output']
-        prompt = (f""" Originaltext: {state['raw_text']} \n\n Zukorrigierende JSON: {json.dumps(data, indent=4, ensure_ascii=False)} \n\n ===WICHTIG: Beheben Sie diese spezifischen Fehler ===\n\n {state['human_feedback']}""")
+        prompt = (f""" Originaltext: {state_raw_text(state)} \n\n Zukorrigierende JSON: {json.dumps(data, indent=4, ensure_ascii=False)} \n\n ===WICHTIG: Beheben Sie diese spezifischen Fehler ===\n\n {state['human_feedback']}""")
 
         #prompt += f"\n\n=== FEEDBACK ===\n{state['human_feedback']}\n"
 
@@ -80,43 +281,81 @@ def json_transformer_node(state: AgentState) -> AgentState:
             - Nutze nur wörtliche Belege aus dem ORIGINALTEXT.
         """
 
-    try:
-        print(f"Calling the transformer")
-        response = llm.invoke(prompt)
-        print(f"Transformer returned the result")
+    return prompt
 
-        parsed_response = response["parsed"]
-        token_usage = response["raw"].usage_metadata
-        cost = calculate_openai_cost(token_usage or {}, "gpt-5-nano")
 
-        # Log to session collector
-        session_collector.end_transform_node(
-            cost=cost,
-            input_tokens=(token_usage or {}).get('input_tokens', 0),
-            output_tokens=(token_usage or {}).get('output_tokens', 0)
-        )
+def _handle_transform_response(state: AgentState, response: dict, session_collector, model: str) -> dict:
+    parsed_response = response["parsed"]
+    token_usage = response["raw"].usage_metadata
+    # Kosten nach dem Modell, das laut Antwort tatsächlich geantwortet hat
+    cost = calculate_openai_cost(token_usage or {}, response_model(response, model),
+                                 cache_hit=response.get("cache_hit", False))
 
-        result = {
-            **state,
-            "current_json_output": parsed_response,
-            "iteration_count": state["iteration_count"] + 1
-        }
+    # Log to session collector
+    session_collector.end_transform_node(
+        cost=cost,
+        input_tokens=(token_usage or {}).get('input_tokens', 0),
+        output_tokens=(token_usage or {}).get('output_tokens', 0),
+        model=model
+    )
 
-        return result
+    result = {
+        "current_json_output": parsed_response,
+        "iteration_count": state["iteration_count"] + 1,
+        "transform_models": list(state.get("transform_models") or []) + [model]
+    }
 
-    except json.JSONDecodeError as e:
-        error = ValidationError(
-            type="json_parse_error",
-            message=f"Failed to parse JSON from LLM response: {str(e)}",
-            severity=ErrorSeverity.CRITICAL,
-            field_path="root",
-            suggested_fix="Ensure the response is valid JSON format"
+    return result
+
+
+def _handle_patch_response(state: AgentState, response: dict, session_collector, model: str):
+    """Wendet den Patch an; None bedeutet Fallback auf vollständige Neugenerierung"""
+    operations = (response.get("parsed") or {}).get("operations") or []
+
+    try:
+        if not operations:
+            raise JsonPatchError("leerer Patch")
+        patched = apply_patch(state['current_json_output'], operations)
+        violations = schema_errors(patched, state_target_schema(state)['schema'])
+        if violations:
+            raise JsonPatchError(f"Ergebnis verletzt das Schema: {'; '.join(violations[:3])}")
+
+    except JsonPatchError as e:
+        print(f"Patch repair failed ({e}) - falling back to full regeneration")
+        token_usage = response["raw"].usage_metadata or {}
+        session_collector.record_patch_attempt(
+            applied=False,
+            cost=calculate_openai_cost(token_usage, response_model(response, model),
+                                       cache_hit=response.get("cache_hit", False)),
+            input_tokens=token_usage.get('input_tokens', 0),
+            output_tokens=token_usage.get('output_tokens', 0)
         )
+        return None
+
+    print(f"Applied {len(operations)} patch operations")
+    session_collector.record_patch_attempt(applied=True)
+    return _handle_transform_response(state, {**response, "parsed": patched}, session_collector, model)
+
+
+def _budget_exhausted_result(state: AgentState, e: BudgetExceededError) -> dict:
+    # Kein weiterer Aufruf; das letzte JSON bleibt das Ergebnis
+    print(f"Skipping transform: {e}")
+    return {"budget_exhausted": True}
+
+
+def _transform_error_result(state: AgentState, e: json.JSONDecodeError, model: str) -> dict:
+    error = ValidationError(
+        type="json_parse_error",
+        message=f"Failed to parse JSON from LLM response: {str(e)}",
+        severity=ErrorSeverity.CRITICAL,
+        field_path="root",
+        suggested_fix="Ensure the response is valid JSON format"
+    )
 
-        result = {
-            **state,
-            "validation_errors": [error],
-            "iteration_count": state["iteration_count"] + 1
-        }
+    result = {
+        "validation_errors": [error],
+        "iteration_count": state["iteration_count"] + 1,
+        "transform_models": list(state.get("transform_models") or []) + [model]
+    }
 
-        return result
\ No newline at end of file
+    return result
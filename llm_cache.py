@@ -0,0 +1,213 @@
+import asyncio
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, Optional
+
+from langchain_core.messages import AIMessage
+
+from budget import enforce_budget
+from llm_manager import llm_manager
+from utils.token_estimation import token_estimator
+
+
+class LLMResponseCache:
+    """
+    Persistenter Cache für Structured-Output-Antworten.
+
+    Schlüssel ist ein SHA-256 über (model, temperature, prompt, schema); identische
+    Aufrufe werden über Läufe hinweg aus einer einzelnen SQLite-Datei beantwortet.
+    Eviction: Einträge älter als max_age_seconds und - falls die Datei zu groß wird -
+    die am längsten nicht gelesenen Einträge (LRU) über max_entries / max_bytes hinaus.
+    """
+
+    EVICT_EVERY_N_PUTS = 100
+
+    def __init__(self, db_path: str = "llm_cache.db", max_entries: int = 20_000,
+                 max_bytes: int = 200 * 1024 * 1024, max_age_seconds: float = 30 * 24 * 3600):
+        self.db_path = db_path
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.max_age_seconds = max_age_seconds
+        self.enabled = True
+
+        self._conn = None
+        self._lock = threading.Lock()
+        self._puts_since_eviction = 0
+
+    @staticmethod
+    def make_key(model: str, temperature: Optional[float], prompt: str, schema: Any) -> str:
+        payload = json.dumps([model, temperature, prompt, schema], sort_keys=True, ensure_ascii=False)
+        return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+    def _connection(self) -> sqlite3.Connection:
+        # Lazy öffnen, damit ein Import allein keine Datei anlegt
+        if self._conn is None:
+            self._conn = sqlite3.connect(self.db_path, check_same_thread=False)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute('''
+                CREATE TABLE IF NOT EXISTS llm_cache (
+                    key TEXT PRIMARY KEY,
+                    model TEXT,
+                    parsed TEXT,
+                    usage TEXT,
+                    size INTEGER,
+                    created_at REAL,
+                    last_access REAL
+                )
+            ''')
+            self._conn.execute("CREATE INDEX IF NOT EXISTS idx_llm_cache_last_access ON llm_cache(last_access)")
+            self._conn.commit()
+            self._evict_locked()
+        return self._conn
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """Gibt {"parsed", "usage"} zurück oder None bei Miss / abgelaufenem Eintrag"""
+        if not self.enabled:
+            return None
+
+        with self._lock:
+            conn = self._connection()
+            row = conn.execute("SELECT parsed, usage, created_at FROM llm_cache WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                return None
+
+            parsed, usage, created_at = row
+            now = time.time()
+            if now - created_at > self.max_age_seconds:
+                conn.execute("DELETE FROM llm_cache WHERE key = ?", (key,))
+                conn.commit()
+                return None
+
+            conn.execute("UPDATE llm_cache SET last_access = ? WHERE key = ?", (now, key))
+            conn.commit()
+
+        return {'parsed': json.loads(parsed), 'usage': json.loads(usage)}
+
+    def put(self, key: str, model: str, parsed: Any, usage: Optional[Dict]):
+        if not self.enabled:
+            return
+
+        parsed_json = json.dumps(parsed, ensure_ascii=False)
+        usage_json = json.dumps(dict(usage or {}))
+        now = time.time()
+
+        with self._lock:
+            conn = self._connection()
+            conn.execute('''
+                INSERT OR REPLACE INTO llm_cache (key, model, parsed, usage, size, created_at, last_access)
+                VALUES (?, ?, ?, ?, ?, ?, ?)
+            ''', (key, model, parsed_json, usage_json, len(parsed_json) + len(usage_json), now, now))
+            conn.commit()
+
+            self._puts_since_eviction += 1
+            if self._puts_since_eviction >= self.EVICT_EVERY_N_PUTS:
+                self._evict_locked()
+
+    def evict(self):
+        with self._lock:
+            self._connection()
+            self._evict_locked()
+
+    def _evict_locked(self):
+        conn = self._conn
+        self._puts_since_eviction = 0
+
+        # 1. Alter
+        conn.execute("DELETE FROM llm_cache WHERE created_at < ?", (time.time() - self.max_age_seconds,))
+
+        # 2. Anzahl (LRU)
+        conn.execute('''
+            DELETE FROM llm_cache WHERE key IN (
+                SELECT key FROM llm_cache ORDER BY last_access DESC LIMIT -1 OFFSET ?
+            )
+        ''', (self.max_entries,))
+
+        # 3. Größe (LRU)
+        total_size = conn.execute("SELECT COALESCE(SUM(size), 0) FROM llm_cache").fetchone()[0]
+        if total_size > self.max_bytes:
+            excess = total_size - self.max_bytes
+            rows = conn.execute("SELECT key, size FROM llm_cache ORDER BY last_access ASC").fetchall()
+            doomed = []
+            for key, size in rows:
+                if excess <= 0:
+                    break
+                doomed.append((key,))
+                excess -= size
+            conn.executemany("DELETE FROM llm_cache WHERE key = ?", doomed)
+
+        conn.commit()
+
+    def close(self):
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+
+def cached_structured_invoke(structured_llm, prompt: str, model: str, temperature: Optional[float],
+                             schema: Any, session_collector=None) -> Dict[str, Any]:
+    """
+    Wie structured_llm.invoke(prompt) (include_raw=True), aber über den Response-Cache.
+    Bei einem Treffer enthält die Antwort "cache_hit": True und eine Usage von 0 Tokens.
+    Vor einem echten Aufruf wird das Budget geprüft (BudgetExceededError).
+    """
+    key = llm_cache.make_key(model, temperature, prompt, schema)
+    cached = llm_cache.get(key)
+    if session_collector is not None:
+        session_collector.record_cache_lookup(hit=cached is not None)
+    if cached is not None:
+        return _cached_response(cached)
+
+    enforce_budget(session_collector, model, prompt, schema)
+    start = time.time()
+    response = structured_llm.invoke(prompt)
+    llm_manager.record_call(model, response, time.time() - start)
+    _store_response(key, model, response, schema)
+    return response
+
+
+async def acached_structured_invoke(structured_llm, prompt: str, model: str, temperature: Optional[float],
+                                    schema: Any, session_collector=None) -> Dict[str, Any]:
+    # SQLite-Zugriffe (blockierend, unter dem Lock des Caches) im Thread-Pool, nicht im Event-Loop
+    key = llm_cache.make_key(model, temperature, prompt, schema)
+    cached = await asyncio.to_thread(llm_cache.get, key)
+    if session_collector is not None:
+        session_collector.record_cache_lookup(hit=cached is not None)
+    if cached is not None:
+        return _cached_response(cached)
+
+    enforce_budget(session_collector, model, prompt, schema)
+    start = time.time()
+    response = await structured_llm.ainvoke(prompt)
+    llm_manager.record_call(model, response, time.time() - start)
+    await asyncio.to_thread(_store_response, key, model, response, schema)
+    return response
+
+
+def _cached_response(cached: Dict[str, Any]) -> Dict[str, Any]:
+    raw = AIMessage(
+        content="",
+        usage_metadata={'input_tokens': 0, 'output_tokens': 0, 'total_tokens': 0},
+        response_metadata={'cached_usage': cached['usage']}
+    )
+    return {'raw': raw, 'parsed': cached['parsed'], 'parsing_error': None, 'cache_hit': True}
+
+
+def _store_response(key: str, model: str, response: Dict[str, Any], schema: Any = None):
+    # Beobachtete Ausgabelänge für die Budget-Schätzung der nächsten Aufrufe
+    usage = getattr(response.get('raw'), 'usage_metadata', None) or {}
+    token_estimator.observe_output(schema.get("name") if isinstance(schema, dict) else None,
+                                   usage.get('output_tokens', 0))
+
+    # Nur erfolgreich geparste Antworten cachen
+    if response.get('parsing_error') is not None or response.get('parsed') is None:
+        return
+    llm_cache.put(key, model, response['parsed'], getattr(response.get('raw'), 'usage_metadata', None))
+
+
+# Global instance
+llm_cache = LLMResponseCache(os.environ.get("VALILOOP_LLM_CACHE", "llm_cache.db"))
@@ -1,12 +1,36 @@
+import argparse
+import asyncio
 import json
 import os
+import time
 import uuid
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Optional
+
 from langgraph.checkpoint.sqlite import SqliteSaver
+from langgraph.checkpoint.sqlite.aio import AsyncSqliteSaver
+from batch_manifest import BatchManifest
+from budget import batch_ledger, budget_limits
+from checkpoint_serde import checkpoint_serializer
 from create_json_processing_graph import create_json_processing_graph
+from experiment_writer import experiment_writer
 from data_moduels.validation_mode import ValidationMode
-from shared_session_collector import session_collector
-
-def main():
+from data_moduels.matching_mode import MatchingMode
+from data_moduels.repair_mode import RepairMode
+from data_moduels.validator_strategy import ValidatorStrategy
+from input_store import input_store
+from llm_cache import llm_cache
+from llm_manager import llm_manager
+from metrics_schema import ensure_metrics_schema
+from session_collector import SessionCollector
+from shared_session_collector import (register_session_collector, release_session_collector, session_context,
+                                      global_totals, reset_global_totals)
+
+def main(workers: int = 1, use_async: bool = False,
+         validator_strategy: ValidatorStrategy = ValidatorStrategy.SECTIONED,
+         matching_mode: MatchingMode = MatchingMode.GREEDY,
+         repair_mode: RepairMode = RepairMode.FULL, stream_transform: bool = False,
+         pre_validate: bool = False, checkpoint_path: str = None):
     # Create graph
     graph = create_json_processing_graph()
 
@@ -14,72 +38,370 @@ def main():
     with open('assets/output_schema.json', 'r', encoding='utf-8') as f:
         recipe_schema = json.load(f)
 
-    with SqliteSaver.from_conn_string(":memory:") as checkpointer:
-        app = graph.compile(checkpointer=checkpointer)
-
-        # Test both validation modes
-        test_cases = [
-            #("automatic", ValidationMode.AUTOMATIC),
-            ("human", ValidationMode.HUMAN)
-        ]
+    # Test both validation modes
+    test_cases = [
+        #("automatic", ValidationMode.AUTOMATIC),
+        ("human", ValidationMode.HUMAN)
+    ]
+
+    # Alle Rezepte aus assets/recipes/ laden
+    recipes_dir = 'assets/recipes'
+    recipe_files = [f for f in os.listdir(recipes_dir) if f.endswith('.txt')]
+    #recipe_files = ['erbsencremesuppe.txt']
+    print(f"Gefundene Rezepte: {recipe_files}")
+    recipe_paths = [os.path.join(recipes_dir, recipe_file) for recipe_file in recipe_files]
+
+    # Das GUI-Feedback (Tkinter) kann nicht parallel laufen
+    if workers > 1 and any(mode == ValidationMode.HUMAN for _, mode in test_cases):
+        print("HUMAN mode benötigt Eingaben im Hauptthread - verwende --workers 1")
+        workers = 1
+
+    # Experiment-Optionen, die unverändert in den Graph-Input jeder Session gehen
+    run_options = {
+        "validator_strategy": validator_strategy,
+        "matching_mode": matching_mode,
+        "repair_mode": repair_mode,
+        "stream_transform": stream_transform,
+        "pre_validate": pre_validate,
+    }
+
+    # Dauerhafte Checkpoints: abgeschlossene Rezepte überspringen, unterbrochene fortsetzen
+    manifest = None
+    if checkpoint_path:
+        manifest = BatchManifest(checkpoint_path, BatchManifest.make_run_key(test_cases, run_options, recipe_schema))
+        print(f"Checkpoints: {checkpoint_path} {manifest.counts() or '(neu)'}")
+
+    # Batch-Budget gilt pro Aufruf von main
+    batch_ledger.reset()
+    llm_manager.model_stats.reset()
+    reset_global_totals()
+    batch_start = time.time()
+
+    if use_async:
+        recipe_stats = asyncio.run(_run_batch_async(graph, recipe_schema, recipe_paths, test_cases, workers,
+                                                    run_options, checkpoint_path, manifest))
+    else:
+        recipe_stats = _run_batch(graph, recipe_schema, recipe_paths, test_cases, workers, run_options,
+                                  checkpoint_path, manifest)
 
-        # Alle Rezepte aus assets/recipes/ laden
-        recipes_dir = 'assets/recipes'
-        recipe_files = [f for f in os.listdir(recipes_dir) if f.endswith('.txt')]
-        #recipe_files = ['erbsencremesuppe.txt']
-        print(f"Gefundene Rezepte: {recipe_files}")
+    print_batch_report(recipe_stats, time.time() - batch_start, workers)
 
-        for recipe_file in recipe_files:
-            recipe_name = recipe_file[:-4]  # Entferne .txt Extension
-            recipe_path = os.path.join(recipes_dir, recipe_file)
+    # Final Export und Analysis
+    print(f"\n{'='*50}")
+    print("FINAL ANALYSIS")
+    print(f"{'='*50}")
 
-            # Rezept-Text laden
-            with open(recipe_path, 'r', encoding='utf-8') as f:
-                recipe_text = f.read()
+    #session_collector.export_to_sqlite("experiment_results.db")
+    #session_collector.export_to_json("experiment_results.json")
+    # Ausstehende Exporte schreiben, bevor die Analyse die DB liest
+    experiment_writer.close()
+    show_basic_analysis()
 
-            print(f"\n{'='*60}")
-            print(f"VERARBEITE REZEPT: {recipe_name}")
-            print(f"{'='*60}")
 
-            # Eine Session pro Rezept starten
-            session_id = str(uuid.uuid4())
-            session_collector.start_session(session_id, recipe_text, recipe_name)
+def _run_batch(graph, recipe_schema: dict, recipe_paths: list, test_cases: list, workers: int,
+               run_options: dict = None, checkpoint_path: str = None, manifest: BatchManifest = None) -> list:
+    """Synchroner Batch: ein Thread pro gleichzeitig laufendem Rezept"""
+    recipe_stats = []
 
-            for test_name, validation_mode in test_cases:
-                print(f"\n{'='*50}")
-                print(f"Testing {test_name.upper()} validation mode für {recipe_name}")
-                print(f"{'='*50}")
+    with SqliteSaver.from_conn_string(checkpoint_path or ":memory:") as checkpointer:
+        checkpointer.serde = checkpoint_serializer
+        app = graph.compile(checkpointer=checkpointer)
 
-                config = {"configurable": {"thread_id": f"{session_id}_{validation_mode.value}"}}
+        if workers > 1:
+            with ThreadPoolExecutor(max_workers=workers) as executor:
+                futures = [
+                    executor.submit(_guarded_process_recipe, app, recipe_schema, recipe_path, test_cases,
+                                    run_options, manifest)
+                    for recipe_path in recipe_paths
+                ]
+                for future in as_completed(futures):
+                    recipe_stats.append(future.result())
+        else:
+            for recipe_path in recipe_paths:
+                recipe_stats.append(_guarded_process_recipe(app, recipe_schema, recipe_path, test_cases,
+                                                            run_options, manifest))
+
+    # Bereits abgeschlossene (übersprungene) Rezepte zählen nicht zum Durchsatz
+    return [stat for stat in recipe_stats if stat is not None]
+
+
+async def _run_batch_async(graph, recipe_schema: dict, recipe_paths: list, test_cases: list, workers: int,
+                           run_options: dict = None, checkpoint_path: str = None,
+                           manifest: BatchManifest = None) -> list:
+    """Async Batch: alle Sessions teilen sich einen Event-Loop, begrenzt durch eine Semaphore"""
+    semaphore = asyncio.Semaphore(workers)
+
+    async with AsyncSqliteSaver.from_conn_string(checkpoint_path or ":memory:") as checkpointer:
+        checkpointer.serde = checkpoint_serializer
+        app = graph.compile(checkpointer=checkpointer)
 
-                result = app.invoke({
-                    "recipe_name": recipe_name,
-                    "raw_text": recipe_text,
-                    "text": recipe_text,
-                    "target_schema": recipe_schema,
-                    "domain": "recipe",
-                    "validation_mode": validation_mode,
-                    "max_iterations": 3
-                }, config)
+        async def bounded(recipe_path: str) -> dict:
+            async with semaphore:
+                recipe_start = time.time()
+                try:
+                    return await aprocess_recipe(app, recipe_schema, recipe_path, test_cases, run_options,
+                                                 manifest)
+                except Exception as e:
+                    # Nur dieses Rezept ist fehlgeschlagen; die übrigen Tasks laufen weiter
+                    return _failed_recipe(recipe_path, e, recipe_start)
+
+        recipe_stats = await asyncio.gather(*(bounded(recipe_path) for recipe_path in recipe_paths))
+        return [stat for stat in recipe_stats if stat is not None]
+
+
+def _guarded_process_recipe(app, recipe_schema: dict, recipe_path: str, test_cases: list,
+                            run_options: dict = None, manifest: BatchManifest = None) -> Optional[dict]:
+    """process_recipe(), ein Fehler beendet nur dieses Rezept und nicht den ganzen Batch"""
+    recipe_start = time.time()
+    try:
+        return process_recipe(app, recipe_schema, recipe_path, test_cases, run_options, manifest)
+    except Exception as e:
+        return _failed_recipe(recipe_path, e, recipe_start)
+
+
+def _failed_recipe(recipe_path: str, error: Exception, recipe_start: float) -> dict:
+    # Mit Manifest bleibt das Rezept "running" und wird beim nächsten Lauf fortgesetzt
+    recipe_name = os.path.basename(recipe_path)[:-4]
+    print(f"\nREZEPT FEHLGESCHLAGEN: {recipe_name} ({type(error).__name__}: {error})")
+    return {'recipe_name': recipe_name, 'latency': time.time() - recipe_start,
+            'error': f"{type(error).__name__}: {error}"}
+
+
+def process_recipe(app, recipe_schema: dict, recipe_path: str, test_cases: list,
+                   run_options: dict = None, manifest: BatchManifest = None) -> Optional[dict]:
+    """Verarbeitet ein Rezept in allen Modi mit eigenem SessionCollector (None: bereits abgeschlossen)"""
+    session = _open_recipe_session(recipe_path, manifest)
+    if session is None:
+        return None
+    recipe_name, recipe_text, session_id, session_collector = session
+    # Text und Schema einmal ablegen; der State trägt nur die Referenzen
+    input_refs = (input_store.put(recipe_text), input_store.put(recipe_schema))
+
+    recipe_hash = BatchManifest.recipe_hash(recipe_text)
+    all_exported = True
+
+    recipe_start = time.time()
+    try:
+        with session_context(session_collector):
+            for test_name, validation_mode in test_cases:
+                _print_mode_header(test_name, recipe_name)
+
+                config = _graph_config(session_id, validation_mode)
+                exported = _restore_mode(session_collector, validation_mode, manifest, recipe_hash)
+                snapshot = app.get_state(config)
+                if _mode_finished(snapshot):
+                    result = snapshot.values
+                elif manifest is None:
+                    result = app.invoke(
+                        _graph_input(recipe_name, *input_refs, validation_mode, run_options, snapshot),
+                        config
+                    )
+                else:
+                    # Metriken nach jedem Schritt sichern, damit ein fortgesetzter Modus sie weiterführt
+                    # (auch bei Abbruch: erfolgreiche Knoten eines abgebrochenen Schritts hält der Checkpointer)
+                    try:
+                        for _ in app.stream(
+                                _graph_input(recipe_name, *input_refs, validation_mode, run_options, snapshot),
+                                config, stream_mode="updates"):
+                            manifest.save_mode(recipe_hash, validation_mode.name,
+                                               session_collector.mode_snapshot(validation_mode))
+                    finally:
+                        manifest.save_mode(recipe_hash, validation_mode.name,
+                                           session_collector.mode_snapshot(validation_mode))
+                    result = app.get_state(config).values
+
+                _print_result(result, test_name, recipe_name)
+                if not exported:
+                    all_exported &= _export_mode(session_collector, validation_mode, manifest, recipe_hash)
+
+        latency = time.time() - recipe_start
+        _close_recipe_session(session_collector, recipe_name, recipe_hash, manifest, all_exported)
+    finally:
+        input_store.release(*input_refs)
+        release_session_collector(session_id)
+
+    return {'recipe_name': recipe_name, 'latency': latency}
+
+
+async def aprocess_recipe(app, recipe_schema: dict, recipe_path: str, test_cases: list,
+                          run_options: dict = None, manifest: BatchManifest = None) -> Optional[dict]:
+    """Async-Variante von process_recipe() über app.ainvoke"""
+    session = _open_recipe_session(recipe_path, manifest)
+    if session is None:
+        return None
+    recipe_name, recipe_text, session_id, session_collector = session
+    # Text und Schema einmal ablegen; der State trägt nur die Referenzen
+    input_refs = (input_store.put(recipe_text), input_store.put(recipe_schema))
+
+    recipe_hash = BatchManifest.recipe_hash(recipe_text)
+    all_exported = True
+
+    recipe_start = time.time()
+    try:
+        # Jeder asyncio-Task hat seinen eigenen Kontext - die Sessions sehen sich nicht gegenseitig
+        with session_context(session_collector):
+            for test_name, validation_mode in test_cases:
+                _print_mode_header(test_name, recipe_name)
+
+                config = _graph_config(session_id, validation_mode)
+                exported = _restore_mode(session_collector, validation_mode, manifest, recipe_hash)
+                snapshot = await app.aget_state(config)
+                if _mode_finished(snapshot):
+                    result = snapshot.values
+                elif manifest is None:
+                    result = await app.ainvoke(
+                        _graph_input(recipe_name, *input_refs, validation_mode, run_options, snapshot),
+                        config
+                    )
+                else:
+                    # Metriken nach jedem Schritt sichern, damit ein fortgesetzter Modus sie weiterführt
+                    # (auch bei Abbruch: erfolgreiche Knoten eines abgebrochenen Schritts hält der Checkpointer)
+                    try:
+                        async for _ in app.astream(
+                                _graph_input(recipe_name, *input_refs, validation_mode, run_options, snapshot),
+                                config, stream_mode="updates"):
+                            await asyncio.to_thread(manifest.save_mode, recipe_hash, validation_mode.name,
+                                                    session_collector.mode_snapshot(validation_mode))
+                    finally:
+                        manifest.save_mode(recipe_hash, validation_mode.name,
+                                           session_collector.mode_snapshot(validation_mode))
+                    result = (await app.aget_state(config)).values
+
+                _print_result(result, test_name, recipe_name)
+                if not exported:
+                    all_exported &= await asyncio.to_thread(
+                        _export_mode, session_collector, validation_mode, manifest, recipe_hash
+                    )
+
+        latency = time.time() - recipe_start
+        _close_recipe_session(session_collector, recipe_name, recipe_hash, manifest, all_exported)
+    finally:
+        input_store.release(*input_refs)
+        release_session_collector(session_id)
+
+    return {'recipe_name': recipe_name, 'latency': latency}
+
+
+def _open_recipe_session(recipe_path: str, manifest: BatchManifest = None) -> Optional[tuple]:
+    recipe_name = os.path.basename(recipe_path)[:-4]  # Entferne .txt Extension
+
+    # Rezept-Text laden
+    with open(recipe_path, 'r', encoding='utf-8') as f:
+        recipe_text = f.read()
+
+    # Eine Session pro Rezept starten; mit Manifest behält ein unterbrochenes Rezept seine session_id
+    session_id, resumed = str(uuid.uuid4()), False
+    if manifest is not None:
+        entry = manifest.begin(BatchManifest.recipe_hash(recipe_text), recipe_name)
+        if entry is None:
+            print(f"Rezept {recipe_name} bereits abgeschlossen - übersprungen")
+            return None
+        session_id, resumed = entry
+
+    print(f"\n{'='*60}")
+    print(f"VERARBEITE REZEPT: {recipe_name}{' (fortgesetzt)' if resumed else ''}")
+    print(f"{'='*60}")
+
+    session_collector = SessionCollector()
+    session_collector.start_session(session_id, recipe_text, recipe_name)
+    register_session_collector(session_id, session_collector)
+
+    return recipe_name, recipe_text, session_id, session_collector
+
+
+def _restore_mode(session_collector: SessionCollector, validation_mode: ValidationMode,
+                  manifest: BatchManifest = None, recipe_hash: str = None) -> bool:
+    """Übernimmt die gesicherten Metriken eines fortgesetzten Modus; True, wenn er bereits exportiert ist"""
+    saved = manifest.load_mode(recipe_hash, validation_mode.name) if manifest is not None else None
+    if saved is None:
+        return False
+    status, metrics = saved
+    session_collector.restore_mode(validation_mode, metrics)
+    return status == 'exported'
+
+
+def _export_mode(session_collector: SessionCollector, validation_mode: ValidationMode,
+                 manifest: BatchManifest = None, recipe_hash: str = None) -> bool:
+    """Exportiert einen abgeschlossenen Modus; mit Manifest erst nach dem Commit als exportiert vermerkt"""
+    # Nur Momentaufnahme; SQLite und JSONL schreibt der experiment_writer im Hintergrund
+    experiment_writer.submit(session_collector.export_records(validation_mode))
+    if manifest is None:
+        return True
+    if not experiment_writer.flush():
+        return False
+    manifest.mode_exported(recipe_hash, validation_mode.name)
+    return True
+
+
+def _close_recipe_session(session_collector: SessionCollector, recipe_name: str, recipe_hash: str = None,
+                          manifest: BatchManifest = None, all_exported: bool = True):
+    # Ein Rezept mit nicht exportierten Modi bleibt "running" und wird im nächsten Lauf nachgeholt
+    if manifest is not None:
+        if all_exported:
+            manifest.finish(recipe_hash)
+        else:
+            print(f"Metriken von {recipe_name} nicht vollständig exportiert - Rezept bleibt offen")
+
+    print_session_summary(session_collector, recipe_name)
+
+
+def _graph_input(recipe_name: str, raw_text_ref: str, target_schema_ref: str, validation_mode: ValidationMode,
+                 run_options: dict = None, snapshot=None) -> Optional[dict]:
+    # Unterbrochener Lauf: None setzt den Graph am letzten Checkpoint fort (keine erneuten LLM-Aufrufe)
+    if snapshot is not None and snapshot.next:
+        return None
+
+    return {
+        "recipe_name": recipe_name,
+        "raw_text_ref": raw_text_ref,
+        "target_schema_ref": target_schema_ref,
+        "domain": "recipe",
+        "validation_mode": validation_mode,
+        "validator_strategy": ValidatorStrategy.SECTIONED,
+        "matching_mode": MatchingMode.GREEDY,
+        "repair_mode": RepairMode.FULL,
+        "stream_transform": False,
+        "pre_validate": False,
+        "max_iterations": 3,
+        **(run_options or {})
+    }
+
+
+def _mode_finished(snapshot) -> bool:
+    """Modus wurde in einem früheren Lauf bereits bis zum Finalizer ausgeführt"""
+    return not snapshot.next and snapshot.values.get("final_output") is not None
+
+
+def _graph_config(session_id: str, validation_mode: ValidationMode) -> dict:
+    return {"configurable": {
+        "thread_id": f"{session_id}_{validation_mode.value}",
+        "session_id": session_id
+    }}
+
+
+def _print_mode_header(test_name: str, recipe_name: str):
+    print(f"\n{'='*50}")
+    print(f"Testing {test_name.upper()} validation mode für {recipe_name}")
+    print(f"{'='*50}")
 
-                print(f"\n=== FINAL RESULT ({test_name}) ===")
-                print(json.dumps(result["final_output"], indent=2, ensure_ascii=False))
 
-                print(f"\n=== PROCESSING DETAILS ===")
-                print(f"Recipe: {recipe_name}")
-                print(f"Iterations used: {result.get('iteration_count', 0)}")
-                print(f"Quality Score: {result.get('quality_score', 0):.2f}")
+def _print_result(result: dict, test_name: str, recipe_name: str):
+    print(f"\n=== FINAL RESULT ({test_name}) ===")
+    print(json.dumps(result["final_output"], indent=2, ensure_ascii=False))
 
-                if result.get('validation_errors'):
-                    print(f"\nRemaining Issues ({len(result['validation_errors'])}):")
-                    for error in result['validation_errors']:
-                        severity = error.severity.upper() if isinstance(error.severity, str) else error.severity.value
-                        print(f"- {severity}: {error.message}")
+    print(f"\n=== PROCESSING DETAILS ===")
+    print(f"Recipe: {recipe_name}")
+    print(f"Iterations used: {result.get('iteration_count', 0)}")
+    print(f"Quality Score: {result.get('quality_score', 0):.2f}")
 
+    if result.get('validation_errors'):
+        print(f"\nRemaining Issues ({len(result['validation_errors'])}):")
+        for error in result['validation_errors']:
+            severity = error.severity.upper() if isinstance(error.severity, str) else error.severity.value
+            print(f"- {severity}: {error.message}")
 
-            session_collector.export_to_sqlite("experiment_results.db")
-            session_collector.export_to_json(json_path= recipe_name + "_" + str(validation_mode.value) + ".json")
 
+def print_session_summary(session_collector: SessionCollector, recipe_name: str):
     # Session Summary für aktuelles Rezept
     print(f"\n=== SESSION SUMMARY für {recipe_name} ===")
     summary = session_collector.get_summary()
@@ -95,8 +417,22 @@ def main():
         print(f"  Tokens: {auto['input_tokens']}/{auto['output_tokens']}")
         print(f"  Cost: ${auto['total_cost']:.4f}")
         print(f"  Time: {total_time:.2f}s")
-        print(f"  Iterations: {auto['iterations']}")
+        print(f"  Iterations: {auto['iterations']} (stop: {auto['stop_reason']}, saved: {auto['iterations_saved']})")
+        print(f"  Transform Models: {' -> '.join(auto['transform_models'])}")
+        if auto['budget_exceeded']:
+            print(f"  Budget exceeded: {auto['budget_exceeded']}")
         print(f"  Final F1 (Mikro): {final_f1:.4f}")
+        print(f"  Validation ({auto['validator_strategy']}): {auto['validation_calls']} calls, "
+              f"Tokens {auto['validation_input_tokens']}/{auto['validation_output_tokens']}, "
+              f"Time {auto['validation_time']:.2f}s")
+        print(f"  Patch Repairs: {auto['patch_repairs']} applied / {auto['patch_fallbacks']} fallbacks")
+        print(f"  Re-Validation skipped: {sum(auto['skipped_validation_calls'])} calls, "
+              f"{sum(auto['saved_validation_tokens'])} tokens saved")
+        print(f"  Pre-Validation: {sum(auto['prevalidated_sections'])} sections without LLM call")
+        print(f"  Early Validation (streaming): {auto['early_validations']} sections, "
+              f"{auto['early_validation_overlap']:.2f}s overlapped with transform")
+        print(f"  LLM Cache: {auto['cache_hits']} hits / {auto['cache_misses']} misses")
+        print(f"  Runnable Setup: {auto['setup_time'] * 1000:.1f}ms (gespart: {auto['setup_time_saved'] * 1000:.1f}ms)")
 
         # Optional: Zeige Entwicklung über Iterationen
         if len(auto['overall_f1']) > 1:
@@ -114,22 +450,60 @@ def main():
         print(f"  Tokens: {human['input_tokens']}/{human['output_tokens']}")
         print(f"  Cost: ${human['total_cost']:.4f}")
         print(f"  Time: {total_time:.2f}s")
-        print(f"  Iterations: {human['iterations']}")
+        print(f"  Iterations: {human['iterations']} (stop: {human['stop_reason']}, saved: {human['iterations_saved']})")
+        print(f"  Transform Models: {' -> '.join(human['transform_models'])}")
+        if human['budget_exceeded']:
+            print(f"  Budget exceeded: {human['budget_exceeded']}")
         print(f"  Final F1 (Mikro): {final_f1:.4f}")
+        print(f"  LLM Cache: {human['cache_hits']} hits / {human['cache_misses']} misses")
+        print(f"  Runnable Setup: {human['setup_time'] * 1000:.1f}ms (gespart: {human['setup_time_saved'] * 1000:.1f}ms)")
 
         # Optional: Zeige Entwicklung über Iterationen
         if len(human['overall_f1']) > 1:
             f1_scores = ', '.join([f"{x:.3f}" for x in human['overall_f1']])
             print(f"  F1 Evolution: [{f1_scores}]")
 
-    # Final Export und Analysis
-    print(f"\n{'='*50}")
-    print("FINAL ANALYSIS")
-    print(f"{'='*50}")
 
-    #session_collector.export_to_sqlite("experiment_results.db")
-    #session_collector.export_to_json("experiment_results.json")
-    show_basic_analysis()
+def print_batch_report(recipe_stats: list, wall_time: float, workers: int):
+    """Durchsatz des gesamten Batches und Latenz pro Rezept"""
+    failed = [stat for stat in recipe_stats if stat.get('error')]
+    recipe_stats = [stat for stat in recipe_stats if not stat.get('error')]
+
+    print(f"\n{'='*60}")
+    print(f"BATCH REPORT ({len(recipe_stats)} Rezepte, {len(failed)} fehlgeschlagen, {workers} Worker)")
+    print(f"{'='*60}")
+
+    for stat in failed:
+        print(f"  FEHLGESCHLAGEN: {stat['recipe_name']:<39} {stat['error']}")
+
+    if not recipe_stats:
+        print("Keine Rezepte verarbeitet.")
+        return
+
+    for stat in sorted(recipe_stats, key=lambda s: s['latency'], reverse=True):
+        print(f"  {stat['recipe_name']:<55} {stat['latency']:8.1f}s")
+
+    latencies = [stat['latency'] for stat in recipe_stats]
+    throughput = len(recipe_stats) / (wall_time / 60) if wall_time > 0 else 0.0
+    print("-" * 70)
+    print(f"  Wall time:      {wall_time:.1f}s")
+    print(f"  Throughput:     {throughput:.2f} recipes/min")
+    print(f"  Latency avg:    {sum(latencies) / len(latencies):.1f}s")
+    print(f"  Latency min/max: {min(latencies):.1f}s / {max(latencies):.1f}s")
+
+    # Globale Sicht: Summen aller Session-Collectors des Batches
+    totals = global_totals()
+    print(f"  Sessions:       {totals['sessions']} "
+          f"(Tokens {totals.get('input_tokens', 0)}/{totals.get('output_tokens', 0)}, "
+          f"Cost ${totals.get('total_cost', 0.0):.4f}, Iterations {totals.get('iterations', 0)})")
+
+    # Modell-Kaskade: echte Aufrufe (ohne Cache-Treffer) pro tatsächlich verwendetem Modell
+    model_stats = llm_manager.model_stats.snapshot()
+    if model_stats:
+        print("-" * 70)
+        for model, stats in sorted(model_stats.items()):
+            print(f"  {model:<28} {stats['calls']:4d} calls, avg {stats['avg_latency']:.1f}s, "
+                  f"${stats['cost']:.4f}")
 
 
 def show_basic_analysis():
@@ -137,18 +511,12 @@ def show_basic_analysis():
     import sqlite3
 
     conn = sqlite3.connect("experiment_results.db")
+    # Legt Schema und Views an, falls noch nicht vorhanden (übernimmt auch alte session_results)
+    ensure_metrics_schema(conn)
+    conn.commit()
     cursor = conn.cursor()
 
-    cursor.execute("""
-        SELECT validation_mode, 
-               COUNT(*) as sessions,
-               AVG(overall_f1) as avg_quality,
-               AVG(total_time) as avg_time,
-               SUM(total_cost) as total_cost,
-               AVG(iterations) as avg_iterations
-        FROM session_results 
-        GROUP BY validation_mode
-    """)
+    cursor.execute("SELECT * FROM v_mode_summary")
 
     print("\n" + "="*60)
     print("SESSION ANALYSIS:")
@@ -169,14 +537,67 @@ def show_basic_analysis():
             iter_str = f"{iterations:.1f}" if iterations is not None else "N/A"
             print(f"{mode_str}\t{sessions}\t\t{quality_str}\t\t{time_str}\t\t{cost_str}\t\t{iter_str}")
 
+    # Validierungs-Aufwand pro Iteration: sectioned (3 Aufrufe) vs. combined (1 Aufruf)
+    cursor.execute("SELECT * FROM v_validator_strategy")
+
+    rows = cursor.fetchall()
+    if rows:
+        print("\n" + "="*60)
+        print("VALIDATOR STRATEGY (pro Iteration):")
+        print("="*60)
+        print("Strategy\tSessions\tCalls\tInput Tok\tOutput Tok\tTime")
+        print("-" * 70)
+        for row in rows:
+            strategy, sessions, calls, input_tokens, output_tokens, time_per_iter = row
+            print(f"{strategy}\t{sessions}\t\t{calls:.1f}\t{input_tokens:.0f}\t\t{output_tokens:.0f}\t\t{time_per_iter:.1f}s")
+
+    # Matching-Modus des Scorings: greedy vs. optimal (finale F1 = letzte Iteration)
+    cursor.execute("SELECT * FROM v_matching_mode ORDER BY matching_mode")
+
+    rows = cursor.fetchall()
+    if rows:
+        print("\n" + "="*60)
+        print("MATCHING MODE (finale F1):")
+        print("="*60)
+        print("Mode\t\tSessions\tOverall\tIngredients\tSteps")
+        print("-" * 70)
+        for matching_mode, sessions, overall, ingredients, steps in rows:
+            print(f"{matching_mode}\t\t{sessions}\t\t{overall or 0.0:.3f}\t{ingredients or 0.0:.3f}\t\t{steps or 0.0:.3f}")
+
+    # Abbruchgründe der Schleife und dadurch eingesparte Iterationen
+    cursor.execute("SELECT * FROM v_stop_reasons")
+
+    rows = cursor.fetchall()
+    if rows:
+        print("\n" + "="*60)
+        print("STOP REASONS:")
+        print("="*60)
+        print("Mode		Reason			Sessions	Avg Iter	Saved Iter")
+        print("-" * 70)
+        for mode, stop_reason, sessions, iterations, saved in rows:
+            print(f"{mode}	{stop_reason:<16}	{sessions}		{iterations:.1f}		{saved}")
+
+    # Verlauf der Qualität über die Iterationen
+    cursor.execute("SELECT validation_mode, iteration, sessions, avg_f1 FROM v_convergence")
+
+    rows = cursor.fetchall()
+    if rows:
+        print("\n" + "="*60)
+        print("CONVERGENCE (F1 pro Iteration):")
+        print("="*60)
+        print("Mode\t\tIteration\tSessions\tAvg F1")
+        print("-" * 70)
+        for mode, iteration, sessions, avg_f1 in rows:
+            print(f"{mode}\t{iteration}\t\t{sessions}\t\t{avg_f1 or 0.0:.3f}")
+
     # # Session Details
     # print("\n" + "="*60)
     # print("SESSION DETAILS:")
     # print("="*60)
     #
     # cursor.execute("""
-    #     SELECT session_id, validation_mode, overall_f1, total_time, iterations
-    #     FROM session_results
+    #     SELECT session_id, validation_mode, final_f1, total_time, iterations
+    #     FROM sessions
     #     ORDER BY session_id, validation_mode
     # """)
     #
@@ -197,4 +618,94 @@ def show_basic_analysis():
 
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="ValiLoop Rezept-Batch")
+    parser.add_argument("--workers", type=int, default=1,
+                        help="Anzahl parallel verarbeiteter Rezepte (Default: 1); mit --rescore Anzahl der "
+                             "Scoring-Prozesse (1 = seriell, 0 = alle CPUs)")
+    parser.add_argument("--async", dest="use_async", action="store_true",
+                        help="Graph über ainvoke auf einem Event-Loop ausführen")
+    parser.add_argument("--validator", choices=[s.value for s in ValidatorStrategy],
+                        default=ValidatorStrategy.SECTIONED.value,
+                        help="sectioned: drei LLM-Prüfungen, combined: eine gemeinsame Prüfung")
+    parser.add_argument("--no-cache", dest="use_cache", action="store_false",
+                        help="LLM-Response-Cache (llm_cache.db) nicht verwenden")
+    parser.add_argument("--warm-up", dest="warm_up", action="store_true",
+                        help="LLM-Clients vor dem ersten Rezept aufbauen und verbinden")
+    parser.add_argument("--verify-scoring", dest="verify_scoring", action="store_true",
+                        help="Nur Regression SimilarityEngine vs. SequenceMatcher-Scoring ausführen")
+    parser.add_argument("--matching", choices=[m.value for m in MatchingMode],
+                        default=MatchingMode.GREEDY.value,
+                        help="greedy: erster Treffer, optimal: Assignment über die Ähnlichkeitsmatrix")
+    parser.add_argument("--repair", choices=[r.value for r in RepairMode],
+                        default=RepairMode.FULL.value,
+                        help="full: Reparatur erzeugt das ganze JSON neu, patch: nur JSON-Patch-Operationen")
+    parser.add_argument("--stream", dest="stream_transform", action="store_true",
+                        help="Transformer-Antwort streamen und fertige Abschnitte schon während der Generierung prüfen")
+    parser.add_argument("--pre-validate", dest="pre_validate", action="store_true",
+                        help="Lokaler Regel-Check vorab; unauffällige Abschnitte ohne LLM prüfen (nur sectioned)")
+    for scope in ("session", "recipe", "batch"):
+        parser.add_argument(f"--max-{scope}-cost", type=float, default=None,
+                            help=f"Kostenbudget (USD) pro {scope}; vor jedem LLM-Aufruf geschätzt geprüft")
+        parser.add_argument(f"--max-{scope}-tokens", type=int, default=None,
+                            help=f"Token-Budget (Input + Output) pro {scope}")
+    parser.add_argument("--no-cascade", dest="cascade", action="store_false",
+                        help="Transformer immer mit dem ersten Modell der Kaskade (keine Eskalation)")
+    parser.add_argument("--cascade-models", default="gpt-5-nano,gpt-5",
+                        help="Modelle der Kaskade, kommagetrennt vom günstigsten zum größten")
+    parser.add_argument("--escalate-after", type=int, default=2,
+                        help="Eskalieren, wenn Fehler nach so vielen Iterationen mit demselben Modell bestehen")
+    parser.add_argument("--rescore", action="store_true",
+                        help="Gespeicherte Iterations-Ausgaben ohne LLM neu bewerten (nur geänderte)")
+    parser.add_argument("--checkpoints", dest="checkpoint_path", default=None,
+                        help="Checkpoints in dieser SQLite-Datei speichern; ein Neustart überspringt "
+                             "abgeschlossene Rezepte und setzt unterbrochene fort")
+    parser.add_argument("--benchmark-checkpoints", dest="benchmark_checkpoints", action="store_true",
+                        help="Checkpoint-Größe und Schreibzeit: vollständiger State vs. Referenzen/partielle Updates")
+    parser.add_argument("--benchmark-errors", dest="benchmark_errors", action="store_true",
+                        help="Allokation und Serialisierung der ValidationErrors pro Iteration: pydantic vs. __slots__")
+    parser.add_argument("--columnar", dest="columnar_dir", default=None,
+                        help="Metriken zusätzlich als partitionierte Datasets in dieses Verzeichnis schreiben")
+    parser.add_argument("--columnar-format", choices=["parquet", "arrow"], default="parquet",
+                        help="Format des spaltenorientierten Exports (arrow: zero-copy lesbar per mmap)")
+    args = parser.parse_args()
+
+    if args.rescore:
+        from rescoring import rescore_outputs, rescored_summary
+        rescore_outputs(workers=args.workers if args.workers > 0 else None,
+                        matching_mode=MatchingMode(args.matching))
+        rescored_summary()
+        raise SystemExit(0)
+
+    if args.benchmark_checkpoints:
+        from utils.checkpoint_benchmark import run_checkpoint_benchmark
+        run_checkpoint_benchmark()
+        raise SystemExit(0)
+
+    if args.benchmark_errors:
+        from utils.validation_error_benchmark import run_validation_error_benchmark
+        run_validation_error_benchmark()
+        raise SystemExit(0)
+
+    if args.verify_scoring:
+        from utils.scoring_regression import run_scoring_regression
+        raise SystemExit(0 if run_scoring_regression() else 1)
+
+    llm_cache.enabled = args.use_cache
+    llm_manager.cascade.configure(enabled=args.cascade, escalate_after=args.escalate_after,
+                                  models=[m.strip() for m in args.cascade_models.split(',') if m.strip()])
+    budget_limits.configure(
+        session_cost=args.max_session_cost, session_tokens=args.max_session_tokens,
+        recipe_cost=args.max_recipe_cost, recipe_tokens=args.max_recipe_tokens,
+        batch_cost=args.max_batch_cost, batch_tokens=args.max_batch_tokens
+    )
+    experiment_writer.configure(columnar_dir=args.columnar_dir, columnar_format=args.columnar_format)
+    if args.warm_up:
+        llm_manager.warm_up()
+
+    main(workers=max(1, args.workers), use_async=args.use_async,
+         validator_strategy=ValidatorStrategy(args.validator),
+         matching_mode=MatchingMode(args.matching),
+         repair_mode=RepairMode(args.repair),
+         stream_transform=args.stream_transform,
+         pre_validate=args.pre_validate,
+         checkpoint_path=args.checkpoint_path)
\ No newline at end of file
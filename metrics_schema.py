@@ -0,0 +1,270 @@
+import sqlite3
+from typing import Dict, Iterable, List, Optional
+
+# Normalisiertes Schema der Experiment-Metriken: eine Zeile pro Session und Modus (sessions),
+# pro Iteration (iterations, alle Metriken als REAL) und pro Node-Ausführung (node_executions).
+# Iterationen zählen ab 0 wie in iteration_outputs (output_store).
+
+SCHEMA_VERSION = 1
+
+SESSION_COLUMNS = (
+    'session_id', 'validation_mode', 'recipe_name', 'timestamp',
+    'input_tokens', 'output_tokens', 'total_cost', 'total_time', 'iterations', 'raw_text_length', 'errors',
+    'validator_strategy', 'validation_calls', 'validation_input_tokens', 'validation_output_tokens',
+    'validation_time', 'cache_hits', 'cache_misses', 'setup_time', 'setup_time_saved', 'matching_mode',
+    'patch_repairs', 'patch_fallbacks', 'early_validations', 'early_validation_overlap',
+    'stop_reason', 'iterations_saved', 'budget_exceeded', 'final_f1',
+)
+
+# Pro Iteration erfasste Qualitätsmetriken (in session_results früher Komma-getrennte TEXT-Listen)
+METRIC_COLUMNS = (
+    'overall_f1', 'overall_precision', 'overall_recall',
+    'ingredients_f1', 'ingredients_precision', 'ingredients_recall',
+    'steps_f1', 'steps_precision', 'steps_recall',
+    'metadata_f1', 'metadata_precision', 'metadata_recall',
+)
+
+ITERATION_COLUMNS = (
+    ('session_id', 'validation_mode', 'iteration') + METRIC_COLUMNS
+    + ('skipped_validation_calls', 'saved_validation_tokens', 'prevalidated_sections', 'transform_model')
+)
+
+NODE_EXECUTION_COLUMNS = (
+    'session_id', 'validation_mode', 'iteration', 'node', 'started_at', 'duration',
+    'cost', 'input_tokens', 'output_tokens',
+)
+
+
+def _insert(table: str, columns: tuple) -> str:
+    return (f"INSERT OR REPLACE INTO {table} ({', '.join(columns)}) "
+            f"VALUES ({', '.join('?' for _ in columns)})")
+
+
+SESSION_INSERT = _insert('sessions', SESSION_COLUMNS)
+ITERATION_INSERT = _insert('iterations', ITERATION_COLUMNS)
+NODE_EXECUTION_INSERT = _insert('node_executions', NODE_EXECUTION_COLUMNS)
+
+
+def ensure_metrics_schema(conn: sqlite3.Connection):
+    """Legt Tabellen, Indizes und Views an und übernimmt einmalig eine alte session_results-Tabelle"""
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS sessions (
+            session_id TEXT,
+            validation_mode TEXT,
+            recipe_name TEXT,
+            timestamp TEXT,
+            input_tokens INTEGER,
+            output_tokens INTEGER,
+            total_cost REAL,
+            total_time REAL,
+            iterations INTEGER,
+            raw_text_length INTEGER,
+            errors TEXT,
+
+            -- Validierungs-Aufwand (sectioned vs. combined)
+            validator_strategy TEXT,
+            validation_calls INTEGER,
+            validation_input_tokens INTEGER,
+            validation_output_tokens INTEGER,
+            validation_time REAL,
+
+            -- LLM-Response-Cache und Setup der Structured-Output-Runnables
+            cache_hits INTEGER,
+            cache_misses INTEGER,
+            setup_time REAL,
+            setup_time_saved REAL,
+
+            matching_mode TEXT,
+            patch_repairs INTEGER,
+            patch_fallbacks INTEGER,
+            early_validations INTEGER,
+            early_validation_overlap REAL,
+            stop_reason TEXT,
+            iterations_saved INTEGER,
+            budget_exceeded TEXT,
+
+            -- F1 der letzten Iteration (vorberechnet, damit Auswertungen iterations nicht lesen müssen)
+            final_f1 REAL,
+            PRIMARY KEY (session_id, validation_mode)
+        )
+    ''')
+    conn.execute(f'''
+        CREATE TABLE IF NOT EXISTS iterations (
+            session_id TEXT,
+            validation_mode TEXT,
+            iteration INTEGER,
+            {', '.join(f'{column} REAL' for column in METRIC_COLUMNS)},
+            skipped_validation_calls INTEGER,
+            saved_validation_tokens INTEGER,
+            prevalidated_sections INTEGER,
+            transform_model TEXT,
+            PRIMARY KEY (session_id, validation_mode, iteration)
+        )
+    ''')
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS node_executions (
+            session_id TEXT,
+            validation_mode TEXT,
+            iteration INTEGER,
+            node TEXT,
+            started_at REAL,
+            duration REAL,
+            cost REAL,
+            input_tokens INTEGER,
+            output_tokens INTEGER,
+            PRIMARY KEY (session_id, validation_mode, iteration, node)
+        )
+    ''')
+
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_sessions_recipe ON sessions(recipe_name)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_sessions_mode ON sessions(validation_mode, stop_reason)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_sessions_timestamp ON sessions(timestamp)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_iterations_mode ON iterations(validation_mode, iteration)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_node_executions_node ON node_executions(node, validation_mode)")
+
+    _create_views(conn)
+
+    if conn.execute("PRAGMA user_version").fetchone()[0] < SCHEMA_VERSION:
+        migrate_session_results(conn)
+        conn.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+
+
+def _create_views(conn: sqlite3.Connection):
+    # Auswertungen für show_basic_analysis; laufen nur über die indizierten Spalten
+    conn.execute('''
+        CREATE VIEW IF NOT EXISTS v_mode_summary AS
+        SELECT validation_mode,
+               COUNT(*) AS sessions,
+               AVG(final_f1) AS avg_final_f1,
+               AVG(total_time) AS avg_time,
+               SUM(total_cost) AS total_cost,
+               AVG(iterations) AS avg_iterations
+        FROM sessions
+        GROUP BY validation_mode
+    ''')
+    conn.execute('''
+        CREATE VIEW IF NOT EXISTS v_validator_strategy AS
+        SELECT validator_strategy,
+               COUNT(*) AS sessions,
+               SUM(validation_calls) * 1.0 / SUM(iterations) AS calls_per_iter,
+               SUM(validation_input_tokens) * 1.0 / SUM(iterations) AS input_per_iter,
+               SUM(validation_output_tokens) * 1.0 / SUM(iterations) AS output_per_iter,
+               SUM(validation_time) / SUM(iterations) AS time_per_iter
+        FROM sessions
+        WHERE validation_mode = 'AUTOMATIC' AND validator_strategy IS NOT NULL AND validator_strategy != ''
+        GROUP BY validator_strategy
+    ''')
+    conn.execute('''
+        CREATE VIEW IF NOT EXISTS v_final_metrics AS
+        SELECT s.recipe_name, s.matching_mode, i.*
+        FROM sessions s
+        JOIN iterations i ON i.session_id = s.session_id AND i.validation_mode = s.validation_mode
+        WHERE i.iteration = (
+            SELECT MAX(iteration) FROM iterations l
+            WHERE l.session_id = s.session_id AND l.validation_mode = s.validation_mode
+        )
+    ''')
+    conn.execute('''
+        CREATE VIEW IF NOT EXISTS v_matching_mode AS
+        SELECT matching_mode,
+               COUNT(*) AS sessions,
+               AVG(overall_f1) AS overall_f1,
+               AVG(ingredients_f1) AS ingredients_f1,
+               AVG(steps_f1) AS steps_f1
+        FROM v_final_metrics
+        WHERE matching_mode IS NOT NULL AND matching_mode != ''
+        GROUP BY matching_mode
+    ''')
+    conn.execute('''
+        CREATE VIEW IF NOT EXISTS v_stop_reasons AS
+        SELECT validation_mode, stop_reason,
+               COUNT(*) AS sessions,
+               AVG(iterations) AS avg_iterations,
+               SUM(iterations_saved) AS iterations_saved
+        FROM sessions
+        WHERE stop_reason IS NOT NULL AND stop_reason != ''
+        GROUP BY validation_mode, stop_reason
+    ''')
+    conn.execute('''
+        CREATE VIEW IF NOT EXISTS v_convergence AS
+        SELECT validation_mode, iteration,
+               COUNT(*) AS sessions,
+               AVG(overall_f1) AS avg_f1,
+               MIN(overall_f1) AS min_f1,
+               MAX(overall_f1) AS max_f1
+        FROM iterations
+        GROUP BY validation_mode, iteration
+    ''')
+    conn.execute('''
+        CREATE VIEW IF NOT EXISTS v_node_summary AS
+        SELECT node, validation_mode,
+               COUNT(*) AS executions,
+               AVG(duration) AS avg_duration,
+               SUM(cost) AS total_cost
+        FROM node_executions
+        GROUP BY node, validation_mode
+    ''')
+
+
+def write_metrics(conn: sqlite3.Connection, records: Iterable[Dict]):
+    """Schreibt die Exporte mehrerer Sessions (SessionCollector.export_records) per executemany"""
+    sessions, iterations, node_executions = [], [], []
+    for record in records:
+        sessions.extend(record['sessions'])
+        iterations.extend(record['iterations'])
+        node_executions.extend(record['node_executions'])
+
+    conn.executemany(SESSION_INSERT, sessions)
+    conn.executemany(ITERATION_INSERT, iterations)
+    conn.executemany(NODE_EXECUTION_INSERT, node_executions)
+
+
+def _split_list(value: Optional[str], cast=float) -> List:
+    if value is None or value == '':
+        return []
+    return [cast(item) for item in str(value).split(',') if item != '']
+
+
+def migrate_session_results(conn: sqlite3.Connection) -> int:
+    """
+    Übernimmt die Zeilen einer alten session_results-Tabelle (Listen als Komma-getrennter TEXT)
+    in sessions/iterations. Die alte Tabelle bleibt unverändert stehen. Gibt die Anzahl der
+    übernommenen Sessions zurück.
+    """
+    if conn.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'session_results'").fetchone() is None:
+        return 0
+
+    cursor = conn.execute("SELECT * FROM session_results")
+    columns = [description[0] for description in cursor.description]
+
+    sessions, iterations = [], []
+    for row_values in cursor:
+        row = dict(zip(columns, row_values))
+        metrics = {column: _split_list(row.get(column)) for column in METRIC_COLUMNS}
+        per_iteration = {
+            'skipped_validation_calls': _split_list(row.get('skipped_validation_calls'), int),
+            'saved_validation_tokens': _split_list(row.get('saved_validation_tokens'), int),
+            'prevalidated_sections': _split_list(row.get('prevalidated_sections'), int),
+            'transform_model': _split_list(row.get('transform_models'), str),
+        }
+
+        row['final_f1'] = metrics['overall_f1'][-1] if metrics['overall_f1'] else None
+        sessions.append(tuple(row.get(column) for column in SESSION_COLUMNS))
+
+        for iteration in range(max(len(metric) for metric in metrics.values())):
+            iterations.append(
+                (row['session_id'], row['validation_mode'], iteration)
+                + tuple(_at(metrics[column], iteration) for column in METRIC_COLUMNS)
+                + tuple(_at(per_iteration[column], iteration) for column in per_iteration)
+            )
+
+    # Bereits übernommene oder neu geschriebene Sessions nicht überschreiben
+    conn.executemany(SESSION_INSERT.replace("OR REPLACE", "OR IGNORE"), sessions)
+    conn.executemany(ITERATION_INSERT.replace("OR REPLACE", "OR IGNORE"), iterations)
+    if sessions:
+        print(f"Migrated {len(sessions)} rows from session_results")
+    return len(sessions)
+
+
+def _at(values: List, index: int):
+    return values[index] if index < len(values) else None
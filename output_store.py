@@ -0,0 +1,90 @@
+import hashlib
+import json
+import sqlite3
+import time
+import zlib
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+# Pro Iteration gespeicherte JSON-Ausgaben des Transformers, damit das Scoring später ohne
+# neue LLM-Aufrufe wiederholt werden kann. Die Ausgaben liegen komprimiert und nach Inhalt
+# adressiert (SHA-256 über kanonisches JSON) in derselben DB wie die Metriken (sessions/iterations,
+# metrics_schema.py); iteration_outputs ordnet jeder Zeile in iterations ihre Ausgabe zu.
+
+COMPRESSION_LEVEL = 6
+
+
+def ensure_output_tables(conn: sqlite3.Connection):
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS output_blobs (
+            output_hash TEXT PRIMARY KEY,
+            data BLOB,
+            raw_size INTEGER,
+            compressed_size INTEGER
+        )
+    ''')
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS iteration_outputs (
+            session_id TEXT,
+            validation_mode TEXT,
+            recipe_name TEXT,
+            iteration INTEGER,
+            output_hash TEXT,
+            created_at REAL,
+            PRIMARY KEY (session_id, validation_mode, iteration)
+        )
+    ''')
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_iteration_outputs_hash ON iteration_outputs(output_hash)")
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS rescored_metrics (
+            output_hash TEXT,
+            recipe_name TEXT,
+            matching_mode TEXT,
+            gold_hash TEXT,
+            scorer_version TEXT,
+            metrics TEXT,
+            scored_at REAL,
+            PRIMARY KEY (output_hash, recipe_name, matching_mode)
+        )
+    ''')
+
+
+def encode_output(output: Any) -> Tuple[str, bytes, int]:
+    """Gibt (output_hash, komprimierte Daten, Rohgröße) zurück"""
+    payload = json.dumps(output, sort_keys=True, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+    return hashlib.sha256(payload).hexdigest(), zlib.compress(payload, COMPRESSION_LEVEL), len(payload)
+
+
+def decode_output(data: bytes) -> Any:
+    return json.loads(zlib.decompress(data).decode('utf-8'))
+
+
+def write_iteration_outputs(conn: sqlite3.Connection, session_id: str, validation_mode: str,
+                            recipe_name: str, outputs: Iterable[Optional[Dict]]):
+    """Schreibt die Ausgaben einer Session; identische Ausgaben werden nur einmal abgelegt"""
+    ensure_output_tables(conn)
+    now = time.time()
+
+    blobs = []
+    rows = []
+    for iteration, output in enumerate(outputs):
+        if output is None:
+            continue
+        output_hash, data, raw_size = encode_output(output)
+        blobs.append((output_hash, data, raw_size, len(data)))
+        rows.append((session_id, validation_mode, recipe_name, iteration, output_hash, now))
+
+    conn.executemany("INSERT OR IGNORE INTO output_blobs VALUES (?, ?, ?, ?)", blobs)
+    conn.executemany("INSERT OR REPLACE INTO iteration_outputs VALUES (?, ?, ?, ?, ?, ?)", rows)
+
+
+def load_scoring_jobs(conn: sqlite3.Connection) -> List[Tuple[str, str]]:
+    """Alle eindeutigen (output_hash, recipe_name)-Paare"""
+    ensure_output_tables(conn)
+    return conn.execute(
+        "SELECT DISTINCT output_hash, recipe_name FROM iteration_outputs ORDER BY recipe_name, output_hash"
+    ).fetchall()
+
+
+def load_blob(conn: sqlite3.Connection, output_hash: str) -> Optional[bytes]:
+    row = conn.execute("SELECT data FROM output_blobs WHERE output_hash = ?", (output_hash,)).fetchone()
+    return row[0] if row else None
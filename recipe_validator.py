@@ -1,56 +1,156 @@
+import hashlib
 import json
 from typing import Dict, List, Tuple
 
-from langchain_openai import ChatOpenAI
+import openai
 
 from data_moduels.error_severity import ErrorSeverity
+from data_moduels.matching_mode import MatchingMode
 from data_moduels.validation_error import ValidationError
+from data_moduels.validator_strategy import ValidatorStrategy
 from domain_validator import DomainValidator
+from budget import BudgetExceededError
+from llm_cache import cached_structured_invoke, acached_structured_invoke
+from gold_standard_index import gold_standard_index, flatten_step_texts
+from similarity_engine import similarity_engine
+from schema_registry import schema_registry
 from llm_manager import llm_manager
-from utils.calculate_cost import calculate_openai_cost
-from difflib import SequenceMatcher
+from utils.calculate_cost import calculate_openai_cost, response_model
 import json
-import os
+
+INGREDIENTS_SCHEMA_PATH = 'assets/validation_schemas/ingredients_validation_schema.json'
+INSTRUCTIONS_SCHEMA_PATH = 'assets/validation_schemas/instructions_validation_schema.json'
+COMPLETENESS_SCHEMA_PATH = 'assets/validation_schemas/completeness_validation_schema.json'
+
+# Unabhängige Prüfungen, die im Graph als parallele Branches laufen
+VALIDATION_SECTIONS = ("ingredients", "cooking_steps", "completeness")
+# Alle drei Prüfungen in einem Aufruf (ValidatorStrategy.COMBINED)
+COMBINED_SECTION = "combined"
+
+# Teil der Ausgabe, den der Prompt eines Abschnitts sieht (None = gesamte Ausgabe)
+SECTION_INPUT_FIELDS = {
+    "ingredients": "ingredients",
+    "cooking_steps": "cooking_steps",
+    "completeness": None,
+    COMBINED_SECTION: None,
+}
+
+# Fehlertyp, wenn die LLM-Prüfung selbst fehlschlägt (kein Befund zum JSON)
+LLM_FAILURE_ERROR_TYPE = "llm_validation_error"
+
+# Weitere Felder, die der lokale Vorab-Check (rule_based_validator) eines Abschnitts liest: die
+# Prüfung der Kochschritte gleicht sie mit der Zutatenliste ab
+PRE_VALIDATION_INPUT_FIELDS = {
+    "cooking_steps": ("ingredients",),
+}
+
+# Fehler, bei denen sich ein erneuter Versuch lohnt (Netzwerk, Rate-Limit, 5xx)
+TRANSIENT_LLM_ERRORS = (
+    openai.APIConnectionError,
+    openai.APITimeoutError,
+    openai.RateLimitError,
+    openai.InternalServerError,
+)
+
+# Schweregrad der vom LLM gemeldeten Fehlertypen, alle übrigen sind MINOR
+ERROR_TYPE_SEVERITY = {
+    'omission': ErrorSeverity.CRITICAL.value,
+    'hallucination': ErrorSeverity.CRITICAL.value,
+    'unsupported': ErrorSeverity.CRITICAL.value,
+    'wrong_order': ErrorSeverity.CRITICAL.value,
+}
+
+# Version von calculate_quality_score: erhöhen, sobald sich das Scoring ändert,
+# damit das Rescoring (rescoring.py) alle gespeicherten Ausgaben neu bewertet
+SCORER_VERSION = "3"
+
+# Ähnlichkeitsschwellen des Quality-Scorings (SequenceMatcher-ratio)
+STEP_SIMILARITY_THRESHOLD = 0.75             # Match bei ratio > Schwelle
+INGREDIENT_NAME_SIMILARITY_THRESHOLD = 0.8   # Match bei ratio >= Schwelle
+RECIPE_NAME_SIMILARITY_THRESHOLD = 0.85      # Match bei ratio > Schwelle
+
+
+def section_fingerprint(section: str, json_output: Dict, pre_validation: bool = False) -> str:
+    """
+    Hash über genau die Daten, die in den Prompt des Abschnitts eingehen; mit pre_validation
+    zusätzlich über die Felder, die der lokale Vorab-Check des Abschnitts liest
+    """
+    field = SECTION_INPUT_FIELDS[section]
+    section_input = json_output.get(field, []) if field else json_output
+    extra_fields = PRE_VALIDATION_INPUT_FIELDS.get(section, ()) if pre_validation and field else ()
+    if extra_fields:
+        section_input = {name: json_output.get(name, []) for name in (field,) + extra_fields}
+    payload = json.dumps(section_input, sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
 
 
 class LLMRecipeValidator(DomainValidator):
-    def __init__(self):
-        #self.llm = llm_manager.get_validation_llm()
-        self.llm = ChatOpenAI(
-            model="gpt-5-nano",
-            temperature=0.0,
-        )
+    step_similarity_threshold = STEP_SIMILARITY_THRESHOLD
+    ingredient_name_similarity_threshold = INGREDIENT_NAME_SIMILARITY_THRESHOLD
+    recipe_name_similarity_threshold = RECIPE_NAME_SIMILARITY_THRESHOLD
+
+    def __init__(self, raise_transient_errors: bool = False,
+                 strategy: ValidatorStrategy = ValidatorStrategy.SECTIONED,
+                 session_collector=None):
+        # Client aus dem llm_manager-Pool, Structured-Output-Runnables aus der SchemaRegistry
+        self.model = llm_manager.validation_model
+        self.temperature = 0.0
         self.last_validation_cost = 0  # Für Monitoring
+        # Im Graph übernimmt die RetryPolicy des Branches die Wiederholung
+        self.raise_transient_errors = raise_transient_errors
+        self.strategy = strategy
+        # Empfängt die Hit/Miss-Zähler des Response-Caches
+        self.session_collector = session_collector
 
     def validate(self, json_output: Dict, raw_text: str) -> List[ValidationError]:
-        errors = []
-        total_cost = 0
-        total_input_tokens = 0
-        total_output_tokens = 0
+        if self.strategy == ValidatorStrategy.COMBINED:
+            print(f"Validating ingredients, instructions and completeness with one LLM call")
+            return self._merge_section_results([self._validate_combined_with_llm(json_output, raw_text)])
 
         # 1. Validiere Zutaten
         print(f"Validating ingredients with LLM")
-        ingredient_errors, cost1, input1, output1 = self._validate_ingredients_with_llm(json_output, raw_text)
-        errors.extend(ingredient_errors)
-        total_cost += cost1
-        total_input_tokens += input1
-        total_output_tokens += output1
+        ingredient_result = self._validate_ingredients_with_llm(json_output, raw_text)
 
-    # 2. Validiere kochschritte
+        # 2. Validiere kochschritte
         print(f"Validating instructions with LLM")
-        instruction_errors, cost2, input2, output2 = self._validate_instructions_with_llm(json_output, raw_text)
-        errors.extend(instruction_errors)
-        total_cost += cost2
-        total_input_tokens += input2
-        total_output_tokens += output2
+        instruction_result = self._validate_instructions_with_llm(json_output, raw_text)
 
         # 3. Validiere Vollständigkeit
         print(f"Validating completeness with LLM")
-        completeness_errors, cost3, input3, output3 = self._validate_completeness_with_llm(json_output, raw_text)
-        errors.extend(completeness_errors)
-        total_cost += cost3
-        total_input_tokens += input3
-        total_output_tokens += output3
+        completeness_result = self._validate_completeness_with_llm(json_output, raw_text)
+
+        return self._merge_section_results([ingredient_result, instruction_result, completeness_result])
+
+    def validate_section(self, section: str, json_output: Dict, raw_text: str) -> tuple[List[ValidationError], float, int, int]:
+        """Prüft einen einzelnen Abschnitt (ingredients, cooking_steps, completeness oder combined)"""
+        section_validators = {
+            "ingredients": self._validate_ingredients_with_llm,
+            "cooking_steps": self._validate_instructions_with_llm,
+            "completeness": self._validate_completeness_with_llm,
+            COMBINED_SECTION: self._validate_combined_with_llm,
+        }
+        return section_validators[section](json_output, raw_text)
+
+    async def avalidate_section(self, section: str, json_output: Dict, raw_text: str) -> tuple[List[ValidationError], float, int, int]:
+        section_validators = {
+            "ingredients": self._avalidate_ingredients_with_llm,
+            "cooking_steps": self._avalidate_instructions_with_llm,
+            "completeness": self._avalidate_completeness_with_llm,
+            COMBINED_SECTION: self._avalidate_combined_with_llm,
+        }
+        return await section_validators[section](json_output, raw_text)
+
+    def _merge_section_results(self, section_results: List[tuple]) -> List[ValidationError]:
+        errors = []
+        total_cost = 0
+        total_input_tokens = 0
+        total_output_tokens = 0
+
+        for section_errors, cost, input_tokens, output_tokens in section_results:
+            errors.extend(section_errors)
+            total_cost += cost
+            total_input_tokens += input_tokens
+            total_output_tokens += output_tokens
 
         # Store total cost for monitoring
         self.last_validation_cost = total_cost
@@ -58,13 +158,18 @@ class LLMRecipeValidator(DomainValidator):
         self.last_output_tokens = total_output_tokens
 
         return errors
+
     def _validate_ingredients_with_llm(self, json_output: Dict, raw_text: str) -> tuple[List[ValidationError], float, int, int]:
+        prompt = self._build_ingredients_prompt(json_output, raw_text)
+        return self._run_llm_validation(self._load_schema(INGREDIENTS_SCHEMA_PATH), prompt, "ingredients", "ingredients")
 
-        extracted_ingredients = json_output.get('ingredients', [])
+    async def _avalidate_ingredients_with_llm(self, json_output: Dict, raw_text: str) -> tuple[List[ValidationError], float, int, int]:
+        prompt = self._build_ingredients_prompt(json_output, raw_text)
+        return await self._arun_llm_validation(self._load_schema(INGREDIENTS_SCHEMA_PATH), prompt, "ingredients", "ingredients")
+
+    def _build_ingredients_prompt(self, json_output: Dict, raw_text: str) -> str:
 
-        # Structured-Output-Schema (top-level Objekt mit 'errors'-Array)
-        with open('assets/validation_schemas/ingredients_validation_schema.json', 'r', encoding='utf-8') as f:
-            schema = json.load(f)
+        extracted_ingredients = json_output.get('ingredients', [])
 
         prompt = f"""
                     Rolle
@@ -120,39 +225,20 @@ class LLMRecipeValidator(DomainValidator):
                     ---
                 """
 
-        try:
-            validator = self.llm.with_structured_output(schema=schema, include_raw=True)
-
-            response = validator.invoke(prompt)
-            parsed_response = response["parsed"]
-            token_usage = response["raw"].usage_metadata
+        return prompt
 
-            # response ist ein Dict: {"errors": [ ... ]}
-            items = parsed_response.get("error", []) if isinstance(parsed_response, dict) else []
-            errors = [self._create_validation_error(item, "ingredients") for item in items]
-
-            input_tokens = token_usage.get('input_tokens', 0) if token_usage else 0
-            output_tokens = token_usage.get('output_tokens', 0) if token_usage else 0
-            cost = calculate_openai_cost(token_usage, "gpt-5-nano")
-
-            return errors, cost, input_tokens, output_tokens
+    def _validate_instructions_with_llm(self, json_output: Dict, raw_text: str) -> tuple[List[ValidationError], float, int, int]:
+        prompt = self._build_instructions_prompt(json_output, raw_text)
+        return self._run_llm_validation(self._load_schema(INSTRUCTIONS_SCHEMA_PATH), prompt, "cooking_steps", "instructions")
 
-        except Exception as e:
-            err = ValidationError(
-                type="llm_validation_error",
-                message=f"LLM-Validierung fehlgeschlagen: {str(e)}",
-                severity=ErrorSeverity.MINOR,
-                field_path="ingredients"
-            )
-            return [err], 0.0, 0, 0
+    async def _avalidate_instructions_with_llm(self, json_output: Dict, raw_text: str) -> tuple[List[ValidationError], float, int, int]:
+        prompt = self._build_instructions_prompt(json_output, raw_text)
+        return await self._arun_llm_validation(self._load_schema(INSTRUCTIONS_SCHEMA_PATH), prompt, "cooking_steps", "instructions")
 
-    def _validate_instructions_with_llm(self, json_output: Dict, raw_text: str) -> tuple[List[ValidationError], float, int, int]:
+    def _build_instructions_prompt(self, json_output: Dict, raw_text: str) -> str:
 
         extracted_instructions = json_output.get('cooking_steps', [])
 
-        with open('assets/validation_schemas/instructions_validation_schema.json', 'r', encoding='utf-8') as f:
-            schema = json.load(f)
-
         prompt = f"""
                     Rolle
                     Du prüfst ausschließlich das Feld cooking_steps der EXTRAKTION gegen den ORIGINALTEXT. 
@@ -199,33 +285,17 @@ class LLMRecipeValidator(DomainValidator):
                     {json.dumps(extracted_instructions, indent=2, ensure_ascii=False)}
                     ---
                 """
-        try:
-            validator = self.llm.with_structured_output(schema=schema, include_raw=True)
-            response = validator.invoke(prompt)
-            parsed_response = response["parsed"]
-            token_usage = response["raw"].usage_metadata
-
-            items = parsed_response.get("error", []) if isinstance(parsed_response, dict) else []
-            errors = [self._create_validation_error(item, "cooking_steps") for item in items]
-
-            input_tokens = token_usage.get('input_tokens', 0) if token_usage else 0
-            output_tokens = token_usage.get('output_tokens', 0) if token_usage else 0
-            cost = calculate_openai_cost(token_usage, "gpt-5-nano")
+        return prompt
 
-            return errors, cost, input_tokens, output_tokens
-
-        except Exception as e:
-            err = ValidationError(
-                type="llm_validation_error",
-                message=f"LLM-Validierung fehlgeschlagen: {str(e)}",
-                severity=ErrorSeverity.MINOR,
-                field_path="instructions"
-            )
-            return [err], 0.0, 0, 0
     def _validate_completeness_with_llm(self, json_output: Dict, raw_text: str) -> tuple[List[ValidationError], float, int, int]:
+        prompt = self._build_completeness_prompt(json_output, raw_text)
+        return self._run_llm_validation(self._load_schema(COMPLETENESS_SCHEMA_PATH), prompt, "completeness", "completeness")
 
-        with open('assets/validation_schemas/completeness_validation_schema.json', 'r', encoding='utf-8') as f:
-            schema = json.load(f)
+    async def _avalidate_completeness_with_llm(self, json_output: Dict, raw_text: str) -> tuple[List[ValidationError], float, int, int]:
+        prompt = self._build_completeness_prompt(json_output, raw_text)
+        return await self._arun_llm_validation(self._load_schema(COMPLETENESS_SCHEMA_PATH), prompt, "completeness", "completeness")
+
+    def _build_completeness_prompt(self, json_output: Dict, raw_text: str) -> str:
 
         prompt = f"""
                     Du bist ein Kochexperte. Prüfe ob diese JSON-Extraktion vollständig ist.
@@ -245,59 +315,186 @@ class LLMRecipeValidator(DomainValidator):
                     Gib ausschließlich ein JSON-Objekt gemäß Schema zurück. Wenn alles vollständig ist, gib {{"errors": []}} zurück.
                 """
 
-        try:
-            validator = self.llm.with_structured_output(schema=schema, include_raw=True)
-            response = validator.invoke(prompt)
-            parsed_response = response["parsed"]
-            token_usage = response["raw"].usage_metadata
+        return prompt
+
+    def _validate_combined_with_llm(self, json_output: Dict, raw_text: str) -> tuple[List[ValidationError], float, int, int]:
+        prompt = self._build_combined_prompt(json_output, raw_text)
+        return self._run_llm_validation(self._build_combined_schema(), prompt, COMBINED_SECTION, "validation")
+
+    async def _avalidate_combined_with_llm(self, json_output: Dict, raw_text: str) -> tuple[List[ValidationError], float, int, int]:
+        prompt = self._build_combined_prompt(json_output, raw_text)
+        return await self._arun_llm_validation(self._build_combined_schema(), prompt, COMBINED_SECTION, "validation")
+
+    def _build_combined_prompt(self, json_output: Dict, raw_text: str) -> str:
+
+        prompt = f"""
+                    Rolle
+                    Du prüfst die EXTRAKTION in einem Durchgang gegen den ORIGINALTEXT, getrennt nach drei Bereichen.
+                    
+                    Belege
+                    - Nutze nur wörtliche Belege aus dem ORIGINALTEXT.
+                    - Keine Vermutungen, kein Weltwissen, keine Umrechnungen oder Synonyme.
+                    - Behandle Umlaute (ä, ö, ü, ß) und ihre alternativen Schreibweisen (ae, oe, ue, ss) als identisch.
+                    
+                    Bereich 1: ingredients_errors (nur name, quantity und unit der Zutaten)
+                    - quantity = Null ist nur dann korrekt, wenn im ORIGINALTEXT keine Menge genannt ist.
+                    - unit = Null ist nur dann korrekt, wenn im ORIGINALTEXT keine Einheit genannt ist.
+                    - omission: Zutat, Menge oder Einheit steht im ORIGINALTEXT, fehlt aber in der EXTRAKTION.
+                    - unsupported: Zutat, Menge oder Einheit der EXTRAKTION wird vom ORIGINALTEXT nicht gestützt.
+                    - field_path z. B. ingredients[2].quantity
+                    
+                    Bereich 2: cooking_steps_errors (nur cooking_steps)
+                    - omission: Titel oder Schritt steht im ORIGINALTEXT, fehlt aber in der EXTRAKTION.
+                    - unsupported: Titel oder Schritt der EXTRAKTION fehlt im ORIGINALTEXT.
+                    - wrong_order: Schritt ist in beiden vorhanden, aber in einer anderen Reihenfolge.
+                    - field_path z. B. cooking_steps[2].sub_steps[1]
+                    
+                    Bereich 3: completeness_errors (Vollständigkeit der gesamten EXTRAKTION)
+                    1. Fehlen wichtige Informationen aus dem Originaltext?
+                    2. Sind Portionsangaben, Kochzeiten, Temperaturen erfasst?
+                    3. Ist der Rezeptname korrekt?
+                    4. Wurden alle erwähnten Zubereitungschritte erfasst?
+                    
+                    Ausgabe (nur JSON, keine Zusatztexte)
+                    - Gib ausschließlich ein JSON-Objekt gemäß Schema zurück.
+                    - Bereiche ohne Fehler erhalten ein leeres Array.
+                    
+                    ---
+                    **ORIGINALTEXT:**
+                    {raw_text}
+                    ---
+                    **EXTRAKTION:**
+                    {json.dumps(json_output, indent=2, ensure_ascii=False)}
+                    ---
+                """
+
+        return prompt
+
+    def _build_combined_schema(self) -> Dict:
+        """Führt die drei Validierungsschemata zu einem Structured-Output-Schema zusammen (einmalig)"""
+        return schema_registry.get_derived_schema("CombinedValidationSchema", self._merge_validation_schemas)
 
-            items = parsed_response.get("error", []) if isinstance(parsed_response, dict) else []
-            errors = [self._create_validation_error(item, "completeness") for item in items]
+    def _merge_validation_schemas(self) -> Dict:
+        section_schemas = {
+            "ingredients": self._load_schema(INGREDIENTS_SCHEMA_PATH),
+            "cooking_steps": self._load_schema(INSTRUCTIONS_SCHEMA_PATH),
+            "completeness": self._load_schema(COMPLETENESS_SCHEMA_PATH),
+        }
+
+        properties = {
+            f"{section}_errors": schema["schema"]["properties"]["error"]
+            for section, schema in section_schemas.items()
+        }
 
-            input_tokens = token_usage.get('input_tokens', 0) if token_usage else 0
-            output_tokens = token_usage.get('output_tokens', 0) if token_usage else 0
-            cost = calculate_openai_cost(token_usage, "gpt-5-nano")
+        return {
+            "name": "CombinedValidationSchema",
+            "schema": {
+                "type": "object",
+                "properties": properties,
+                "required": list(properties.keys()),
+                "additionalProperties": False
+            },
+            "strict": True
+        }
+
+    @staticmethod
+    def _load_schema(schema_path: str) -> Dict:
+        # Structured-Output-Schema (top-level Objekt mit 'error'-Array), nur einmal von Platte gelesen
+        return schema_registry.get_schema(schema_path)
 
-            return errors, cost, input_tokens, output_tokens
+    def _run_llm_validation(self, schema: Dict, prompt: str, validation_type: str,
+                            fallback_field_path: str) -> tuple[List[ValidationError], float, int, int]:
+        try:
+            validator = schema_registry.get_structured_llm(self.model, self.temperature, schema, self.session_collector)
+            response = cached_structured_invoke(validator, prompt, self.model, self.temperature,
+                                                schema, self.session_collector)
+            return self._parse_validation_response(response, validation_type)
+
+        except BudgetExceededError:
+            # Kein Validierungsfehler: der Graph beendet die Session (Finalizer)
+            raise
+        except Exception as e:
+            if self.raise_transient_errors and isinstance(e, TRANSIENT_LLM_ERRORS):
+                raise
+            return self._llm_failure_result(e, fallback_field_path)
 
+    async def _arun_llm_validation(self, schema: Dict, prompt: str, validation_type: str,
+                                   fallback_field_path: str) -> tuple[List[ValidationError], float, int, int]:
+        try:
+            validator = schema_registry.get_structured_llm(self.model, self.temperature, schema, self.session_collector)
+            response = await acached_structured_invoke(validator, prompt, self.model, self.temperature,
+                                                       schema, self.session_collector)
+            return self._parse_validation_response(response, validation_type)
+
+        except BudgetExceededError:
+            # Kein Validierungsfehler: der Graph beendet die Session (Finalizer)
+            raise
         except Exception as e:
-            err = ValidationError(
-                type="llm_validation_error",
-                message=f"LLM-Validierung fehlgeschlagen: {str(e)}",
-                severity=ErrorSeverity.MINOR,
-                field_path="completeness"
+            if self.raise_transient_errors and isinstance(e, TRANSIENT_LLM_ERRORS):
+                raise
+            return self._llm_failure_result(e, fallback_field_path)
+
+    def _parse_validation_response(self, response: dict, validation_type: str) -> tuple[List[ValidationError], float, int, int]:
+        parsed_response = response["parsed"]
+        token_usage = response["raw"].usage_metadata
+
+        if not isinstance(parsed_response, dict):
+            errors = []
+        elif validation_type == COMBINED_SECTION:
+            # response ist ein Dict: {"ingredients_errors": [...], "cooking_steps_errors": [...], ...}
+            errors = ValidationError.from_rows(
+                self._validation_error_row(item, section)
+                for section in VALIDATION_SECTIONS
+                for item in parsed_response.get(f"{section}_errors", [])
             )
-            return [err], 0.0, 0, 0
-    def _create_validation_error(self, error_data: dict, validation_type: str) -> ValidationError:
-
-        severity_mapping = {
-            'omission': ErrorSeverity.CRITICAL,
-            'hallucination': ErrorSeverity.CRITICAL,
-            'unsupported': ErrorSeverity.CRITICAL,
-            'wrong_order': ErrorSeverity.CRITICAL,
-        }
+        else:
+            # response ist ein Dict: {"error": [ ... ]}
+            items = parsed_response.get("error", [])
+            errors = ValidationError.from_rows(self._validation_error_row(item, validation_type) for item in items)
+
+        input_tokens = token_usage.get('input_tokens', 0) if token_usage else 0
+        output_tokens = token_usage.get('output_tokens', 0) if token_usage else 0
+        cost = calculate_openai_cost(token_usage, response_model(response, self.model),
+                                     cache_hit=response.get("cache_hit", False))
+
+        return errors, cost, input_tokens, output_tokens
 
+    @staticmethod
+    def _llm_failure_result(e: Exception, field_path: str) -> tuple[List[ValidationError], float, int, int]:
+        err = ValidationError(
+            type=LLM_FAILURE_ERROR_TYPE,
+            message=f"LLM-Validierung fehlgeschlagen: {str(e)}",
+            severity=ErrorSeverity.MINOR,
+            field_path=field_path
+        )
+        return [err], 0.0, 0, 0
+
+    @staticmethod
+    def _validation_error_row(error_data: dict, validation_type: str) -> tuple:
+        # Zeile für ValidationError.from_rows (ohne Feldprüfung): die Werte stammen aus dem
+        # Structured Output, dessen Schema Strings vorgibt
         error_type = error_data.get('error_type', 'unknown_error')
-        severity = severity_mapping.get(error_type, ErrorSeverity.MINOR)
-
-        return ValidationError(
-            type=error_type,
-            message=error_data.get('message', 'LLM-Validierungsfehler'),
-            severity=severity,
-            field_path=error_data.get('field_path', validation_type),
-            suggested_fix=error_data.get('recommended_fix', '')
+
+        return (
+            error_type,
+            error_data.get('message', 'LLM-Validierungsfehler'),
+            ERROR_TYPE_SEVERITY.get(error_type, ErrorSeverity.MINOR.value),
+            error_data.get('field_path', validation_type),
+            error_data.get('recommended_fix', '')
         )
 
-    def calculate_quality_score(self, json_output: Dict, recipe_name: str = None) -> Dict:
+    def calculate_quality_score(self, json_output: Dict, recipe_name: str = None,
+                                matching_mode: MatchingMode = MatchingMode.GREEDY) -> Dict:
         """
         Berechnet detaillierte F1-Scores für alle Komponenten.
+        matching_mode: GREEDY (erster Treffer) oder OPTIMAL (Assignment über die Ähnlichkeitsmatrix)
 
         Returns:
             Dictionary mit Precision, Recall und F1 für jede Komponente und overall
         """
-        gold_standard = self._load_gold_standard(recipe_name)
+        gold = gold_standard_index.get(recipe_name)
 
-        if not gold_standard:
+        if not gold or not gold.data:
             return {
                 'overall_f1': 0.0,
                 'overall_precision': 0.0,
@@ -310,27 +507,33 @@ class LLMRecipeValidator(DomainValidator):
                 'steps_recall': 0.0,
                 'metadata_f1': 0.0,
                 'metadata_precision': 0.0,
-                'metadata_recall': 0.0
+                'metadata_recall': 0.0,
+                'matching_mode': matching_mode.value
             }
 
         # 1. Evaluate Ingredients
         ing_tp, ing_fp, ing_fn = self._evaluate_ingredients(
-            gold_standard.get('ingredients', []),
-            json_output.get('ingredients', [])
+            gold.ingredients,
+            json_output.get('ingredients', []),
+            gold_names=gold.ingredient_names,
+            matching_mode=matching_mode
         )
         ing_precision, ing_recall, ing_f1 = self._calculate_metrics(ing_tp, ing_fp, ing_fn)
 
         # 2. Evaluate Cooking Steps
         steps_tp, steps_fp, steps_fn = self._evaluate_cooking_steps(
-            gold_standard.get('cooking_steps', []),
-            json_output.get('cooking_steps', [])
+            gold.cooking_steps,
+            json_output.get('cooking_steps', []),
+            gold_texts=gold.step_texts,
+            matching_mode=matching_mode
         )
         steps_precision, steps_recall, steps_f1 = self._calculate_metrics(steps_tp, steps_fp, steps_fn)
 
         # 3. Evaluate Metadata
         meta_tp, meta_fp, meta_fn = self._evaluate_metadata(
-            gold_standard,
-            json_output
+            gold.data,
+            json_output,
+            gold_name=gold.name_normalized
         )
         meta_precision, meta_recall, meta_f1 = self._calculate_metrics(meta_tp, meta_fp, meta_fn)
 
@@ -352,7 +555,8 @@ class LLMRecipeValidator(DomainValidator):
             'steps_recall': steps_recall,
             'metadata_f1': meta_f1,
             'metadata_precision': meta_precision,
-            'metadata_recall': meta_recall
+            'metadata_recall': meta_recall,
+            'matching_mode': matching_mode.value
         }
 
         print(f"Quality Metrics:")
@@ -364,10 +568,16 @@ class LLMRecipeValidator(DomainValidator):
         return metrics
 
 
-    def _evaluate_ingredients(self, gold_ingredients: list, current_ingredients: list) -> tuple:
+    def _evaluate_ingredients(self, gold_ingredients: list, current_ingredients: list,
+                              gold_names: list = None,
+                              matching_mode: MatchingMode = MatchingMode.GREEDY) -> tuple:
         """
         Evaluiert Zutaten und gibt (TP, FP, FN) zurück.
+        gold_names: vorab klein geschriebene Gold-Namen aus dem GoldStandardIndex (optional).
         """
+        if gold_names is None:
+            gold_names = [(g.get('name') or '').lower() if isinstance(g, dict) else None for g in gold_ingredients]
+
         if not gold_ingredients:
             if not current_ingredients:
                 return (0, 0, 0)
@@ -377,27 +587,36 @@ class LLMRecipeValidator(DomainValidator):
         if not current_ingredients:
             return (0, 0, len(gold_ingredients))  # Alles FN
 
-        # Bipartite Matching
-        matched_gold_indices = set()
-        matched_pred_indices = set()
-
-        for g_idx, gold_ingredient in enumerate(gold_ingredients):
-            for p_idx, current_ingredient in enumerate(current_ingredients):
-                if p_idx not in matched_pred_indices:
-                    if self._ingredients_match(gold_ingredient, current_ingredient):
-                        matched_gold_indices.add(g_idx)
-                        matched_pred_indices.add(p_idx)
-                        break
+        # Bipartite Matching (greedy oder optimal, Namensähnlichkeit über die SimilarityEngine)
+        current_names = [
+            (ingredient.get('name') or '').lower() if isinstance(ingredient, dict) else ''
+            for ingredient in current_ingredients
+        ]
+
+        def quantities_match(g_idx: int, p_idx: int) -> bool:
+            return self._ingredient_details_match(gold_ingredients[g_idx], current_ingredients[p_idx])
+
+        match = self._matcher(matching_mode)
+        pairs = match(
+            [name if name is not None else '' for name in gold_names],
+            current_names,
+            self.ingredient_name_similarity_threshold,
+            inclusive=True,
+            accept=quantities_match
+        )
 
-        tp = len(matched_gold_indices)
-        fp = len(current_ingredients) - len(matched_pred_indices)
-        fn = len(gold_ingredients) - len(matched_gold_indices)
+        tp = len(pairs)
+        fp = len(current_ingredients) - tp
+        fn = len(gold_ingredients) - tp
 
         return (tp, fp, fn)
 
-    def _evaluate_cooking_steps(self, gold_steps: list, current_steps: list) -> tuple:
+    def _evaluate_cooking_steps(self, gold_steps: list, current_steps: list,
+                                gold_texts: list = None,
+                                matching_mode: MatchingMode = MatchingMode.GREEDY) -> tuple:
         """
         Evaluiert Kochschritte und gibt (TP, FP, FN) zurück.
+        gold_texts: vorab geflachte Gold-Schritttexte aus dem GoldStandardIndex (optional).
         """
         if not gold_steps:
             if not current_steps:
@@ -409,48 +628,27 @@ class LLMRecipeValidator(DomainValidator):
             return (0, 0, len(gold_steps))
 
         # Flatten sub_steps für Vergleich
-        gold_texts = []
-        for step in gold_steps:
-            if isinstance(step, dict):
-                if step.get('title'):
-                    gold_texts.append(step['title'].lower())
-                sub_steps = step.get('sub_steps', [])
-                if isinstance(sub_steps, list):
-                    for sub in sub_steps:
-                        if sub:
-                            gold_texts.append(str(sub).lower())
-
-        current_texts = []
-        for step in current_steps:
-            if isinstance(step, dict):
-                if step.get('title'):
-                    current_texts.append(step['title'].lower())
-                sub_steps = step.get('sub_steps', [])
-                if isinstance(sub_steps, list):
-                    for sub in sub_steps:
-                        if sub:
-                            current_texts.append(str(sub).lower())
+        if gold_texts is None:
+            gold_texts = flatten_step_texts(gold_steps)
+        current_texts = flatten_step_texts(current_steps)
 
         # Matching mit Ähnlichkeitsschwelle
-        matched_gold_indices = set()
-        matched_pred_indices = set()
-
-        for g_idx, gold_text in enumerate(gold_texts):
-            for p_idx, pred_text in enumerate(current_texts):
-                if p_idx not in matched_pred_indices:
-                    similarity = SequenceMatcher(None, gold_text, pred_text).ratio()
-                    if similarity > 0.75:
-                        matched_gold_indices.add(g_idx)
-                        matched_pred_indices.add(p_idx)
-                        break
-
-        tp = len(matched_gold_indices)
-        fp = len(current_texts) - len(matched_pred_indices)
-        fn = len(gold_texts) - len(matched_gold_indices)
+        match = self._matcher(matching_mode)
+        pairs = match(gold_texts, current_texts, self.step_similarity_threshold)
+
+        tp = len(pairs)
+        fp = len(current_texts) - tp
+        fn = len(gold_texts) - tp
 
         return (tp, fp, fn)
 
-    def _evaluate_metadata(self, gold_standard: dict, json_output: dict) -> tuple:
+    @staticmethod
+    def _matcher(matching_mode: MatchingMode):
+        if matching_mode == MatchingMode.OPTIMAL:
+            return similarity_engine.optimal_match
+        return similarity_engine.greedy_match
+
+    def _evaluate_metadata(self, gold_standard: dict, json_output: dict, gold_name: str = None) -> tuple:
         """
         Evaluiert Metadaten (name, portions, time) und gibt (TP, FP, FN) zurück.
         Jedes Feld zählt als ein Element.
@@ -468,6 +666,8 @@ class LLMRecipeValidator(DomainValidator):
             if gold_value is not None:
                 if pred_value is not None:
                     # Beide vorhanden - prüfe ob korrekt
+                    if field == 'name' and gold_name is not None:
+                        gold_value = gold_name
                     if self._metadata_values_match(gold_value, pred_value, field):
                         tp += 1
                     else:
@@ -489,8 +689,7 @@ class LLMRecipeValidator(DomainValidator):
             # Textuelle Ähnlichkeit für Namen
             gold_str = str(gold_value).lower().strip()
             pred_str = str(pred_value).lower().strip()
-            similarity = SequenceMatcher(None, gold_str, pred_str).ratio()
-            return similarity > 0.85
+            return similarity_engine.similar(gold_str, pred_str, self.recipe_name_similarity_threshold)
         else:
             # Exakte Übereinstimmung für numerische Felder
             return str(gold_value).strip() == str(pred_value).strip()
@@ -559,19 +758,6 @@ class LLMRecipeValidator(DomainValidator):
     #     print(f"Quality_score: {final_score}")
     #
     #     return final_score
-    @staticmethod
-    def _load_gold_standard(recipe_name: str) -> Dict:
-        filename = f"{recipe_name.replace(' ', '_')}.json"
-        filepath = os.path.join("assets", "gold_standards", filename)
-
-        try:
-            if os.path.exists(filepath):
-                with open(filepath, 'r', encoding='utf-8') as f:
-                    return json.load(f)
-        except:
-            pass
-
-        return None
     #
     # def _score_cooking_steps(self, gold_steps: list, current_steps: list) -> float:
     #     if not gold_steps:
@@ -672,16 +858,10 @@ class LLMRecipeValidator(DomainValidator):
     #         base_score = max(0.0, base_score - penalty)
     #
     #     return base_score
-    def _ingredients_match(self, gold_ingredient: dict, current_ingredient: dict) -> bool:
+    @staticmethod
+    def _ingredient_details_match(gold_ingredient, current_ingredient) -> bool:
         if not isinstance(gold_ingredient, dict) or not isinstance(current_ingredient, dict):
             return False
-        # Name mit SequenceMatcher vergleichen (wichtigster Teil)
-        gold_name = gold_ingredient.get('name', '').lower()
-        current_name = current_ingredient.get('name', '').lower()
-
-        name_similarity = SequenceMatcher(None, gold_name, current_name).ratio()
-        if name_similarity < 0.8:  # 80% Ähnlichkeit erforderlich
-            return False
 
         # Quantity und Unit sind optional, aber wenn vorhanden sollten sie stimmen
         gold_qty = gold_ingredient.get('quantity')
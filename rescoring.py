@@ -0,0 +1,118 @@
+import contextlib
+import io
+import json
+import sqlite3
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Optional, Tuple
+
+from data_moduels.matching_mode import MatchingMode
+from gold_standard_index import gold_standard_index
+from output_store import decode_output, ensure_output_tables, load_blob, load_scoring_jobs
+from recipe_validator import LLMRecipeValidator, SCORER_VERSION
+
+RESCORE_CHUNK_SIZE = 16
+
+
+def rescore_outputs(db_path: str = "experiment_results.db", workers: Optional[int] = None,
+                    matching_mode: MatchingMode = MatchingMode.GREEDY) -> Dict:
+    """
+    Bewertet alle gespeicherten Iterations-Ausgaben neu, ohne LLM-Aufrufe.
+
+    Inkrementell: neu berechnet werden nur Paare (output_hash, recipe_name), für die noch kein
+    Ergebnis existiert oder deren Goldstandard-Hash bzw. SCORER_VERSION sich geändert hat.
+    Das Scoring läuft in einem Prozess-Pool; geschrieben wird gesammelt im Hauptprozess.
+    """
+    start = time.time()
+    conn = sqlite3.connect(db_path)
+    ensure_output_tables(conn)
+
+    scored = {
+        (output_hash, recipe_name): (gold_hash, scorer_version)
+        for output_hash, recipe_name, gold_hash, scorer_version in conn.execute(
+            "SELECT output_hash, recipe_name, gold_hash, scorer_version FROM rescored_metrics "
+            "WHERE matching_mode = ?", (matching_mode.value,)
+        )
+    }
+
+    jobs: List[Tuple[str, str, bytes, str]] = []
+    skipped = 0
+    missing_gold = 0
+    for output_hash, recipe_name in load_scoring_jobs(conn):
+        gold = gold_standard_index.get(recipe_name)
+        if gold is None:
+            missing_gold += 1
+            continue
+        if scored.get((output_hash, recipe_name)) == (gold.content_hash, SCORER_VERSION):
+            skipped += 1
+            continue
+        jobs.append((output_hash, recipe_name, load_blob(conn, output_hash), gold.content_hash))
+
+    results = []
+    if jobs:
+        if workers == 1 or len(jobs) < RESCORE_CHUNK_SIZE:
+            results = [_score_job(job, matching_mode.value) for job in jobs]
+        else:
+            with ProcessPoolExecutor(max_workers=workers) as executor:
+                results = list(executor.map(_score_job, jobs, [matching_mode.value] * len(jobs),
+                                            chunksize=RESCORE_CHUNK_SIZE))
+
+    now = time.time()
+    conn.executemany('''
+        INSERT OR REPLACE INTO rescored_metrics
+        (output_hash, recipe_name, matching_mode, gold_hash, scorer_version, metrics, scored_at)
+        VALUES (?, ?, ?, ?, ?, ?, ?)
+    ''', [
+        (output_hash, recipe_name, matching_mode.value, gold_hash, SCORER_VERSION, json.dumps(metrics), now)
+        for output_hash, recipe_name, gold_hash, metrics in results
+    ])
+    conn.commit()
+    conn.close()
+
+    stats = {
+        'rescored': len(results),
+        'up_to_date': skipped,
+        'missing_gold_standard': missing_gold,
+        'time': time.time() - start,
+    }
+
+    print(f"\n=== RESCORING ({matching_mode.value}, scorer v{SCORER_VERSION}) ===")
+    print(f"  Rescored: {stats['rescored']} | Up to date: {stats['up_to_date']} | "
+          f"Without gold standard: {stats['missing_gold_standard']}")
+    print(f"  Time: {stats['time']:.2f}s")
+    return stats
+
+
+def _score_job(job: Tuple[str, str, bytes, str], matching_mode: str) -> Tuple[str, str, str, Dict]:
+    output_hash, recipe_name, data, gold_hash = job
+    validator = LLMRecipeValidator()
+
+    # calculate_quality_score gibt pro Aufruf eine Zusammenfassung aus - beim Rescoring unterdrücken
+    with contextlib.redirect_stdout(io.StringIO()):
+        metrics = validator.calculate_quality_score(decode_output(data), recipe_name=recipe_name,
+                                                    matching_mode=MatchingMode(matching_mode))
+
+    return output_hash, recipe_name, gold_hash, metrics
+
+
+def rescored_summary(db_path: str = "experiment_results.db"):
+    """Finale F1 pro Session aus dem letzten Rescoring (letzte Iteration jeder Session)"""
+    conn = sqlite3.connect(db_path)
+    ensure_output_tables(conn)
+    rows = conn.execute('''
+        SELECT r.matching_mode, i.validation_mode, COUNT(*), AVG(json_extract(r.metrics, '$.overall_f1'))
+        FROM iteration_outputs i
+        JOIN rescored_metrics r ON r.output_hash = i.output_hash AND r.recipe_name = i.recipe_name
+        WHERE i.iteration = (
+            SELECT MAX(iteration) FROM iteration_outputs l
+            WHERE l.session_id = i.session_id AND l.validation_mode = i.validation_mode
+        )
+        GROUP BY r.matching_mode, i.validation_mode
+    ''').fetchall()
+    conn.close()
+
+    if rows:
+        print("Matching\tMode\t\tSessions\tAvg final F1")
+        for matching_mode, validation_mode, sessions, f1 in rows:
+            print(f"{matching_mode}\t\t{validation_mode}\t{sessions}\t\t{f1:.3f}")
+
@@ -0,0 +1,296 @@
+import re
+import threading
+import unicodedata
+from collections import OrderedDict
+from typing import Dict, List, Optional, Set, Tuple
+
+from data_moduels.error_severity import ErrorSeverity
+from data_moduels.validation_error import ValidationError
+from domain_validator import DomainValidator
+from gold_standard_index import UMLAUT_REPLACEMENTS
+
+# Abschnitte, die der lokale Vorab-Check vollständig abdeckt; completeness bleibt immer beim LLM
+PRE_VALIDATION_SECTIONS = ("ingredients", "cooking_steps")
+
+_TOKEN_PATTERN = re.compile(r"\d+(?:[.,/]\d+)*|[a-z]+")
+_THOUSANDS_PATTERN = re.compile(r"^\d{1,3}(?:\.\d{3})+$")
+
+# In Schritttexten werden nur inhaltstragende Wörter geprüft (kurze Füllwörter formuliert das Modell frei)
+MIN_STEP_TOKEN_LENGTH = 4
+# Komposita: "apfel" in "apfelstuecke", "staerke" als Grundwort von "maisstaerke" (jeweils ab 4 Zeichen)
+MIN_COMPOUND_PART_LENGTH = 4
+MIN_COMPOUND_HEAD_LENGTH = 4
+# Überschrift, ab der der Originaltext die Zubereitung beschreibt (alle Rezepte in assets/recipes)
+PREPARATION_HEADING = "zubereitung"
+
+# Kopfzeile der Zutatentabellen ("Menge<TAB>Zutat")
+INGREDIENT_TABLE_HEADER = "zutat"
+# Kleinstes Wort, das als Kopfwort eines Zutatennamens gilt (wie beim Abgleich mit den Schritten)
+MIN_INGREDIENT_HEAD_LENGTH = 3
+
+# Die Goldstandards rechnen kg/l in g/ml um - beide Schreibweisen gelten als belegt
+UNIT_EQUIVALENTS = {'g': ('kg',), 'kg': ('g',), 'ml': ('l',), 'l': ('ml',)}
+QUANTITY_FACTORS = (1, 1000, 0.001)
+
+
+def normalize_text(text: str) -> str:
+    """Kleinschreibung und ä/ö/ü/ß -> ae/oe/ue/ss, wie in den Validator-Prompts beschrieben"""
+    text = unicodedata.normalize('NFC', str(text)).lower()
+    for umlaut, replacement in UMLAUT_REPLACEMENTS.items():
+        text = text.replace(umlaut, replacement)
+    return text
+
+
+def tokenize(text: str) -> List[str]:
+    # Tausenderpunkte entfernen, Dezimalkomma und -punkt gleich behandeln ("0,5" == "0.5")
+    tokens = []
+    for token in _TOKEN_PATTERN.findall(normalize_text(text)):
+        if _THOUSANDS_PATTERN.match(token):
+            token = token.replace('.', '')
+        tokens.append(token.replace(',', '.'))
+    return tokens
+
+
+def _number(token: str) -> Optional[float]:
+    try:
+        return float(token)
+    except ValueError:
+        return None
+
+
+class TokenIndex:
+    """Invertierter Index Token -> Dokument-IDs über eine Liste von Texten"""
+
+    def __init__(self, texts: List[str]):
+        self.postings: Dict[str, Set[int]] = {}
+        for doc_id, text in enumerate(texts):
+            for token in tokenize(text):
+                self.postings.setdefault(token, set()).add(doc_id)
+        self.numbers = {value for value in map(_number, self.postings) if value is not None}
+
+    def __contains__(self, token: str) -> bool:
+        return token in self.postings
+
+    def missing(self, tokens: List[str]) -> List[str]:
+        return [token for token in tokens if token not in self.postings]
+
+    def documents(self, token: str) -> Set[int]:
+        """Dokumente mit dem Token selbst oder einem Kompositum ("apfel" in "apfelstuecke", "staerke" in "maisstaerke")"""
+        documents = set(self.postings.get(token, ()))
+        if len(token) < MIN_COMPOUND_PART_LENGTH:
+            return documents
+        for candidate, doc_ids in self.postings.items():
+            if (token in candidate
+                    or (len(candidate) >= MIN_COMPOUND_HEAD_LENGTH and token.endswith(candidate))):
+                documents |= doc_ids
+        return documents
+
+    def has_quantity(self, token: str) -> bool:
+        if token in self.postings:
+            return True
+        value = _number(token)
+        return value is not None and any(
+            round(value * factor, 6) in self.numbers for factor in QUANTITY_FACTORS
+        )
+
+
+class RuleBasedRecipeValidator(DomainValidator):
+    """
+    Deterministischer Vorab-Check ohne LLM.
+
+    Prüft nur, was sich wörtlich belegen lässt: Zutatenname, Menge und Einheit müssen im
+    Originaltext vorkommen, jede Zeile der Zutatentabellen im Originaltext braucht eine extrahierte
+    Zutat (mit Menge/Einheit, wenn die Zeile eine hat), Schritttexte dürfen keine Wörter enthalten,
+    die der Originaltext nicht kennt, und Zutaten aus dem Zubereitungstext müssen in einem Schritt
+    vorkommen. Ein leeres Ergebnis für einen Abschnitt bedeutet "nichts Auffälliges" - dann kann die
+    LLM-Prüfung entfallen.
+    """
+
+    RAW_INDEX_CACHE_SIZE = 256
+
+    def __init__(self):
+        self._raw_indexes = OrderedDict()
+        self._lock = threading.Lock()
+
+    def validate(self, json_output: Dict, raw_text: str) -> List[ValidationError]:
+        errors = []
+        for section in PRE_VALIDATION_SECTIONS:
+            errors.extend(self.validate_section(section, json_output, raw_text))
+        return errors
+
+    def validate_section(self, section: str, json_output: Dict, raw_text: str) -> List[ValidationError]:
+        raw_index, preparation_lines, raw_ingredients = self._raw_index(raw_text)
+        if section == "ingredients":
+            ingredients = json_output.get('ingredients') or []
+            return (self._check_ingredients(ingredients, raw_index)
+                    + self._check_ingredient_coverage(ingredients, raw_ingredients))
+        if section == "cooking_steps":
+            return self._check_cooking_steps(json_output.get('cooking_steps') or [],
+                                             json_output.get('ingredients') or [], raw_index, preparation_lines)
+        return []
+
+    def _raw_index(self, raw_text: str) -> Tuple[TokenIndex, Set[int], List[Tuple[str, str]]]:
+        """Index über die Zeilen des Originaltexts, die Zeilen der Zubereitung und die Zutatenzeilen"""
+        # Der Originaltext bleibt über alle Iterationen einer Session gleich
+        with self._lock:
+            cached = self._raw_indexes.get(raw_text)
+            if cached is not None:
+                self._raw_indexes.move_to_end(raw_text)
+                return cached
+
+        lines = raw_text.splitlines()
+        headings = [i for i, line in enumerate(lines) if normalize_text(line).strip() == PREPARATION_HEADING]
+        # Ohne Überschrift: alle Zeilen, die nicht wie eine Zutatenzeile (tabellarisch) aussehen
+        preparation_lines = (set(range(headings[-1] + 1, len(lines))) if headings
+                             else {i for i, line in enumerate(lines) if '\t' not in line})
+        cached = (TokenIndex(lines), preparation_lines, _raw_ingredient_lines(lines, preparation_lines))
+
+        with self._lock:
+            self._raw_indexes[raw_text] = cached
+            while len(self._raw_indexes) > self.RAW_INDEX_CACHE_SIZE:
+                self._raw_indexes.popitem(last=False)
+        return cached
+
+    def _check_ingredients(self, ingredients: list, raw_index: TokenIndex) -> List[ValidationError]:
+        errors = []
+        for i, ingredient in enumerate(ingredients):
+            if not isinstance(ingredient, dict):
+                continue
+
+            for field in ('name', 'quantity', 'unit'):
+                value = ingredient.get(field)
+                if value in (None, ''):
+                    continue
+                missing = [token for token in tokenize(value) if not self._supported(field, token, raw_index)]
+                if missing:
+                    errors.append(ValidationError(
+                        type="unsupported",
+                        message=f"'{value}' kommt im Originaltext nicht vor (fehlend: {', '.join(missing)})",
+                        severity=ErrorSeverity.CRITICAL,
+                        field_path=f"ingredients[{i}].{field}",
+                        suggested_fix=f"{field} wörtlich aus dem Originaltext übernehmen"
+                    ))
+        return errors
+
+    @staticmethod
+    def _check_ingredient_coverage(ingredients: list, raw_ingredients: List[Tuple[str, str]]) -> List[ValidationError]:
+        """
+        Umgekehrte Richtung: jede Zutatenzeile des Originaltexts muss über das Kopfwort ihres Namens
+        eine extrahierte Zutat finden (invertierter Index über die extrahierten Namen). Hat die Zeile
+        eine Menge bzw. Einheit, darf sie nicht bei allen passenden Zutaten fehlen. Die Befunde sind
+        MINOR: Umformulierte Namen sind möglich, sie lösen nur die LLM-Prüfung aus.
+        """
+        entries = [ingredient if isinstance(ingredient, dict) else {} for ingredient in ingredients]
+        name_index = TokenIndex([str(entry.get('name') or '') for entry in entries])
+        errors = []
+
+        for raw_quantity, raw_name in raw_ingredients:
+            head = next((t for t in tokenize(raw_name) if t.isalpha() and len(t) >= MIN_INGREDIENT_HEAD_LENGTH), None)
+            if head is None:
+                continue
+            matches = sorted(name_index.postings.get(head, ()))
+            if not matches:
+                errors.append(ValidationError(
+                    type="omission",
+                    message=f"Zutat '{raw_name}' aus dem Originaltext fehlt in ingredients",
+                    severity=ErrorSeverity.MINOR,
+                    field_path="ingredients",
+                    suggested_fix=f"'{f'{raw_quantity} {raw_name}'.strip()}' als Zutat ergänzen"
+                ))
+                continue
+
+            quantity_tokens = tokenize(raw_quantity)
+            for field, present in (('quantity', any(_number(t) is not None for t in quantity_tokens)),
+                                   ('unit', any(t.isalpha() for t in quantity_tokens))):
+                if present and all(entries[i].get(field) in (None, '') for i in matches):
+                    errors.append(ValidationError(
+                        type="omission",
+                        message=f"{field} von '{raw_name}' fehlt, im Originaltext steht '{raw_quantity}'",
+                        severity=ErrorSeverity.MINOR,
+                        field_path=f"ingredients[{matches[0]}].{field}",
+                        suggested_fix=f"{field} aus '{raw_quantity}' übernehmen"
+                    ))
+        return errors
+
+    @staticmethod
+    def _supported(field: str, token: str, raw_index: TokenIndex) -> bool:
+        if field == 'quantity':
+            return raw_index.has_quantity(token)
+        if field == 'unit':
+            return token in raw_index or any(alt in raw_index for alt in UNIT_EQUIVALENTS.get(token, ()))
+        return token in raw_index
+
+    def _check_cooking_steps(self, steps: list, ingredients: list, raw_index: TokenIndex,
+                             preparation_lines: Set[int]) -> List[ValidationError]:
+        errors = []
+        step_texts = []
+
+        for i, step in enumerate(steps):
+            if not isinstance(step, dict):
+                continue
+            texts = [(f"cooking_steps[{i}].title", step.get('title'))]
+            texts += [(f"cooking_steps[{i}].sub_steps[{j}]", sub)
+                      for j, sub in enumerate(step.get('sub_steps') or [])]
+
+            for field_path, text in texts:
+                if not text:
+                    continue
+                step_texts.append(str(text))
+                content_tokens = [t for t in tokenize(text) if len(t) >= MIN_STEP_TOKEN_LENGTH]
+                missing = raw_index.missing(content_tokens)
+                if missing:
+                    errors.append(ValidationError(
+                        type="unsupported",
+                        message=f"Wörter ohne Beleg im Originaltext: {', '.join(missing)}",
+                        severity=ErrorSeverity.MINOR,
+                        field_path=field_path,
+                        suggested_fix="Schritt wörtlich aus dem Originaltext übernehmen"
+                    ))
+
+        # Zutaten, die der Originaltext in der Zubereitung verwendet, müssen auch in einem Schritt vorkommen
+        step_index = TokenIndex(step_texts)
+        for i, ingredient in enumerate(ingredients):
+            if not isinstance(ingredient, dict) or not ingredient.get('name'):
+                continue
+            head = next((t for t in tokenize(ingredient['name']) if t.isalpha() and len(t) >= 3), None)
+            if head is None or not raw_index.documents(head) & preparation_lines:
+                continue
+            if not step_index.documents(head):
+                errors.append(ValidationError(
+                    type="omission",
+                    message=f"Zutat '{ingredient['name']}' wird im Originaltext verwendet, aber in keinem Kochschritt",
+                    severity=ErrorSeverity.MINOR,
+                    field_path="cooking_steps",
+                    suggested_fix=f"Schritt mit '{ingredient['name']}' aus dem Originaltext ergänzen"
+                ))
+
+        return errors
+
+
+def _raw_ingredient_lines(lines: List[str], preparation_lines: Set[int]) -> List[Tuple[str, str]]:
+    """(Menge mit Einheit, Name) der tabellarischen Zutatenzeilen ("300 ml<TAB>Apfelsaft") vor der Zubereitung"""
+    raw_ingredients = []
+    for i, line in enumerate(lines):
+        if i in preparation_lines or '\t' not in line:
+            continue
+        quantity, *rest = line.split('\t')
+        name = next((part.strip() for part in reversed(rest) if part.strip()), '')
+        if name and normalize_text(name) != INGREDIENT_TABLE_HEADER:
+            raw_ingredients.append((quantity.strip(), name))
+    return raw_ingredients
+
+
+def merge_rule_errors(llm_errors: List[ValidationError], rule_errors: List[ValidationError]) -> List[ValidationError]:
+    """
+    Übernimmt nur die sicheren lokalen Befunde (CRITICAL: Wert steht nicht im Originaltext) für Felder,
+    zu denen das LLM nichts meldet. MINOR-Befunde dienen nur als Auslöser für die LLM-Prüfung.
+    """
+    reported = {error.field_path for error in llm_errors}
+    return llm_errors + [
+        error for error in rule_errors
+        if error.severity == ErrorSeverity.CRITICAL.value and error.field_path not in reported
+    ]
+
+
+# Global instance
+rule_based_validator = RuleBasedRecipeValidator()
@@ -0,0 +1,92 @@
+import hashlib
+import json
+import threading
+import time
+from typing import Any, Callable, Dict, Optional
+
+from llm_manager import llm_manager
+
+
+class SchemaRegistry:
+    """
+    Lädt jedes JSON-Schema genau einmal und baut pro (model, temperature, schema)
+    genau ein Structured-Output-Runnable. Nodes holen sich das fertige Runnable,
+    statt bei jedem Aufruf Datei lesen + with_structured_output() zu wiederholen.
+
+    Die beim ersten Aufbau gemessene Zeit gilt als Setup-Kosten; jeder weitere
+    Treffer wird als eingesparte Setup-Zeit gezählt.
+    """
+
+    def __init__(self):
+        self._schemas: Dict[str, Dict] = {}
+        self._runnables: Dict[tuple, Any] = {}
+        self._build_times: Dict[tuple, float] = {}
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+        self.setup_time_saved = 0.0
+
+    def get_schema(self, schema_path: str) -> Dict:
+        """Schema aus Datei (einmalig geladen). Das Dict wird geteilt und darf nicht verändert werden."""
+        with self._lock:
+            schema = self._schemas.get(schema_path)
+            if schema is None:
+                with open(schema_path, 'r', encoding='utf-8') as f:
+                    schema = json.load(f)
+                self._schemas[schema_path] = schema
+            return schema
+
+    def get_derived_schema(self, name: str, factory: Callable[[], Dict]) -> Dict:
+        """Schema, das aus anderen Schemata zusammengesetzt wird (z.B. combined validation)"""
+        with self._lock:
+            schema = self._schemas.get(name)
+        if schema is None:
+            schema = factory()
+            with self._lock:
+                schema = self._schemas.setdefault(name, schema)
+        return schema
+
+    def get_structured_llm(self, model: str, temperature: Optional[float], schema: Dict,
+                           session_collector=None):
+        """Gibt das gecachte llm.with_structured_output(schema, include_raw=True) zurück"""
+        start = time.perf_counter()
+        key = (model, temperature, self.fingerprint(schema))
+
+        with self._lock:
+            runnable = self._runnables.get(key)
+            if runnable is not None:
+                self.hits += 1
+                saved = self._build_times[key]
+                self.setup_time_saved += saved
+
+        if runnable is None:
+            # Basis-Client kommt aus dem Pool, damit alle Runnables dieselben Verbindungen nutzen
+            runnable = llm_manager.get_llm(model, temperature).with_structured_output(
+                schema=schema, include_raw=True
+            )
+            build_time = time.perf_counter() - start
+            saved = 0.0
+
+            with self._lock:
+                # Bei gleichzeitigem Aufbau gewinnt der erste Eintrag
+                if key in self._runnables:
+                    runnable = self._runnables[key]
+                else:
+                    self._runnables[key] = runnable
+                    self._build_times[key] = build_time
+                    self.misses += 1
+
+        if session_collector is not None:
+            session_collector.record_setup_time(time.perf_counter() - start, saved)
+
+        return runnable
+
+    @staticmethod
+    def fingerprint(schema: Dict) -> str:
+        payload = json.dumps(schema, sort_keys=True, ensure_ascii=False)
+        return hashlib.sha1(payload.encode('utf-8')).hexdigest()
+
+
+# Global instance
+schema_registry = SchemaRegistry()
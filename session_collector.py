@@ -1,12 +1,33 @@
+import functools
 import sqlite3
 import json
+import threading
 import time
 from datetime import datetime
-from typing import Dict, Optional
+from typing import Dict, List, Optional
+from budget import BudgetExceededError, batch_ledger, budget_limits
 from data_moduels.validation_mode import ValidationMode
+from metrics_schema import METRIC_COLUMNS, SESSION_COLUMNS, ensure_metrics_schema, write_metrics
+from output_store import ensure_output_tables, write_iteration_outputs
+
+
+def _synchronized(method):
+    # Parallele Validation-Branches und Early-Validation-Threads schreiben in denselben Collector
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        with self._lock:
+            return method(self, *args, **kwargs)
+    return wrapper
+
+
 class SessionCollector:
+    """
+    Metriken einer Session (ein Rezept, alle Modi). Jede Session hat ihren eigenen Collector
+    (siehe shared_session_collector); alle Zugriffe sind über eine Sperre pro Collector serialisiert.
+    """
 
     def __init__(self):
+        self._lock = threading.RLock()
         self.session_id = None
         self.raw_text = None
         self.session_start_time = None
@@ -23,6 +44,37 @@ class SessionCollector:
             'quality_score': '',
             'errors': '',
             'recipe_name': '',
+            # Validierungs-Aufwand (Vergleich sectioned vs. combined)
+            'validator_strategy': '',
+            'validation_calls': 0,
+            'validation_input_tokens': 0,
+            'validation_output_tokens': 0,
+            # Inkrementelle Re-Validierung: pro Iteration übersprungene Aufrufe / gesparte Tokens
+            'skipped_validation_calls': [],
+            'saved_validation_tokens': [],
+            # Lokaler Vorab-Check: pro Iteration ohne LLM abgeschlossene Abschnitte
+            'prevalidated_sections': [],
+            # Matching-Modus des Quality-Scorings (greedy / optimal)
+            'matching_mode': '',
+            # Patch-Reparatur: angewendete Patches / Fallbacks auf vollständige Neugenerierung
+            'patch_repairs': 0,
+            'patch_fallbacks': 0,
+            # Streaming-Transformer: vorgezogene Abschnittsprüfungen und ihre Überlappung mit dem Transform
+            'early_validations': 0,
+            'early_validation_overlap': 0.0,
+            # Konvergenz: Grund für das Ende der Schleife und nicht benötigte Iterationen
+            'stop_reason': '',
+            'iterations_saved': 0,
+            # Budget: Bereich (session/recipe/batch), dessen Grenze den Lauf beendet hat
+            'budget_exceeded': '',
+            # Modell-Kaskade: Transform-Modell pro Iteration
+            'transform_models': [],
+            # LLM-Response-Cache
+            'cache_hits': 0,
+            'cache_misses': 0,
+            # Setup der Structured-Output-Runnables (SchemaRegistry)
+            'setup_time': 0.0,
+            'setup_time_saved': 0.0,
             # Neue detaillierte Metriken
             'overall_f1': [],
             'overall_precision': [],
@@ -49,6 +101,24 @@ class SessionCollector:
             'quality_score': '',
             'errors': '',
             'recipe_name': '',
+            # Matching-Modus des Quality-Scorings (greedy / optimal)
+            'matching_mode': '',
+            # Patch-Reparatur: angewendete Patches / Fallbacks auf vollständige Neugenerierung
+            'patch_repairs': 0,
+            'patch_fallbacks': 0,
+            # Konvergenz: Grund für das Ende der Schleife und nicht benötigte Iterationen
+            'stop_reason': '',
+            'iterations_saved': 0,
+            # Budget: Bereich (session/recipe/batch), dessen Grenze den Lauf beendet hat
+            'budget_exceeded': '',
+            # Modell-Kaskade: Transform-Modell pro Iteration
+            'transform_models': [],
+            # LLM-Response-Cache
+            'cache_hits': 0,
+            'cache_misses': 0,
+            # Setup der Structured-Output-Runnables (SchemaRegistry)
+            'setup_time': 0.0,
+            'setup_time_saved': 0.0,
             # Neue detaillierte Metriken
             'overall_f1': [],
             'overall_precision': [],
@@ -64,9 +134,16 @@ class SessionCollector:
             'metadata_recall': []
         }
 
+        # JSON-Ausgabe jeder bewerteten Iteration (für das Offline-Rescoring)
+        self.iteration_outputs = {'AUTOMATIC': [], 'HUMAN': []}
+        # Eine Zeile pro Node-Ausführung (Tabelle node_executions)
+        self.node_executions = []
+
         self.current_mode = None
-        self.current_node_start = None
+        # Startzeit pro laufendem Node ("transform", "validate", "human_feedback")
+        self._node_starts: Dict[str, float] = {}
 
+    @_synchronized
     def start_session(self, session_id: str, raw_text: str, recipe_name: str):
         """Startet neue Session"""
         self.session_id = session_id
@@ -79,6 +156,15 @@ class SessionCollector:
             'iterations': 0, 'transform_time': 0.0, 'validation_time': 0.0,
             'errors': '',
             'recipe_name': recipe_name,
+            'validator_strategy': '', 'validation_calls': 0,
+            'validation_input_tokens': 0, 'validation_output_tokens': 0,
+            'skipped_validation_calls': [], 'saved_validation_tokens': [], 'prevalidated_sections': [],
+            'matching_mode': '',
+            'patch_repairs': 0, 'patch_fallbacks': 0,
+            'early_validations': 0, 'early_validation_overlap': 0.0,
+            'stop_reason': '', 'iterations_saved': 0, 'budget_exceeded': '', 'transform_models': [],
+            'cache_hits': 0, 'cache_misses': 0,
+            'setup_time': 0.0, 'setup_time_saved': 0.0,
             'overall_f1': [], 'overall_precision': [], 'overall_recall': [],
             'ingredients_f1': [], 'ingredients_precision': [], 'ingredients_recall': [],
             'steps_f1': [], 'steps_precision': [], 'steps_recall': [],
@@ -89,52 +175,164 @@ class SessionCollector:
             'iterations': 0, 'transform_time': 0.0, 'feedback_time': 0.0,
             'errors': '',
             'recipe_name': recipe_name,
+            'matching_mode': '',
+            'patch_repairs': 0, 'patch_fallbacks': 0,
+            'stop_reason': '', 'iterations_saved': 0, 'budget_exceeded': '', 'transform_models': [],
+            'cache_hits': 0, 'cache_misses': 0,
+            'setup_time': 0.0, 'setup_time_saved': 0.0,
             'overall_f1': [], 'overall_precision': [], 'overall_recall': [],
             'ingredients_f1': [], 'ingredients_precision': [], 'ingredients_recall': [],
             'steps_f1': [], 'steps_precision': [], 'steps_recall': [],
             'metadata_f1': [], 'metadata_precision': [], 'metadata_recall': []
         }
+        self.iteration_outputs = {'AUTOMATIC': [], 'HUMAN': []}
+        self.node_executions = []
+        self._node_starts = {}
 
+    @_synchronized
     def start_node(self, node_name: str, validation_mode: ValidationMode):
         """Startet Node-Timing"""
         self.current_mode = validation_mode
-        self.current_node_start = time.time()
+        self._node_starts[node_name] = time.time()
 
-    def end_transform_node(self, cost: float, input_tokens: int, output_tokens: int):
+    @_synchronized
+    def end_transform_node(self, cost: float, input_tokens: int, output_tokens: int, model: str = ''):
         """Beendet Transform Node"""
-        if self.current_node_start is None:
+        node_start = self._node_starts.pop("transform", None)
+        if node_start is None:
             return
 
-        execution_time = time.time() - self.current_node_start
+        execution_time = time.time() - node_start
 
         if self.current_mode == ValidationMode.AUTOMATIC:
+            self._record_node_execution('AUTOMATIC', self.auto_data['iterations'], 'transform', node_start,
+                                        execution_time, cost, input_tokens, output_tokens)
             self.auto_data['input_tokens'] += input_tokens
             self.auto_data['output_tokens'] += output_tokens
             self.auto_data['total_cost'] += cost
             self.auto_data['transform_time'] += execution_time
             self.auto_data['iterations'] += 1
+            self.auto_data['transform_models'].append(model)
+            batch_ledger.add(cost, input_tokens + output_tokens)
 
         else:
+            self._record_node_execution('HUMAN', self.human_data['iterations'], 'transform', node_start,
+                                        execution_time, cost, input_tokens, output_tokens)
             self.human_data['input_tokens'] += input_tokens
             self.human_data['output_tokens'] += output_tokens
             self.human_data['total_cost'] += cost
             self.human_data['transform_time'] += execution_time
             self.human_data['iterations'] += 1
-
+            self.human_data['transform_models'].append(model)
+            batch_ledger.add(cost, input_tokens + output_tokens)
+
+    def _record_node_execution(self, validation_mode: str, iteration: int, node: str, started_at: float,
+                               duration: float, cost: float = 0.0, input_tokens: int = 0, output_tokens: int = 0):
+        self.node_executions.append((self.session_id, validation_mode, iteration, node, started_at, duration,
+                                     cost, input_tokens, output_tokens))
+
+    @_synchronized
+    def record_cache_lookup(self, hit: bool):
+        """Zählt Treffer/Fehlschläge des LLM-Response-Caches für den aktuellen Modus"""
+        data = self.auto_data if self.current_mode == ValidationMode.AUTOMATIC else self.human_data
+        if hit:
+            data['cache_hits'] += 1
+        else:
+            data['cache_misses'] += 1
+
+    @_synchronized
+    def record_patch_attempt(self, applied: bool, cost: float = 0.0, input_tokens: int = 0, output_tokens: int = 0):
+        """Zählt Patch-Reparaturen; ein verworfener Patch-Aufruf wird mit seinen Kosten verbucht"""
+        data = self.auto_data if self.current_mode == ValidationMode.AUTOMATIC else self.human_data
+        if applied:
+            data['patch_repairs'] += 1
+        else:
+            data['patch_fallbacks'] += 1
+        data['input_tokens'] += input_tokens
+        data['output_tokens'] += output_tokens
+        data['total_cost'] += cost
+        batch_ledger.add(cost, input_tokens + output_tokens)
+
+    @_synchronized
+    def check_budget(self, estimated_tokens: int, estimated_cost: float):
+        """
+        Prüft einen geplanten LLM-Aufruf gegen die Budgets (budget_limits) und wirft
+        BudgetExceededError, wenn Session-, Rezept- oder Batch-Grenze überschritten würde.
+        """
+        data = self.auto_data if self.current_mode == ValidationMode.AUTOMATIC else self.human_data
+        scopes = [
+            ('session', data['input_tokens'] + data['output_tokens'], data['total_cost'],
+             budget_limits.session_tokens, budget_limits.session_cost),
+            ('recipe',
+             sum(d['input_tokens'] + d['output_tokens'] for d in (self.auto_data, self.human_data)),
+             self.auto_data['total_cost'] + self.human_data['total_cost'],
+             budget_limits.recipe_tokens, budget_limits.recipe_cost),
+            ('batch', *batch_ledger.totals(), budget_limits.batch_tokens, budget_limits.batch_cost),
+        ]
+
+        for scope, tokens, cost, max_tokens, max_cost in scopes:
+            error = None
+            if max_tokens is not None and tokens + estimated_tokens > max_tokens:
+                error = BudgetExceededError(scope, 'tokens', max_tokens, tokens + estimated_tokens)
+            elif max_cost is not None and cost + estimated_cost > max_cost:
+                error = BudgetExceededError(scope, 'cost', max_cost, cost + estimated_cost)
+            if error is not None:
+                data['budget_exceeded'] = scope
+                raise error
+
+    @_synchronized
+    def record_early_validation(self, overlap_time: float):
+        """Vorgezogene Abschnittsprüfung (nur AUTOMATIC) mit der Zeit, die parallel zum Transform lief"""
+        self.auto_data['early_validations'] += 1
+        self.auto_data['early_validation_overlap'] += overlap_time
+
+    @_synchronized
+    def set_stop_reason(self, validation_mode: ValidationMode, stop_reason: str, iterations_saved: int):
+        """Wird vom Finalizer gesetzt (completed, max_iterations, fixed_point, repeated_errors, cycle, plateau)"""
+        data = self.auto_data if validation_mode == ValidationMode.AUTOMATIC else self.human_data
+        data['stop_reason'] = stop_reason
+        data['iterations_saved'] = iterations_saved
+
+    @_synchronized
+    def record_setup_time(self, setup_time: float, setup_time_saved: float):
+        """Zeit für das Beschaffen des Structured-Output-Runnables und die durch die Registry gesparte Zeit"""
+        data = self.auto_data if self.current_mode == ValidationMode.AUTOMATIC else self.human_data
+        data['setup_time'] += setup_time
+        data['setup_time_saved'] += setup_time_saved
+
+    @_synchronized
     def end_validation_node(self, quality_metrics: Dict, cost: float,
-                            input_tokens: int = 0, output_tokens: int = 0, errors: str = ''):
+                            input_tokens: int = 0, output_tokens: int = 0, errors: str = '',
+                            validation_calls: int = 0, validator_strategy: str = '',
+                            json_output: Optional[Dict] = None, skipped_calls: int = 0, saved_tokens: int = 0,
+                            prevalidated_sections: int = 0):
         """Beendet Validation Node (nur AUTOMATIC) mit detaillierten Metriken"""
-        if self.current_node_start is None or self.current_mode != ValidationMode.AUTOMATIC:
+        node_start = self._node_starts.pop("validate", None)
+        if node_start is None or self.current_mode != ValidationMode.AUTOMATIC:
             return
 
-        execution_time = time.time() - self.current_node_start
+        execution_time = time.time() - node_start
+        self._record_node_execution('AUTOMATIC', len(self.auto_data['overall_f1']), 'validate', node_start,
+                                    execution_time, cost, input_tokens, output_tokens)
         self.auto_data['validation_time'] += execution_time
         self.auto_data['total_cost'] += cost
         self.auto_data['input_tokens'] += input_tokens
         self.auto_data['output_tokens'] += output_tokens
         self.auto_data['errors'] = errors
 
+        # Validierungs-Aufwand getrennt vom Transformer erfassen
+        self.auto_data['validator_strategy'] = validator_strategy
+        self.auto_data['validation_calls'] += validation_calls
+        self.auto_data['validation_input_tokens'] += input_tokens
+        self.auto_data['validation_output_tokens'] += output_tokens
+        batch_ledger.add(cost, input_tokens + output_tokens)
+        self.auto_data['skipped_validation_calls'].append(skipped_calls)
+        self.auto_data['saved_validation_tokens'].append(saved_tokens)
+        self.auto_data['prevalidated_sections'].append(prevalidated_sections)
+        self.iteration_outputs['AUTOMATIC'].append(json_output)
+
         # Speichere alle Metriken
+        self.auto_data['matching_mode'] = quality_metrics.get('matching_mode', '')
         self.auto_data['overall_f1'].append(quality_metrics.get('overall_f1', 0.0))
         self.auto_data['overall_precision'].append(quality_metrics.get('overall_precision', 0.0))
         self.auto_data['overall_recall'].append(quality_metrics.get('overall_recall', 0.0))
@@ -151,15 +349,21 @@ class SessionCollector:
         self.auto_data['metadata_precision'].append(quality_metrics.get('metadata_precision', 0.0))
         self.auto_data['metadata_recall'].append(quality_metrics.get('metadata_recall', 0.0))
 
-    def end_human_feedback_node(self, quality_metrics: Dict):
+    @_synchronized
+    def end_human_feedback_node(self, quality_metrics: Dict, json_output: Optional[Dict] = None):
         """Beendet Human Feedback Node (nur HUMAN) mit detaillierten Metriken"""
-        if self.current_node_start is None or self.current_mode != ValidationMode.HUMAN:
+        node_start = self._node_starts.pop("human_feedback", None)
+        if node_start is None or self.current_mode != ValidationMode.HUMAN:
             return
 
-        execution_time = time.time() - self.current_node_start
+        execution_time = time.time() - node_start
+        self._record_node_execution('HUMAN', len(self.human_data['overall_f1']), 'human_feedback', node_start,
+                                    execution_time)
         self.human_data['feedback_time'] += execution_time
+        self.iteration_outputs['HUMAN'].append(json_output)
 
         # Speichere alle Metriken
+        self.human_data['matching_mode'] = quality_metrics.get('matching_mode', '')
         self.human_data['overall_f1'].append(quality_metrics.get('overall_f1', 0.0))
         self.human_data['overall_precision'].append(quality_metrics.get('overall_precision', 0.0))
         self.human_data['overall_recall'].append(quality_metrics.get('overall_recall', 0.0))
@@ -183,154 +387,167 @@ class SessionCollector:
     #     else:
     #         self.human_data['quality_score'] += ";" + str( quality_score )
 
-    def export_to_sqlite(self, db_path: str = "experiment_results.db"):
-        """Exportiert Daten mit detaillierten Metriken in SQLite"""
-        conn = sqlite3.connect(db_path)
-
-        # Erweiterte Tabelle mit allen Metriken
-        conn.execute('''
-            CREATE TABLE IF NOT EXISTS session_results (
-                session_id TEXT,
-                validation_mode TEXT,
-                recipe_name TEXT,
-                input_tokens INTEGER,
-                output_tokens INTEGER,
-                total_cost REAL,
-                total_time REAL,
-                iterations INTEGER,
-                raw_text_length INTEGER,
-                errors TEXT,
-                timestamp TEXT,
-                
-                -- Overall Metriken (als Komma-getrennte Liste für alle Iterationen)
-                overall_f1 TEXT,
-                overall_precision TEXT,
-                overall_recall TEXT,
-                
-                -- Ingredients Metriken
-                ingredients_f1 TEXT,
-                ingredients_precision TEXT,
-                ingredients_recall TEXT,
-                
-                -- Steps Metriken
-                steps_f1 TEXT,
-                steps_precision TEXT,
-                steps_recall TEXT,
-                
-                -- Metadata Metriken
-                metadata_f1 TEXT,
-                metadata_precision TEXT,
-                metadata_recall TEXT
-            )
-        ''')
-
+    @staticmethod
+    def ensure_schema(conn: sqlite3.Connection):
+        """Normalisiertes Metrik-Schema (metrics_schema) und Tabellen der Iterations-Ausgaben"""
+        ensure_metrics_schema(conn)
+        ensure_output_tables(conn)
+
+    @_synchronized
+    def export_records(self, validation_mode: Optional[ValidationMode] = None) -> Dict:
+        """
+        Momentaufnahme der Session für den Export: Zeilen für sessions, iterations und
+        node_executions, Iterations-Ausgaben und der JSONL-Datensatz. Enthält nur Kopien,
+        der Collector kann danach weiterlaufen. Mit validation_mode nur dieser Modus
+        (Export direkt nach dem Ende des Modus).
+        """
         timestamp = datetime.now().isoformat()
         raw_text_length = len(self.raw_text) if self.raw_text else 0
+        mode_names = {validation_mode.name} if validation_mode is not None else {'AUTOMATIC', 'HUMAN'}
+
+        sessions = []
+        iterations = []
+        outputs = []
+
+        modes = (
+            ('AUTOMATIC', self.auto_data, self.auto_data['transform_time'] + self.auto_data['validation_time']),
+            ('HUMAN', self.human_data, self.human_data['transform_time'] + self.human_data['feedback_time']),
+        )
+        for mode_name, data, total_time in modes:
+            if data['iterations'] == 0 or mode_name not in mode_names:
+                continue
+
+            row = {
+                **data,
+                'session_id': self.session_id,
+                'validation_mode': mode_name,
+                'timestamp': timestamp,
+                'total_time': total_time,
+                'raw_text_length': raw_text_length,
+                'final_f1': data['overall_f1'][-1] if data['overall_f1'] else None,
+            }
+            sessions.append(tuple(row.get(column) for column in SESSION_COLUMNS))
 
-        # Helper Funktion zum Konvertieren von Listen zu Strings
-        def list_to_str(lst):
-            return ','.join([f"{x:.4f}" for x in lst]) if lst else ''
-
-        # AUTOMATIC Eintrag
-        if self.auto_data['iterations'] > 0:
-            auto_total_time = self.auto_data['transform_time'] + self.auto_data['validation_time']
-            conn.execute('''
-                INSERT INTO session_results 
-                (session_id, validation_mode, recipe_name ,input_tokens, output_tokens, total_cost, 
-                 total_time, iterations, raw_text_length, errors, timestamp,
-                 overall_f1, overall_precision, overall_recall,
-                 ingredients_f1, ingredients_precision, ingredients_recall,
-                 steps_f1, steps_precision, steps_recall,
-                 metadata_f1, metadata_precision, metadata_recall)
-                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-            ''', (
-                self.session_id, 'AUTOMATIC', self.auto_data['recipe_name'],
-                self.auto_data['input_tokens'], self.auto_data['output_tokens'],
-                self.auto_data['total_cost'], auto_total_time,
-                self.auto_data['iterations'], raw_text_length,
-                self.auto_data['errors'], timestamp,
-                list_to_str(self.auto_data['overall_f1']),
-                list_to_str(self.auto_data['overall_precision']),
-                list_to_str(self.auto_data['overall_recall']),
-                list_to_str(self.auto_data['ingredients_f1']),
-                list_to_str(self.auto_data['ingredients_precision']),
-                list_to_str(self.auto_data['ingredients_recall']),
-                list_to_str(self.auto_data['steps_f1']),
-                list_to_str(self.auto_data['steps_precision']),
-                list_to_str(self.auto_data['steps_recall']),
-                list_to_str(self.auto_data['metadata_f1']),
-                list_to_str(self.auto_data['metadata_precision']),
-                list_to_str(self.auto_data['metadata_recall'])
-            ))
-
-        # HUMAN Eintrag
-        if self.human_data['iterations'] > 0:
-            human_total_time = self.human_data['transform_time'] + self.human_data['feedback_time']
-            conn.execute('''
-                INSERT INTO session_results 
-                (session_id, validation_mode, recipe_name,input_tokens, output_tokens, total_cost, 
-                 total_time, iterations, raw_text_length, errors, timestamp,
-                 overall_f1, overall_precision, overall_recall,
-                 ingredients_f1, ingredients_precision, ingredients_recall,
-                 steps_f1, steps_precision, steps_recall,
-                 metadata_f1, metadata_precision, metadata_recall)
-                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-            ''', (
-                self.session_id, 'HUMAN', self.human_data['recipe_name'],
-                self.human_data['input_tokens'], self.human_data['output_tokens'],
-                self.human_data['total_cost'], human_total_time,
-                self.human_data['iterations'], raw_text_length,
-                self.human_data['errors'], timestamp,
-                list_to_str(self.human_data['overall_f1']),
-                list_to_str(self.human_data['overall_precision']),
-                list_to_str(self.human_data['overall_recall']),
-                list_to_str(self.human_data['ingredients_f1']),
-                list_to_str(self.human_data['ingredients_precision']),
-                list_to_str(self.human_data['ingredients_recall']),
-                list_to_str(self.human_data['steps_f1']),
-                list_to_str(self.human_data['steps_precision']),
-                list_to_str(self.human_data['steps_recall']),
-                list_to_str(self.human_data['metadata_f1']),
-                list_to_str(self.human_data['metadata_precision']),
-                list_to_str(self.human_data['metadata_recall'])
-            ))
-
-        conn.commit()
-        conn.close()
-        print(f"Session {self.session_id} exported to {db_path}")
+            # Eine Zeile pro bewerteter Iteration; Listen, die es nur in AUTOMATIC gibt, bleiben NULL
+            per_iteration = [data[column] for column in METRIC_COLUMNS] + [
+                data.get('skipped_validation_calls', []), data.get('saved_validation_tokens', []),
+                data.get('prevalidated_sections', []), data['transform_models']
+            ]
+            for iteration in range(len(data['overall_f1'])):
+                iterations.append((self.session_id, mode_name, iteration) + tuple(
+                    values[iteration] if iteration < len(values) else None for values in per_iteration
+                ))
 
+            outputs.append((mode_name, data['recipe_name'], list(self.iteration_outputs[mode_name])))
 
-    def export_to_json(self, json_path: str = "experiment_results.json"):
-        timestamp = datetime.now().isoformat()
+        return {
+            'session_id': self.session_id,
+            'sessions': sessions,
+            'iterations': iterations,
+            'node_executions': [row for row in self.node_executions if row[1] in mode_names],
+            'outputs': outputs,
+            'json': json.dumps(self._json_record(timestamp, raw_text_length, mode_names), ensure_ascii=False)
+        }
+
+    @_synchronized
+    def mode_snapshot(self, validation_mode: ValidationMode) -> Dict:
+        """Metriken eines Modus als JSON-fähige Kopie (zum Fortsetzen nach einem Absturz, siehe BatchManifest)"""
+        data = self.auto_data if validation_mode == ValidationMode.AUTOMATIC else self.human_data
+        return json.loads(json.dumps({
+            'data': data,
+            'iteration_outputs': self.iteration_outputs[validation_mode.name],
+            'node_executions': [row for row in self.node_executions if row[1] == validation_mode.name],
+            'open_nodes': list(self._node_starts),
+        }))
+
+    @_synchronized
+    def restore_mode(self, validation_mode: ValidationMode, snapshot: Dict):
+        """Übernimmt die mit mode_snapshot gespeicherten Metriken eines Modus in diese Session"""
+        data = self.auto_data if validation_mode == ValidationMode.AUTOMATIC else self.human_data
+        data.update(snapshot['data'])
+        self.iteration_outputs[validation_mode.name] = list(snapshot['iteration_outputs'])
+        self.node_executions = [row for row in self.node_executions if row[1] != validation_mode.name] + [
+            (self.session_id,) + tuple(row[1:]) for row in snapshot['node_executions']
+        ]
+        # Vor dem Abbruch begonnene Knoten (z.B. validate vor den Abschnitten) laufen ab jetzt weiter;
+        # die Zeit vor dem Abbruch fehlt, Kosten und Tokens zählt der Knoten beim Beenden
+        self.current_mode = validation_mode
+        self._node_starts.update(dict.fromkeys(snapshot.get('open_nodes', []), time.time()))
+
+    @staticmethod
+    def write_export_records(conn: sqlite3.Connection, records: List[Dict]):
+        """Schreibt die Exporte mehrerer Sessions; Zeilen pro Tabelle per executemany"""
+        write_metrics(conn, records)
+        for record in records:
+            for validation_mode, recipe_name, outputs in record['outputs']:
+                write_iteration_outputs(conn, record['session_id'], validation_mode, recipe_name, outputs)
+
+    def export_to_sqlite(self, db_path: str = "experiment_results.db"):
+        """Exportiert Daten mit detaillierten Metriken in SQLite (synchron; im Batch: experiment_writer)"""
+        conn = sqlite3.connect(db_path)
+        try:
+            self.ensure_schema(conn)
+            self.write_export_records(conn, [self.export_records()])
+            conn.commit()
+        finally:
+            conn.close()
+        print(f"Session {self.session_id} exported to {db_path}")
 
+    def _json_record(self, timestamp: str, raw_text_length: int, mode_names=('AUTOMATIC', 'HUMAN')) -> Dict:
         export_data = {
             'session_id': self.session_id,
             'export_timestamp': timestamp,
-            'raw_text_length': len(self.raw_text) if self.raw_text else 0,
+            'raw_text_length': raw_text_length,
             'modes': {}
         }
 
-        if self.auto_data['iterations'] > 0:
+        if self.auto_data['iterations'] > 0 and 'AUTOMATIC' in mode_names:
             export_data['modes']['AUTOMATIC'] = {
                 **self.auto_data,
                 'total_time': self.auto_data['transform_time'] + self.auto_data['validation_time']
             }
 
-        if self.human_data['iterations'] > 0:
+        if self.human_data['iterations'] > 0 and 'HUMAN' in mode_names:
             export_data['modes']['HUMAN'] = {
                 **self.human_data,
                 'total_time': self.human_data['transform_time'] + self.human_data['feedback_time']
             }
 
-        with open(json_path, 'w', encoding='utf-8') as f:
-            json.dump(export_data, f, indent=2, ensure_ascii=False)
+        return export_data
+
+    def export_to_columnar(self, base_dir: str = "experiment_results_columnar", format: str = "parquet"):
+        """Schreibt die Session in die spaltenorientierten Datasets (Parquet / Arrow IPC, siehe columnar_export)"""
+        from columnar_export import ColumnarWriter
+
+        with ColumnarWriter(base_dir, format) as writer:
+            writer.write([self.export_records()])
+        print(f"Session {self.session_id} exported to {base_dir}")
+
+    def export_to_json(self, json_path: str = "experiment_results.jsonl"):
+        """Hängt die Session als eine Zeile an einen JSONL-Stream an"""
+        with open(json_path, 'a', encoding='utf-8') as f:
+            f.write(self.export_records()['json'] + '\n')
 
         print(f"Session {self.session_id} exported to {json_path}")
 
+    @_synchronized
     def get_summary(self) -> Dict:
         """Gibt Session-Summary zurück"""
         return {
             'session_id': self.session_id,
             'automatic': self.auto_data if self.auto_data['iterations'] > 0 else None,
             'human': self.human_data if self.human_data['iterations'] > 0 else None
+        }
+
+    @_synchronized
+    def totals(self) -> Dict:
+        """Summen über beide Modi (für die globale Sicht, siehe shared_session_collector.global_totals)"""
+        modes = (self.auto_data, self.human_data)
+        return {
+            'input_tokens': sum(d['input_tokens'] for d in modes),
+            'output_tokens': sum(d['output_tokens'] for d in modes),
+            'total_cost': sum(d['total_cost'] for d in modes),
+            'iterations': sum(d['iterations'] for d in modes),
+            'node_time': (self.auto_data['transform_time'] + self.auto_data['validation_time']
+                          + self.human_data['transform_time'] + self.human_data['feedback_time'])
         }
\ No newline at end of file
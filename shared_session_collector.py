@@ -1,4 +1,91 @@
 # Global session collector instance
+import contextvars
+import threading
+from contextlib import contextmanager
+from typing import Dict, Optional
+
 from session_collector import SessionCollector
 
-session_collector = SessionCollector()
\ No newline at end of file
+session_collector = SessionCollector()
+
+# Im Batch-Modus bekommt jede Session einen eigenen Collector. Die Nodes finden ihn
+# über die session_id im Graph-Config ("configurable"), nicht über globalen Zustand.
+_session_collectors: Dict[str, SessionCollector] = {}
+_registry_lock = threading.Lock()
+
+# Collector der laufenden Session im aktuellen Thread / asyncio-Task. Greift, wenn ein Aufruf
+# kein Graph-Config hat (z.B. Hilfsfunktionen außerhalb der Nodes).
+_current_collector: contextvars.ContextVar[Optional[SessionCollector]] = contextvars.ContextVar(
+    "session_collector", default=None
+)
+
+# Summen der bereits abgeschlossenen Sessions (globale Sicht über den Batch)
+_released_totals: Dict[str, float] = {}
+_released_sessions = 0
+
+
+def register_session_collector(session_id: str, collector: SessionCollector):
+    """Registriert den Collector einer Session"""
+    with _registry_lock:
+        _session_collectors[session_id] = collector
+
+
+def release_session_collector(session_id: str):
+    """Entfernt den Collector einer abgeschlossenen Session; ihre Summen bleiben in global_totals()"""
+    global _released_sessions
+    with _registry_lock:
+        collector = _session_collectors.pop(session_id, None)
+    if collector is None:
+        return
+
+    totals = collector.totals()
+    with _registry_lock:
+        for key, value in totals.items():
+            _released_totals[key] = _released_totals.get(key, 0) + value
+        _released_sessions += 1
+
+
+@contextmanager
+def session_context(collector: SessionCollector):
+    """Bindet den Collector an den aktuellen Thread / asyncio-Task (contextvars)"""
+    token = _current_collector.set(collector)
+    try:
+        yield collector
+    finally:
+        _current_collector.reset(token)
+
+
+def get_session_collector(config: Optional[dict] = None) -> SessionCollector:
+    """
+    Gibt den Collector der Session zurück: zuerst über die session_id im Graph-Config, dann aus
+    dem Kontext (session_context), zuletzt der globale Collector.
+    """
+    session_id = ((config or {}).get("configurable") or {}).get("session_id")
+    if session_id:
+        with _registry_lock:
+            collector = _session_collectors.get(session_id)
+        if collector is not None:
+            return collector
+    return _current_collector.get() or session_collector
+
+
+def global_totals() -> Dict[str, float]:
+    """Summen über alle abgeschlossenen und laufenden Sessions (Tokens, Kosten, Iterationen, Node-Zeit)"""
+    with _registry_lock:
+        active = list(_session_collectors.values())
+        totals = dict(_released_totals)
+        sessions = _released_sessions
+
+    # Jeder Collector liefert einen konsistenten Stand unter seiner eigenen Sperre
+    for collector in active:
+        for key, value in collector.totals().items():
+            totals[key] = totals.get(key, 0) + value
+
+    return {**totals, 'sessions': sessions + len(active)}
+
+
+def reset_global_totals():
+    global _released_sessions
+    with _registry_lock:
+        _released_totals.clear()
+        _released_sessions = 0
@@ -0,0 +1,218 @@
+from difflib import SequenceMatcher
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+
+class SimilarityEngine:
+    """
+    Ähnlichkeitsvergleich für das Quality-Scoring mit exakt denselben Entscheidungen wie
+    SequenceMatcher(None, gold, pred).ratio() gegen eine Schwelle.
+
+    1. Jeder Text wird als Zeichen-n-Gramm-Profil (n=1, Zählvektor) abgelegt.
+    2. Für alle gold×prediction-Paare wird in einer NumPy-Operation die Schnittmenge der
+       Profile berechnet. 2*Schnitt/(len(a)+len(b)) ist eine obere Schranke für ratio()
+       (entspricht quick_ratio()), Paare darunter können nie matchen.
+    3. Die teure ratio() läuft nur noch für die verbleibenden Kandidaten, mit einem
+       SequenceMatcher pro Prediction (set_seq2 wird nur einmal analysiert).
+    """
+
+    # Obergrenze für die Zellen eines Zwischenblocks (rows × preds × Alphabet)
+    MAX_BLOCK_CELLS = 4_000_000
+
+    def upper_bounds(self, a_texts: Sequence[str], b_texts: Sequence[str]) -> np.ndarray:
+        """Matrix [len(a_texts), len(b_texts)] mit oberen Schranken für ratio()"""
+        alphabet: Dict[str, int] = {}
+        for text in (*a_texts, *b_texts):
+            for char in text:
+                alphabet.setdefault(char, len(alphabet))
+
+        a_profiles = self._profiles(a_texts, alphabet)
+        b_profiles = self._profiles(b_texts, alphabet)
+
+        lengths = (np.fromiter((len(t) for t in a_texts), dtype=np.int64, count=len(a_texts))[:, None]
+                   + np.fromiter((len(t) for t in b_texts), dtype=np.int64, count=len(b_texts))[None, :])
+
+        shared = np.empty(lengths.shape, dtype=np.int64)
+        cells_per_row = max(1, len(b_texts) * max(1, len(alphabet)))
+        block = max(1, self.MAX_BLOCK_CELLS // cells_per_row)
+        for start in range(0, len(a_texts), block):
+            rows = a_profiles[start:start + block, None, :]
+            shared[start:start + block] = np.minimum(rows, b_profiles[None, :, :]).sum(axis=2)
+
+        # Gleiche Formel wie difflib (2.0 * matches / length, 1.0 bei zwei leeren Texten),
+        # damit Schranke und ratio() bitgenau vergleichbar sind
+        bounds = np.ones(lengths.shape, dtype=np.float64)
+        nonempty = lengths > 0
+        bounds[nonempty] = 2.0 * shared[nonempty] / lengths[nonempty]
+        return bounds
+
+    @staticmethod
+    def _profiles(texts: Sequence[str], alphabet: Dict[str, int]) -> np.ndarray:
+        profiles = np.zeros((len(texts), max(1, len(alphabet))), dtype=np.int32)
+        for row, text in enumerate(texts):
+            if text:
+                indices = np.fromiter((alphabet[c] for c in text), dtype=np.int64, count=len(text))
+                np.add.at(profiles[row], indices, 1)
+        return profiles
+
+    @staticmethod
+    def passes(similarity: float, threshold: float, inclusive: bool) -> bool:
+        return similarity >= threshold if inclusive else similarity > threshold
+
+    def greedy_match(self, gold_texts: Sequence[str], pred_texts: Sequence[str], threshold: float,
+                     inclusive: bool = False,
+                     accept: Optional[Callable[[int, int], bool]] = None) -> List[Tuple[int, int]]:
+        """
+        Greedy First-Match wie die bisherigen verschachtelten Schleifen: für jedes Gold-Element
+        in Reihenfolge die erste noch freie Prediction, deren ratio() die Schwelle erfüllt.
+        accept(g_idx, p_idx) kann zusätzliche (billige) Bedingungen prüfen.
+        Gibt die gematchten (g_idx, p_idx)-Paare zurück.
+        """
+        if not gold_texts or not pred_texts:
+            return []
+
+        bounds = self.upper_bounds(gold_texts, pred_texts)
+        candidates = bounds >= threshold if inclusive else bounds > threshold
+
+        matchers: Dict[int, SequenceMatcher] = {}
+        matched_pred = set()
+        pairs = []
+
+        for g_idx, gold_text in enumerate(gold_texts):
+            for p_idx in np.flatnonzero(candidates[g_idx]).tolist():
+                if p_idx in matched_pred:
+                    continue
+                if accept is not None and not accept(g_idx, p_idx):
+                    continue
+
+                matcher = matchers.get(p_idx)
+                if matcher is None:
+                    matcher = SequenceMatcher(None)
+                    matcher.set_seq2(pred_texts[p_idx])
+                    matchers[p_idx] = matcher
+                matcher.set_seq1(gold_text)
+
+                if self.passes(matcher.ratio(), threshold, inclusive):
+                    matched_pred.add(p_idx)
+                    pairs.append((g_idx, p_idx))
+                    break
+
+        return pairs
+
+    def similarity_matrix(self, gold_texts: Sequence[str], pred_texts: Sequence[str], threshold: float,
+                          inclusive: bool = False,
+                          accept: Optional[Callable[[int, int], bool]] = None) -> np.ndarray:
+        """
+        Volle Matrix [gold, pred] mit ratio() für alle Paare, die die Schwelle erfüllen, sonst 0.
+        Paare unter der n-Gramm-Schranke werden nie exakt berechnet.
+        """
+        similarities = np.zeros((len(gold_texts), len(pred_texts)), dtype=np.float64)
+        if not gold_texts or not pred_texts:
+            return similarities
+
+        bounds = self.upper_bounds(gold_texts, pred_texts)
+        candidates = bounds >= threshold if inclusive else bounds > threshold
+
+        for p_idx in np.flatnonzero(candidates.any(axis=0)).tolist():
+            matcher = SequenceMatcher(None)
+            matcher.set_seq2(pred_texts[p_idx])
+            for g_idx in np.flatnonzero(candidates[:, p_idx]).tolist():
+                if accept is not None and not accept(g_idx, p_idx):
+                    continue
+                matcher.set_seq1(gold_texts[g_idx])
+                similarity = matcher.ratio()
+                if self.passes(similarity, threshold, inclusive):
+                    # Auch ratio() == 0 bei Schwelle 0 soll als Kante zählen
+                    similarities[g_idx, p_idx] = max(similarity, np.finfo(np.float64).tiny)
+
+        return similarities
+
+    def optimal_match(self, gold_texts: Sequence[str], pred_texts: Sequence[str], threshold: float,
+                      inclusive: bool = False,
+                      accept: Optional[Callable[[int, int], bool]] = None) -> List[Tuple[int, int]]:
+        """
+        Maximum-Weight-Assignment über die Ähnlichkeitsmatrix (ungarische Methode).
+        Maximiert zuerst die Anzahl der Matches, bei Gleichstand die Summe der Ähnlichkeiten.
+        Unabhängig von der Reihenfolge der Listen bis auf exakte Gleichstände (deterministisch).
+        """
+        similarities = self.similarity_matrix(gold_texts, pred_texts, threshold, inclusive, accept)
+        edges = similarities > 0
+        if not edges.any():
+            return []
+
+        # Jede gültige Kante wiegt mehr als alle Ähnlichkeiten zusammen -> Kardinalität zuerst
+        weights = np.where(edges, similarities + min(similarities.shape) + 1, 0.0)
+
+        transposed = weights.shape[0] > weights.shape[1]
+        cost = -(weights.T if transposed else weights)
+        assignment = linear_sum_assignment(cost)
+
+        pairs = []
+        for row, col in assignment:
+            g_idx, p_idx = (col, row) if transposed else (row, col)
+            if edges[g_idx, p_idx]:
+                pairs.append((g_idx, p_idx))
+        return sorted(pairs)
+
+    def similar(self, a: str, b: str, threshold: float, inclusive: bool = False) -> bool:
+        """Einzelvergleich; die billigen Schranken von difflib zuerst"""
+        matcher = SequenceMatcher(None, a, b)
+        if not self.passes(matcher.real_quick_ratio(), threshold, inclusive):
+            return False
+        if not self.passes(matcher.quick_ratio(), threshold, inclusive):
+            return False
+        return self.passes(matcher.ratio(), threshold, inclusive)
+
+
+def linear_sum_assignment(cost: np.ndarray) -> List[Tuple[int, int]]:
+    """
+    Minimum-Cost-Assignment für eine Matrix [n, m] mit n <= m (ungarische Methode mit
+    Potentialen, O(n²·m)); die innere Schleife über die Spalten ist vektorisiert.
+    Gibt für jede Zeile (row, col) zurück.
+    """
+    n, m = cost.shape
+    u = np.zeros(n + 1)
+    v = np.zeros(m + 1)
+    owner = np.zeros(m + 1, dtype=np.int64)   # owner[j]: Zeile (1-basiert), der Spalte j zugeordnet ist
+    way = np.zeros(m + 1, dtype=np.int64)
+
+    for i in range(1, n + 1):
+        owner[0] = i
+        j0 = 0
+        min_slack = np.full(m + 1, np.inf)
+        used = np.zeros(m + 1, dtype=bool)
+
+        while True:
+            used[j0] = True
+            i0 = owner[j0]
+            free = ~used[1:]
+
+            slack = cost[i0 - 1] - u[i0] - v[1:]
+            improved = free & (slack < min_slack[1:])
+            min_slack[1:][improved] = slack[improved]
+            way[1:][improved] = j0
+
+            candidates = np.where(free, min_slack[1:], np.inf)
+            j1 = int(np.argmin(candidates)) + 1
+            delta = candidates[j1 - 1]
+
+            u[owner[used]] += delta
+            v[used] -= delta
+            min_slack[~used] -= delta
+
+            j0 = j1
+            if owner[j0] == 0:
+                break
+
+        # Augmentierenden Pfad zurückverfolgen
+        while j0:
+            j1 = way[j0]
+            owner[j0] = owner[j1]
+            j0 = j1
+
+    return sorted((int(owner[j]) - 1, j - 1) for j in range(1, m + 1) if owner[j])
+
+
+# Global instance
+similarity_engine = SimilarityEngine()
@@ -0,0 +1,163 @@
+import asyncio
+import json
+import time
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from langchain_core.messages import AIMessage
+
+from budget import enforce_budget
+from llm_cache import llm_cache, _cached_response, _store_response
+from llm_manager import llm_manager
+
+
+class IncrementalJsonScanner:
+    """
+    Liest ein wachsendes JSON-Objekt mit und meldet jedes Top-Level-Feld, sobald sein Wert
+    vollständig ist (z.B. "ingredients", während "cooking_steps" noch generiert wird).
+    """
+
+    def __init__(self):
+        self.buffer = ''
+        self._depth = 0
+        self._in_string = False
+        self._escape = False
+        self._expect = None        # 'key' oder 'value' auf Ebene 1
+        self._key_start = None
+        self._key = None
+        self._value_start = None
+
+    def feed(self, text: str) -> List[Tuple[str, Any]]:
+        completed = []
+        start = len(self.buffer)
+        self.buffer += text
+
+        for i in range(start, len(self.buffer)):
+            char = self.buffer[i]
+
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif char == '\\':
+                    self._escape = True
+                elif char == '"':
+                    self._in_string = False
+                    if self._key_start is not None:
+                        self._key = json.loads(self.buffer[self._key_start:i + 1])
+                        self._key_start = None
+                continue
+
+            if char == '"':
+                self._in_string = True
+                if self._depth == 1 and self._expect == 'key':
+                    self._key_start = i
+            elif char in '{[':
+                self._depth += 1
+                if self._depth == 1:
+                    self._expect = 'key'
+            elif char in '}]':
+                if self._depth == 1 and self._value_start is not None:
+                    # Skalar als letztes Feld
+                    completed.extend(self._complete(i))
+                self._depth -= 1
+                if self._depth == 1 and self._value_start is not None:
+                    completed.extend(self._complete(i + 1))
+            elif self._depth == 1:
+                if char == ':':
+                    self._expect = 'value'
+                    self._value_start = i + 1
+                elif char == ',':
+                    if self._value_start is not None:
+                        completed.extend(self._complete(i))
+                    self._expect = 'key'
+
+        return completed
+
+    def _complete(self, end: int) -> List[Tuple[str, Any]]:
+        raw_value = self.buffer[self._value_start:end].strip()
+        key = self._key
+        self._value_start = None
+        self._key = None
+        try:
+            return [(key, json.loads(raw_value))]
+        except ValueError:
+            return []
+
+
+def stream_structured_invoke(prompt: str, model: str, temperature: Optional[float], schema: Dict,
+                             on_field: Callable[[str, Any], None], session_collector=None) -> Dict[str, Any]:
+    """
+    Wie cached_structured_invoke, aber die Antwort wird gestreamt; on_field(key, value) wird für
+    jedes vollständige Top-Level-Feld aufgerufen, noch während der Rest generiert wird.
+    """
+    cached = _cache_lookup(prompt, model, temperature, schema, session_collector)
+    if cached is not None:
+        _emit_all(cached['parsed'], on_field)
+        return cached
+
+    enforce_budget(session_collector, model, prompt, schema)
+    start = time.time()
+    scanner = IncrementalJsonScanner()
+    message = None
+    for chunk in _streaming_llm(model, temperature, schema).stream(prompt):
+        message = chunk if message is None else message + chunk
+        for key, value in scanner.feed(_chunk_text(chunk)):
+            on_field(key, value)
+
+    return _finish_stream(prompt, model, temperature, schema, message, start)
+
+
+async def astream_structured_invoke(prompt: str, model: str, temperature: Optional[float], schema: Dict,
+                                    on_field: Callable[[str, Any], None], session_collector=None) -> Dict[str, Any]:
+    # Cache-Zugriffe (SQLite) wie in acached_structured_invoke im Thread-Pool
+    cached = await asyncio.to_thread(_cache_lookup, prompt, model, temperature, schema, session_collector)
+    if cached is not None:
+        _emit_all(cached['parsed'], on_field)
+        return cached
+
+    enforce_budget(session_collector, model, prompt, schema)
+    start = time.time()
+    scanner = IncrementalJsonScanner()
+    message = None
+    async for chunk in _streaming_llm(model, temperature, schema).astream(prompt):
+        message = chunk if message is None else message + chunk
+        for key, value in scanner.feed(_chunk_text(chunk)):
+            on_field(key, value)
+
+    return await asyncio.to_thread(_finish_stream, prompt, model, temperature, schema, message, start)
+
+
+def _streaming_llm(model: str, temperature: Optional[float], schema: Dict):
+    # Gepoolter Client mit Usage im letzten Chunk; Schema als response_format (Strict JSON)
+    return llm_manager.get_llm(model, temperature, stream_usage=True).bind(
+        response_format={"type": "json_schema", "json_schema": schema}
+    )
+
+
+def _cache_lookup(prompt: str, model: str, temperature: Optional[float], schema: Dict,
+                  session_collector=None) -> Optional[Dict[str, Any]]:
+    cached = llm_cache.get(llm_cache.make_key(model, temperature, prompt, schema))
+    if session_collector is not None:
+        session_collector.record_cache_lookup(hit=cached is not None)
+    return _cached_response(cached) if cached is not None else None
+
+
+def _emit_all(parsed: Dict, on_field: Callable[[str, Any], None]):
+    for key, value in (parsed or {}).items():
+        on_field(key, value)
+
+
+def _chunk_text(chunk) -> str:
+    return chunk.content if isinstance(chunk.content, str) else ''
+
+
+def _finish_stream(prompt: str, model: str, temperature: Optional[float], schema: Dict, message,
+                   start: float) -> Dict[str, Any]:
+    content = message.content if message is not None else ''
+    raw = AIMessage(content=content, usage_metadata=getattr(message, 'usage_metadata', None),
+                    response_metadata=getattr(message, 'response_metadata', None) or {})
+    llm_manager.record_call(model, {'raw': raw}, time.time() - start)
+
+    # Ungültiges JSON -> json.JSONDecodeError wie beim nicht-streamenden Aufruf
+    response = {'raw': raw, 'parsed': json.loads(content), 'parsing_error': None}
+    _store_response(llm_cache.make_key(model, temperature, prompt, schema), model, response, schema)
+    return response
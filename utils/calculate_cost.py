@@ -1,21 +1,41 @@
+# Current pricing (as of August 2024), per 1M tokens
+PRICING = {
+    "gpt-4o-2024-08-06": {"input": 5.00, "output": 15.00},
+    "gpt-4o-mini": {"input": 0.15, "output": 0.60},
+    "gpt-5": {"input": 1.25 , "output":10},
+    "gpt-5-nano": {"input": 0.05 , "output":0.40}
+}
+
+
+def _pricing_for(model: str):
+    # Die API meldet Snapshots ("gpt-5-nano-2025-08-07") - längster passender Präfix gewinnt
+    if model in PRICING:
+        return PRICING[model]
+    matches = [name for name in PRICING if model.startswith(name + "-")]
+    return PRICING[max(matches, key=len)] if matches else None
+
+
+def response_model(response: dict, default: str) -> str:
+    """Modell, das die Antwort tatsächlich erzeugt hat (response_metadata), sonst default"""
+    metadata = getattr(response.get("raw"), "response_metadata", None) or {}
+    return metadata.get("model_name") or default
+
+
 # Helper function for cost calculation
-def calculate_openai_cost(token_usage: dict, model: str) -> float:
+def calculate_openai_cost(token_usage: dict, model: str, cache_hit: bool = False) -> float:
 
-    # Current pricing (as of August 2024)
-    pricing = {
-        "gpt-4o-2024-08-06": {"input": 5.00, "output": 15.00},  # per 1M tokens
-        "gpt-4o-mini": {"input": 0.15, "output": 0.60},
-        "gpt-5": {"input": 1.25 , "output":10},
-        "gpt-5-nano": {"input": 0.05 , "output":0.40}
-    }
+    # Antworten aus dem LLM-Response-Cache kosten nichts
+    if cache_hit:
+        return 0.0
 
-    if model not in pricing:
+    pricing = _pricing_for(model or "")
+    if pricing is None:
         return 0.0
 
     input_tokens = token_usage.get('input_tokens', 0)
     output_tokens = token_usage.get('output_tokens', 0)
 
-    input_cost = (input_tokens / 1_000_000) * pricing[model]["input"]
-    output_cost = (output_tokens / 1_000_000) * pricing[model]["output"]
+    input_cost = (input_tokens / 1_000_000) * pricing["input"]
+    output_cost = (output_tokens / 1_000_000) * pricing["output"]
 
-    return input_cost + output_cost
\ No newline at end of file
+    return input_cost + output_cost
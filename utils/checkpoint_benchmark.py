@@ -0,0 +1,139 @@
+# Benchmark: Größe und Schreibzeit der Checkpoints mit vollständigem State pro Node (bisher)
+# vs. Referenzen auf Text/Schema und partiellen Updates (input_store)
+import json
+import os
+import tempfile
+import time
+import uuid
+
+from langgraph.checkpoint.base import empty_checkpoint
+from langgraph.checkpoint.sqlite import SqliteSaver
+
+from data_moduels.error_severity import ErrorSeverity
+from data_moduels.validation_error import ValidationError
+from data_moduels.validation_mode import ValidationMode
+from input_store import InputStore
+from recipe_validator import VALIDATION_SECTIONS
+
+
+def _errors(section: str, count: int = 3) -> list:
+    return [
+        ValidationError(type="omission", message=f"{section}: Angabe {i} fehlt im JSON",
+                        severity=ErrorSeverity.MAJOR, field_path=f"{section}[{i}]",
+                        suggested_fix=f"Angabe {i} aus dem Originaltext übernehmen")
+        for i in range(count)
+    ]
+
+
+def _steps(recipe_text: str, schema: dict, gold: dict, iterations: int) -> tuple:
+    """
+    Super-Steps eines AUTOMATIC-Laufs (Input, je Iteration Transform, Validate, drei Abschnitte, Join,
+    dann Finalize). Gibt (Eingabe bisher, Eingabe mit Referenzen, [(node, update)]) zurück; die
+    Updates sind die partiellen Updates der Nodes.
+    """
+    steps = [("input_processor", {"iteration_count": 0, "validation_errors": [], "iteration_history": [],
+                                  "transform_models": [], "is_complete": False})]
+    for iteration in range(1, iterations + 1):
+        steps.append(("transform", {"current_json_output": gold, "iteration_count": iteration,
+                                    "transform_models": ["gpt-5-nano"] * iteration}))
+        steps.append(("validate", {"section_results": {}, "pre_validation_errors": {}, "quality_score": 0.9,
+                                   "quality_metrics": {"overall_f1": 0.9, "ingredients_f1": 0.9, "steps_f1": 0.9}}))
+        for section in VALIDATION_SECTIONS:
+            steps.append((f"validate_{section}", {"section_results": {section: {
+                "iteration": iteration, "errors": _errors(section), "cost": 0.0002,
+                "input_tokens": 1200, "output_tokens": 300, "input_hash": uuid.uuid4().hex}}}))
+        steps.append(("validation_join", {
+            "validation_errors": [e for section in VALIDATION_SECTIONS for e in _errors(section)],
+            "iteration_history": [{"iteration": i, "output_hash": uuid.uuid4().hex, "error_hash": uuid.uuid4().hex,
+                                   "error_count": 9} for i in range(1, iteration + 1)]}))
+    steps.append(("finalize", {"final_output": {"status": "partial_success", "data": gold, "quality_score": 0.9},
+                               "is_complete": True}))
+
+    base = {"recipe_name": gold.get("name", ""), "domain": "recipe", "validation_mode": ValidationMode.AUTOMATIC,
+            "max_iterations": iterations}
+    full_input = {**base, "raw_text": recipe_text, "text": recipe_text, "target_schema": schema}
+    slim_input = {**base, "raw_text_ref": InputStore.make_ref(recipe_text),
+                  "target_schema_ref": InputStore.make_ref(schema)}
+    return full_input, slim_input, steps
+
+
+def _write_thread(saver: SqliteSaver, initial: dict, steps: list, full_state_writes: bool) -> float:
+    """Schreibt alle Super-Steps eines Threads wie der Graph (put_writes + put); gibt die Schreibzeit zurück"""
+    config = {"configurable": {"thread_id": uuid.uuid4().hex, "checkpoint_ns": ""}}
+    state = dict(initial)
+    elapsed = 0.0
+
+    for version, (node, update) in enumerate([("__input__", {})] + steps, start=1):
+        if "section_results" in update and node.startswith("validate_"):
+            merged = {**(state.get("section_results") or {}), **update["section_results"]}
+            state = {**state, "section_results": merged}
+            writes = update
+        else:
+            state = {**state, **update}
+            # Bisher gaben alle Nodes außer den Abschnitts-Branches {**state, ...} zurück
+            writes = state if full_state_writes and node != "__input__" else update
+
+        checkpoint = {**empty_checkpoint(), "channel_values": dict(state),
+                      "channel_versions": {key: version for key in state}}
+        start = time.perf_counter()
+        saver.put_writes(config, list(writes.items()), task_id=uuid.uuid4().hex)
+        config = saver.put(config, checkpoint, {"source": "loop", "step": version}, {key: version for key in writes})
+        elapsed += time.perf_counter() - start
+
+    return elapsed
+
+
+def _table_bytes(saver: SqliteSaver) -> tuple:
+    checkpoints = saver.conn.execute("SELECT COALESCE(SUM(LENGTH(checkpoint)), 0) FROM checkpoints").fetchone()[0]
+    writes = saver.conn.execute("SELECT COALESCE(SUM(LENGTH(value)), 0) FROM writes").fetchone()[0]
+    return checkpoints, writes
+
+
+def run_checkpoint_benchmark(recipes_dir: str = os.path.join("assets", "recipes"),
+                             gold_dir: str = os.path.join("assets", "gold_standards"),
+                             schema_path: str = os.path.join("assets", "output_schema.json"),
+                             iterations: int = 3, limit: int = 20) -> dict:
+    """Gibt pro Layout (full / slim) Checkpoint-Bytes, Write-Bytes und Schreibzeit über alle Rezepte zurück"""
+    with open(schema_path, 'r', encoding='utf-8') as f:
+        schema = json.load(f)
+
+    gold_files = {name.lower(): name for name in os.listdir(gold_dir) if name.endswith('.json')}
+    runs = []
+    for recipe_file in sorted(os.listdir(recipes_dir)):
+        gold_file = gold_files.get(recipe_file[:-4].lower() + '.json')
+        if not recipe_file.endswith('.txt') or gold_file is None:
+            continue
+        with open(os.path.join(recipes_dir, recipe_file), 'r', encoding='utf-8') as f:
+            recipe_text = f.read()
+        with open(os.path.join(gold_dir, gold_file), 'r', encoding='utf-8') as f:
+            gold = json.load(f)
+        runs.append(_steps(recipe_text, schema, gold, iterations))
+        if len(runs) >= limit:
+            break
+
+    results = {}
+    with tempfile.TemporaryDirectory() as directory:
+        for layout in ("full", "slim"):
+            with SqliteSaver.from_conn_string(os.path.join(directory, f"{layout}.db")) as saver:
+                elapsed = sum(
+                    _write_thread(saver, full_input if layout == "full" else slim_input, steps,
+                                  full_state_writes=layout == "full")
+                    for full_input, slim_input, steps in runs
+                )
+                checkpoint_bytes, write_bytes = _table_bytes(saver)
+            results[layout] = {"checkpoint_bytes": checkpoint_bytes, "write_bytes": write_bytes,
+                               "write_time": elapsed}
+
+    print(f"Checkpoint benchmark: {len(runs)} recipes, {iterations} iterations, "
+          f"{len(runs[0][2]) + 1 if runs else 0} super-steps per recipe")
+    print(f"{'Layout':<8}{'Checkpoints':>14}{'Writes':>14}{'Total':>14}{'Write time':>14}")
+    for layout, result in results.items():
+        total = result["checkpoint_bytes"] + result["write_bytes"]
+        print(f"{layout:<8}{result['checkpoint_bytes'] / 1024:>12.1f}KB{result['write_bytes'] / 1024:>12.1f}KB"
+              f"{total / 1024:>12.1f}KB{result['write_time'] * 1000:>12.1f}ms")
+    if results["full"]["checkpoint_bytes"]:
+        full = results["full"]["checkpoint_bytes"] + results["full"]["write_bytes"]
+        slim = results["slim"]["checkpoint_bytes"] + results["slim"]["write_bytes"]
+        print(f"  Reduction: {100 * (1 - slim / full):.1f}% bytes, "
+              f"{results['full']['write_time'] / max(results['slim']['write_time'], 1e-9):.1f}x faster writes")
+    return results
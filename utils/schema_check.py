@@ -0,0 +1,46 @@
+# Minimaler Schema-Check für die Structured-Output-Schemata (type, nullable, properties,
+# required, additionalProperties, items, enum) - genug, um lokal erzeugte JSONs zu prüfen
+from typing import Any, Dict, List
+
+_TYPE_CHECKS = {
+    'object': lambda v: isinstance(v, dict),
+    'array': lambda v: isinstance(v, list),
+    'string': lambda v: isinstance(v, str),
+    'integer': lambda v: isinstance(v, int) and not isinstance(v, bool),
+    'number': lambda v: isinstance(v, (int, float)) and not isinstance(v, bool),
+    'boolean': lambda v: isinstance(v, bool),
+    'null': lambda v: v is None,
+}
+
+
+def schema_errors(value: Any, schema: Dict, path: str = '') -> List[str]:
+    """Gibt alle Abweichungen von schema als Liste zurück (leer = gültig)"""
+    if value is None and schema.get('nullable'):
+        return []
+
+    types = schema.get('type')
+    if types is not None:
+        types = types if isinstance(types, list) else [types]
+        if not any(_TYPE_CHECKS.get(t, lambda v: True)(value) for t in types):
+            return [f"{path or '/'}: erwartet {'/'.join(types)}, erhalten {type(value).__name__}"]
+
+    if 'enum' in schema and value not in schema['enum']:
+        return [f"{path or '/'}: Wert {value!r} nicht erlaubt"]
+
+    errors = []
+    if isinstance(value, dict):
+        properties = schema.get('properties', {})
+        for key in schema.get('required', []):
+            if key not in value:
+                errors.append(f"{path}/{key}: fehlt")
+        for key, item in value.items():
+            if key in properties:
+                errors.extend(schema_errors(item, properties[key], f"{path}/{key}"))
+            elif schema.get('additionalProperties') is False:
+                errors.append(f"{path}/{key}: nicht im Schema")
+
+    elif isinstance(value, list) and 'items' in schema:
+        for index, item in enumerate(value):
+            errors.extend(schema_errors(item, schema['items'], f"{path}/{index}"))
+
+    return errors
@@ -0,0 +1,208 @@
+# Regression check: SimilarityEngine vs. die ursprünglichen SequenceMatcher-Schleifen
+import copy
+import json
+import os
+import random
+import time
+from difflib import SequenceMatcher
+
+from gold_standard_index import flatten_step_texts
+
+REGRESSION_THRESHOLDS = (0.75, 0.8, 0.85)
+
+
+def reference_evaluate_ingredients(gold_ingredients: list, current_ingredients: list, threshold: float) -> tuple:
+    if not gold_ingredients:
+        return (0, len(current_ingredients), 0) if current_ingredients else (0, 0, 0)
+    if not current_ingredients:
+        return (0, 0, len(gold_ingredients))
+
+    matched_gold_indices = set()
+    matched_pred_indices = set()
+
+    for g_idx, gold_ingredient in enumerate(gold_ingredients):
+        for p_idx, current_ingredient in enumerate(current_ingredients):
+            if p_idx not in matched_pred_indices:
+                if _reference_ingredients_match(gold_ingredient, current_ingredient, threshold):
+                    matched_gold_indices.add(g_idx)
+                    matched_pred_indices.add(p_idx)
+                    break
+
+    tp = len(matched_gold_indices)
+    return (tp, len(current_ingredients) - len(matched_pred_indices), len(gold_ingredients) - tp)
+
+
+def _reference_ingredients_match(gold_ingredient, current_ingredient, threshold: float) -> bool:
+    if not isinstance(gold_ingredient, dict) or not isinstance(current_ingredient, dict):
+        return False
+    gold_name = (gold_ingredient.get('name') or '').lower()
+    current_name = (current_ingredient.get('name') or '').lower()
+
+    if SequenceMatcher(None, gold_name, current_name).ratio() < threshold:
+        return False
+
+    gold_qty = gold_ingredient.get('quantity')
+    current_qty = current_ingredient.get('quantity')
+    if gold_qty and current_qty and gold_qty != current_qty:
+        return False
+
+    gold_unit = gold_ingredient.get('unit')
+    current_unit = current_ingredient.get('unit')
+    if gold_unit and current_unit and gold_unit != current_unit:
+        return False
+
+    return True
+
+
+def reference_evaluate_cooking_steps(gold_steps: list, current_steps: list, threshold: float) -> tuple:
+    if not gold_steps:
+        return (0, len(current_steps), 0) if current_steps else (0, 0, 0)
+    if not current_steps:
+        return (0, 0, len(gold_steps))
+
+    gold_texts = flatten_step_texts(gold_steps)
+    current_texts = flatten_step_texts(current_steps)
+
+    matched_gold_indices = set()
+    matched_pred_indices = set()
+
+    for g_idx, gold_text in enumerate(gold_texts):
+        for p_idx, pred_text in enumerate(current_texts):
+            if p_idx not in matched_pred_indices:
+                if SequenceMatcher(None, gold_text, pred_text).ratio() > threshold:
+                    matched_gold_indices.add(g_idx)
+                    matched_pred_indices.add(p_idx)
+                    break
+
+    tp = len(matched_gold_indices)
+    return (tp, len(current_texts) - len(matched_pred_indices), len(gold_texts) - tp)
+
+
+def reference_name_match(gold_value, pred_value, threshold: float) -> bool:
+    gold_str = str(gold_value).lower().strip()
+    pred_str = str(pred_value).lower().strip()
+    return SequenceMatcher(None, gold_str, pred_str).ratio() > threshold
+
+
+def _mutate_text(text: str, rng: random.Random) -> str:
+    if not text:
+        return text
+    chars = list(text)
+    for _ in range(rng.randint(1, max(1, len(chars) // 6))):
+        op = rng.random()
+        pos = rng.randrange(len(chars)) if chars else 0
+        if op < 0.4 and chars:
+            del chars[pos]
+        elif op < 0.7:
+            chars.insert(pos, rng.choice("aeinrst "))
+        elif chars:
+            chars[pos] = rng.choice("aeinrstuo")
+    mutated = ''.join(chars)
+    if rng.random() < 0.2:
+        words = mutated.split()
+        rng.shuffle(words)
+        mutated = ' '.join(words)
+    return mutated
+
+
+def _mutate_recipe(gold: dict, other: dict, rng: random.Random) -> dict:
+    """Prediction aus einem Goldstandard: Tippfehler, Umstellungen, Auslassungen, fremde Einträge"""
+    pred = copy.deepcopy(gold)
+
+    ingredients = [i for i in pred.get('ingredients', []) if rng.random() > 0.1]
+    for ingredient in ingredients:
+        if isinstance(ingredient, dict) and ingredient.get('name') and rng.random() < 0.5:
+            ingredient['name'] = _mutate_text(ingredient['name'], rng)
+        if isinstance(ingredient, dict) and rng.random() < 0.1:
+            ingredient['quantity'] = None
+    ingredients += copy.deepcopy(rng.sample(other.get('ingredients', []), min(2, len(other.get('ingredients', [])))))
+    rng.shuffle(ingredients)
+    pred['ingredients'] = ingredients
+
+    steps = []
+    for step in pred.get('cooking_steps', []):
+        if not isinstance(step, dict) or rng.random() < 0.1:
+            continue
+        if step.get('title') and rng.random() < 0.5:
+            step['title'] = _mutate_text(step['title'], rng)
+        step['sub_steps'] = [
+            _mutate_text(sub, rng) if isinstance(sub, str) and rng.random() < 0.6 else sub
+            for sub in step.get('sub_steps', []) or []
+        ]
+        steps.append(step)
+    steps += copy.deepcopy(other.get('cooking_steps', [])[:1])
+    rng.shuffle(steps)
+    pred['cooking_steps'] = steps
+
+    if pred.get('name') and rng.random() < 0.7:
+        pred['name'] = _mutate_text(str(pred['name']), rng)
+    return pred
+
+
+def run_scoring_regression(directory: str = os.path.join("assets", "gold_standards"),
+                           thresholds=REGRESSION_THRESHOLDS, variants: int = 5, seed: int = 42) -> bool:
+    """
+    Vergleicht TP/FP/FN der SimilarityEngine-Pfade im LLMRecipeValidator mit den ursprünglichen
+    verschachtelten SequenceMatcher-Schleifen, für jede Schwelle und jeden Evaluator.
+    Corpus: alle Goldstandards gegen sich selbst, gegen mutierte Varianten und gegen andere Rezepte.
+    """
+    from recipe_validator import LLMRecipeValidator
+
+    golds = []
+    for filename in sorted(os.listdir(directory)):
+        if filename.endswith('.json'):
+            with open(os.path.join(directory, filename), 'r', encoding='utf-8') as f:
+                golds.append(json.load(f))
+
+    rng = random.Random(seed)
+    pairs = []
+    for idx, gold in enumerate(golds):
+        other = golds[(idx + 1) % len(golds)]
+        pairs.append((gold, gold))
+        pairs.append((gold, other))
+        for _ in range(variants):
+            pairs.append((gold, _mutate_recipe(gold, other, rng)))
+
+    mismatches = 0
+    comparisons = 0
+    reference_time = 0.0
+    engine_time = 0.0
+
+    for threshold in thresholds:
+        validator = LLMRecipeValidator()
+        validator.step_similarity_threshold = threshold
+        validator.ingredient_name_similarity_threshold = threshold
+        validator.recipe_name_similarity_threshold = threshold
+
+        for gold, pred in pairs:
+            checks = (
+                ('ingredients',
+                 lambda: reference_evaluate_ingredients(gold.get('ingredients', []), pred.get('ingredients', []), threshold),
+                 lambda: validator._evaluate_ingredients(gold.get('ingredients', []), pred.get('ingredients', []))),
+                ('cooking_steps',
+                 lambda: reference_evaluate_cooking_steps(gold.get('cooking_steps', []), pred.get('cooking_steps', []), threshold),
+                 lambda: validator._evaluate_cooking_steps(gold.get('cooking_steps', []), pred.get('cooking_steps', []))),
+                ('name',
+                 lambda: reference_name_match(gold.get('name'), pred.get('name'), threshold),
+                 lambda: validator._metadata_values_match(gold.get('name'), pred.get('name'), 'name')),
+            )
+            for section, reference, engine in checks:
+                start = time.perf_counter()
+                expected = reference()
+                reference_time += time.perf_counter() - start
+
+                start = time.perf_counter()
+                actual = engine()
+                engine_time += time.perf_counter() - start
+
+                comparisons += 1
+                if expected != actual:
+                    mismatches += 1
+                    print(f"MISMATCH {section} @ {threshold} ({gold.get('name')}): "
+                          f"reference={expected} engine={actual}")
+
+    print(f"Scoring regression: {comparisons} comparisons over {len(pairs)} recipe pairs, "
+          f"thresholds {', '.join(str(t) for t in thresholds)}")
+    print(f"  Mismatches: {mismatches}")
+    print(f"  Reference time: {reference_time:.3f}s | Engine time: {engine_time:.3f}s")
+    return mismatches == 0
@@ -0,0 +1,70 @@
+# Token-Schätzung vor dem LLM-Aufruf (Budget-Prüfung). Eingabe über den tiktoken-Tokenizer des
+# Modells, Ausgabe über den gleitenden Mittelwert der bisher beobachteten Antworten pro Schema.
+import threading
+from typing import Dict, Optional
+
+try:
+    import tiktoken
+except ImportError:  # optional: ohne tiktoken wird über die Zeichenanzahl geschätzt
+    tiktoken = None
+
+# Fallback ohne Tokenizer: ~4 Zeichen pro Token
+CHARS_PER_TOKEN = 4
+# Startwerte für die Ausgabe-Schätzung (Reasoning-Tokens zählen bei gpt-5* als Ausgabe)
+DEFAULT_OUTPUT_TOKENS = 1500
+OUTPUT_SMOOTHING = 0.3
+
+
+class TokenEstimator:
+
+    def __init__(self):
+        self._encodings = {}
+        self._expected_output: Dict[str, float] = {}
+        self._lock = threading.Lock()
+
+    def _encoding(self, model: str):
+        if tiktoken is None:
+            return None
+        with self._lock:
+            if model not in self._encodings:
+                try:
+                    encoding = tiktoken.encoding_for_model(model)
+                except KeyError:
+                    encoding = self._load_encoding("o200k_base")
+                except Exception:
+                    # BPE-Dateien nicht verfügbar (z.B. offline)
+                    encoding = None
+                self._encodings[model] = encoding
+            return self._encodings[model]
+
+    @staticmethod
+    def _load_encoding(name: str):
+        try:
+            return tiktoken.get_encoding(name)
+        except Exception:
+            return None
+
+    def count_tokens(self, text: str, model: str) -> int:
+        encoding = self._encoding(model)
+        if encoding is None:
+            return len(text) // CHARS_PER_TOKEN + 1
+        return len(encoding.encode(text, disallowed_special=()))
+
+    def expected_output_tokens(self, kind: Optional[str]) -> int:
+        with self._lock:
+            return int(self._expected_output.get(kind, DEFAULT_OUTPUT_TOKENS))
+
+    def observe_output(self, kind: Optional[str], output_tokens: int):
+        """Aktualisiert die Ausgabe-Schätzung mit der Usage einer echten Antwort"""
+        if not output_tokens:
+            return
+        with self._lock:
+            previous = self._expected_output.get(kind)
+            self._expected_output[kind] = (
+                output_tokens if previous is None
+                else (1 - OUTPUT_SMOOTHING) * previous + OUTPUT_SMOOTHING * output_tokens
+            )
+
+
+# Global instance
+token_estimator = TokenEstimator()
@@ -0,0 +1,102 @@
+# Benchmark: Allokation und Serialisierung der ValidationErrors pro Iteration,
+# bisheriges pydantic-v1-Modell vs. schlanke Klasse mit __slots__ und CheckpointSerializer
+import pickle
+import time
+import tracemalloc
+
+from langgraph.checkpoint.serde.jsonplus import JsonPlusSerializer
+from pydantic.v1 import BaseModel
+
+from checkpoint_serde import checkpoint_serializer
+from data_moduels.error_severity import ErrorSeverity
+from data_moduels.validation_error import ValidationError
+from recipe_validator import VALIDATION_SECTIONS
+
+
+class _LegacyValidationError(BaseModel):
+    # Stand vor der Umstellung (data_moduels/validation_error.py)
+    class Config:
+        use_enum_values = True
+    type: str
+    message: str
+    severity: ErrorSeverity
+    field_path: str
+    suggested_fix: str = ""
+
+
+def _rows(errors_per_section: int) -> list:
+    return [
+        ("omission", f"{section}: Angabe {i} fehlt im JSON", ErrorSeverity.MAJOR.value, f"{section}[{i}]",
+         f"Angabe {i} aus dem Originaltext übernehmen")
+        for section in VALIDATION_SECTIONS for i in range(errors_per_section)
+    ]
+
+
+def _measure(func, repeats: int) -> tuple:
+    """Mittlere Zeit und allozierte Bytes (tracemalloc-Peak) pro Aufruf"""
+    start = time.perf_counter()
+    for _ in range(repeats):
+        func()
+    elapsed = (time.perf_counter() - start) / repeats
+
+    tracemalloc.start()
+    result = func()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del result
+    return elapsed, peak
+
+
+def _iteration_state(errors: list) -> dict:
+    # Die Kanäle des AgentState, in denen ValidationErrors in Checkpoints landen
+    per_section = len(errors) // len(VALIDATION_SECTIONS)
+    return {
+        "validation_errors": errors,
+        "section_results": {
+            section: {"iteration": 1, "errors": errors[i * per_section:(i + 1) * per_section], "cost": 0.0002}
+            for i, section in enumerate(VALIDATION_SECTIONS)
+        },
+    }
+
+
+def run_validation_error_benchmark(errors_per_section: int = 10, repeats: int = 2000) -> dict:
+    """Gibt pro Variante (legacy / slots) Zeit und Bytes für Erzeugen, dict(), Checkpoint und pickle zurück"""
+    rows = _rows(errors_per_section)
+    fields = ('type', 'message', 'severity', 'field_path', 'suggested_fix')
+    payloads = [dict(zip(fields, row)) for row in rows]
+
+    legacy_errors = [_LegacyValidationError(**payload) for payload in payloads]
+    errors = ValidationError.from_rows(rows)
+    legacy_state = _iteration_state(legacy_errors)
+    state = _iteration_state(errors)
+    legacy_serde = JsonPlusSerializer()
+
+    legacy = {
+        "construct": _measure(lambda: [_LegacyValidationError(**payload) for payload in payloads], repeats),
+        "dict": _measure(lambda: [error.dict() for error in legacy_errors], repeats),
+        "checkpoint": _measure(lambda: legacy_serde.dumps_typed(legacy_state), repeats),
+    }
+    slots = {
+        "construct": _measure(lambda: [ValidationError(**payload) for payload in payloads], repeats),
+        "construct_bulk": _measure(lambda: ValidationError.from_rows(rows), repeats),
+        "dict": _measure(lambda: ValidationError.dicts(errors), repeats),
+        "checkpoint": _measure(lambda: checkpoint_serializer.dumps_typed(state), repeats),
+    }
+    sizes = {
+        "legacy": {"checkpoint": len(legacy_serde.dumps_typed(legacy_state)[1]),
+                   "pickle": len(pickle.dumps(legacy_errors))},
+        "slots": {"checkpoint": len(checkpoint_serializer.dumps_typed(state)[1]),
+                  "pickle": len(pickle.dumps(errors))},
+    }
+
+    print(f"ValidationError benchmark: {len(rows)} errors per iteration, {repeats} repeats")
+    print(f"{'Step':<24}{'legacy':>12}{'':>12}{'slots':>12}{'':>12}")
+    for step in ("construct", "construct_bulk", "dict", "checkpoint"):
+        # Das pydantic-Modell hat keinen Bulk-Pfad
+        legacy_cells = (f"{legacy[step][0] * 1e6:>10.1f}us{legacy[step][1] / 1024:>10.1f}KB" if step in legacy
+                        else f"{'n/a':>12}{'n/a':>12}")
+        slots_time, slots_bytes = slots[step]
+        print(f"{step:<24}{legacy_cells}{slots_time * 1e6:>10.1f}us{slots_bytes / 1024:>10.1f}KB")
+    for kind in ("checkpoint", "pickle"):
+        print(f"{kind + ' size':<24}{sizes['legacy'][kind]:>12}{'':>12}{sizes['slots'][kind]:>12}")
+    return {"legacy": legacy, "slots": slots, "sizes": sizes}
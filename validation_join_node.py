@@ -0,0 +1,101 @@
+from langchain_core.runnables import RunnableConfig
+
+from convergence_policy import convergence_policy
+from data_moduels.agent_state import AgentState
+from data_moduels.validator_strategy import ValidatorStrategy
+from recipe_validator import VALIDATION_SECTIONS, COMBINED_SECTION
+from shared_session_collector import get_session_collector
+from validation_section_node import strategy_sections
+
+def validation_join_node(state: AgentState, config: RunnableConfig = None) -> dict:
+    """Führt die Ergebnisse der Validation-Branches zusammen (Fan-in)"""
+    session_collector = get_session_collector(config)
+
+    # Nur Ergebnisse der aktuellen Iteration zählen
+    section_results = []
+    for section in VALIDATION_SECTIONS + (COMBINED_SECTION,):
+        result = (state.get("section_results") or {}).get(section)
+        if result and result["iteration"] == state["iteration_count"]:
+            section_results.append(result)
+
+    if not section_results:
+        # Kein JSON zum Validieren (z.B. Parse-Fehler im Transformer)
+        return {}
+
+    errors = []
+    total_cost = 0
+    total_input_tokens = 0
+    total_output_tokens = 0
+    error_messages = ''
+    validation_calls = 0
+    skipped_calls = 0
+    saved_tokens = 0
+    prevalidated = 0
+
+    for result in section_results:
+        errors.extend(result["errors"])
+        total_cost += result["cost"]
+        total_input_tokens += result["input_tokens"]
+        total_output_tokens += result["output_tokens"]
+
+        if result.get("pre_validated"):
+            # Lokaler Vorab-Check ohne Befund (auch übernommen): kein LLM-Aufruf, also keiner eingespart
+            prevalidated += 1
+        elif result.get("reused"):
+            # Übernommene Abschnitte: eingesparter Aufruf mit den Tokens des letzten echten Aufrufs
+            skipped_calls += 1
+            saved_tokens += result.get("call_input_tokens", 0) + result.get("call_output_tokens", 0)
+        elif not result.get("budget_exhausted"):
+            validation_calls += 1
+
+    for error in errors:
+        error_messages += "error_type: " + error.type + "; field_path: " + error.field_path + "; error_message: " + error.message + ""
+
+    # Log to session collector mit allen Metriken
+    session_collector.end_validation_node(
+        quality_metrics=state.get("quality_metrics") or {},
+        cost=total_cost,
+        input_tokens=total_input_tokens,
+        output_tokens=total_output_tokens,
+        errors=error_messages,
+        validation_calls=validation_calls,
+        validator_strategy=_get_strategy(state).value,
+        json_output=state.get("current_json_output"),
+        skipped_calls=skipped_calls,
+        saved_tokens=saved_tokens,
+        prevalidated_sections=prevalidated
+    )
+
+    result = {
+        "validation_errors": errors,
+        "iteration_history": convergence_policy.record(state, errors=errors)
+    }
+
+    # Mindestens ein Abschnitt wurde wegen des Budgets nicht geprüft -> Finalizer
+    if any(result.get("budget_exhausted") for result in section_results):
+        result["budget_exhausted"] = True
+
+    return result
+
+
+def validation_fanout(state: AgentState) -> list:
+    """Startet die drei Abschnittsprüfungen parallel (oder den kombinierten Einzelaufruf)"""
+    if not state.get("current_json_output"):
+        return ["validation_join"]
+
+    # Abschnitte, die für diese Iteration schon ein Ergebnis haben (übernommen oder beim
+    # Streamen vorgezogen), überspringen
+    section_results = state.get("section_results") or {}
+    pending = [
+        section for section in strategy_sections(state)
+        if section_results.get(section, {}).get("iteration") != state["iteration_count"]
+    ]
+
+    if not pending:
+        return ["validation_join"]
+
+    return [f"validate_{section}" for section in pending]
+
+
+def _get_strategy(state: AgentState) -> ValidatorStrategy:
+    return state.get("validator_strategy") or ValidatorStrategy.SECTIONED
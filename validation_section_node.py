@@ -0,0 +1,339 @@
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional
+
+from langchain_core.runnables import RunnableConfig, RunnableLambda
+from langgraph.types import RetryPolicy
+
+from budget import BudgetExceededError
+from data_moduels.agent_state import AgentState
+from data_moduels.validator_strategy import ValidatorStrategy
+from input_store import state_raw_text
+from recipe_validator import (LLMRecipeValidator, TRANSIENT_LLM_ERRORS, VALIDATION_SECTIONS, COMBINED_SECTION,
+                              LLM_FAILURE_ERROR_TYPE, SECTION_INPUT_FIELDS, section_fingerprint)
+from rule_based_validator import PRE_VALIDATION_SECTIONS, merge_rule_errors, rule_based_validator
+from shared_session_collector import get_session_collector
+
+# Nur der fehlgeschlagene Abschnitt wird wiederholt; die Writes der anderen
+# Branches desselben Super-Steps sind bereits im Checkpointer gespeichert.
+VALIDATION_RETRY_POLICY = RetryPolicy(max_attempts=3, retry_on=TRANSIENT_LLM_ERRORS)
+
+
+def make_validation_section_node(section: str) -> RunnableLambda:
+    """Erzeugt den Branch-Node für einen Validierungsabschnitt (sync + async)"""
+
+    def validation_section_node(state: AgentState, config: RunnableConfig = None) -> dict:
+        print(f"Validating {section} with LLM")
+        validator = LLMRecipeValidator(raise_transient_errors=True,
+                                        session_collector=get_session_collector(config))
+        try:
+            result = validator.validate_section(section, state["current_json_output"], state_raw_text(state))
+        except BudgetExceededError as e:
+            print(f"Skipping validation of {section}: {e}")
+            return _budget_exhausted_update(state, section)
+        return _section_update(state, section, result, _rule_errors(state, section))
+
+    async def avalidation_section_node(state: AgentState, config: RunnableConfig = None) -> dict:
+        print(f"Validating {section} with LLM (async)")
+        validator = LLMRecipeValidator(raise_transient_errors=True,
+                                        session_collector=get_session_collector(config))
+        try:
+            result = await validator.avalidate_section(section, state["current_json_output"], state_raw_text(state))
+        except BudgetExceededError as e:
+            print(f"Skipping validation of {section}: {e}")
+            return _budget_exhausted_update(state, section)
+        return _section_update(state, section, result, _rule_errors(state, section))
+
+    return RunnableLambda(validation_section_node, afunc=avalidation_section_node, name=f"validate_{section}")
+
+
+def _rule_errors(state: AgentState, section: str) -> list:
+    return list((state.get("pre_validation_errors") or {}).get(section) or [])
+
+
+def _section_update(state: AgentState, section: str, result: tuple, rule_errors: list = None) -> dict:
+    errors, cost, input_tokens, output_tokens = result
+    # Fehlgeschlagene LLM-Prüfung: nicht übernehmen, in der nächsten Iteration erneut prüfen
+    llm_failed = any(error.type == LLM_FAILURE_ERROR_TYPE for error in errors)
+    if rule_errors:
+        errors = merge_rule_errors(errors, rule_errors)
+
+    # Partielles Update: parallele Branches dürfen nur ihren eigenen Key schreiben
+    return {
+        "section_results": {
+            section: {
+                "iteration": state["iteration_count"],
+                "errors": errors,
+                "cost": cost,
+                "input_tokens": input_tokens,
+                "output_tokens": output_tokens,
+                # Für die inkrementelle Re-Validierung: Eingabe und Kosten des letzten echten Aufrufs
+                "input_hash": None if llm_failed else input_fingerprint(state, section, state["current_json_output"]),
+                "reused": False,
+                "call_input_tokens": input_tokens,
+                "call_output_tokens": output_tokens
+            }
+        }
+    }
+
+
+def _budget_exhausted_update(state: AgentState, section: str) -> dict:
+    # Budget erschöpft: Abschnitt ungeprüft, validation_join leitet zum Finalizer
+    return {
+        "section_results": {
+            section: {
+                "iteration": state["iteration_count"],
+                "errors": [],
+                "cost": 0,
+                "input_tokens": 0,
+                "output_tokens": 0,
+                "input_hash": None,
+                "reused": False,
+                "budget_exhausted": True,
+                "call_input_tokens": 0,
+                "call_output_tokens": 0
+            }
+        }
+    }
+
+
+def _prevalidated_result(state: AgentState, section: str, json_output: dict) -> dict:
+    # Lokaler Check ohne Befund: kein LLM-Aufruf für diesen Abschnitt
+    return {
+        "iteration": state["iteration_count"],
+        "errors": [],
+        "cost": 0,
+        "input_tokens": 0,
+        "output_tokens": 0,
+        "input_hash": input_fingerprint(state, section, json_output),
+        "reused": False,
+        "pre_validated": True,
+        "call_input_tokens": 0,
+        "call_output_tokens": 0
+    }
+
+
+def input_fingerprint(state: AgentState, section: str, json_output: dict) -> str:
+    # Mit Vorab-Check hängt das Ergebnis auch von dessen Eingaben ab (cooking_steps: ingredients)
+    return section_fingerprint(section, json_output, pre_validation=pre_validation_enabled(state))
+
+
+def pre_validation_enabled(state: AgentState) -> bool:
+    # Beim kombinierten Aufruf lässt sich ein einzelner Abschnitt nicht einsparen
+    return bool(state.get("pre_validate")) and COMBINED_SECTION not in strategy_sections(state)
+
+
+def pre_validate_sections(state: AgentState, skip: tuple = ()) -> tuple:
+    """
+    Lokaler Vorab-Check (RuleBasedRecipeValidator) für ingredients und cooking_steps.
+    Gibt (section_results ohne Befund, Befunde pro Abschnitt) zurück; Abschnitte ohne Befund
+    werden nicht per LLM geprüft, die Befunde der übrigen fließen in deren Branch-Ergebnis ein.
+    """
+    if not pre_validation_enabled(state):
+        return {}, {}
+
+    clean = {}
+    findings = {}
+    for section in PRE_VALIDATION_SECTIONS:
+        if section in skip:
+            continue
+        errors = rule_based_validator.validate_section(section, state["current_json_output"], state_raw_text(state))
+        if errors:
+            findings[section] = errors
+        else:
+            clean[section] = _prevalidated_result(state, section, state["current_json_output"])
+
+    return clean, findings
+
+
+def strategy_sections(state: AgentState) -> tuple:
+    """Abschnitte, die mit der gewählten ValidatorStrategy geprüft werden"""
+    if (state.get("validator_strategy") or ValidatorStrategy.SECTIONED) == ValidatorStrategy.COMBINED:
+        return (COMBINED_SECTION,)
+    return VALIDATION_SECTIONS
+
+
+def reuse_unchanged_sections(state: AgentState) -> dict:
+    """
+    Übernimmt die ValidationErrors von Abschnitten, deren Eingabe sich seit der letzten Prüfung
+    nicht geändert hat, in die aktuelle Iteration (ohne LLM-Aufruf, Kosten 0).
+    Für diese Abschnitte startet validation_fanout keinen Branch.
+    """
+    previous_results = state.get("section_results") or {}
+    reused = {}
+
+    for section in strategy_sections(state):
+        previous = previous_results.get(section)
+        if not previous or previous.get("input_hash") is None:
+            continue
+        if previous["iteration"] == state["iteration_count"]:
+            # Bereits für diese Iteration geprüft (vorgezogen beim Streamen)
+            continue
+        if previous["input_hash"] != input_fingerprint(state, section, state["current_json_output"]):
+            continue
+
+        reused[section] = {
+            **previous,
+            "iteration": state["iteration_count"],
+            "cost": 0,
+            "input_tokens": 0,
+            "output_tokens": 0,
+            "reused": True
+        }
+
+    return reused
+
+
+class EarlySectionValidation:
+    """
+    Vorgezogene Abschnittsprüfung beim Streamen des Transformers (nur AUTOMATIC, SECTIONED).
+
+    Sobald ein Top-Level-Feld (ingredients, cooking_steps) vollständig generiert ist, startet die
+    Prüfung seines Abschnitts, während der Rest des JSONs noch gestreamt wird. Die Ergebnisse
+    werden mit der neuen Iteration in section_results geschrieben; validation_fanout startet für
+    diese Abschnitte keinen Branch mehr. Schlägt eine vorgezogene Prüfung fehl, läuft der
+    Abschnitt regulär (mit RetryPolicy) im Graph.
+    """
+
+    def __init__(self, state: AgentState, config: RunnableConfig = None):
+        self.state = state
+        self.session_collector = get_session_collector(config)
+        self._fields = {}
+        if state["validation_mode"].value == "automatic":
+            self._fields = {
+                SECTION_INPUT_FIELDS[section]: section for section in strategy_sections(state)
+                if SECTION_INPUT_FIELDS.get(section)
+            }
+        self._pending = {}        # section -> (bis dahin gestreamte Felder, future/task, start)
+        self._finished = {}       # section -> Endzeit der Prüfung
+        self._executor = None
+        # Lokaler Vorab-Check: bisher gestreamte Felder, Abschnitte ohne Befund, Befunde
+        self._seen = {}
+        self._prevalidated = {}
+        self._findings = {}
+
+    def _section_for(self, key: str, value) -> Optional[str]:
+        self._seen[key] = value
+        section = self._fields.get(key)
+        if section is None or section in self._pending or section in self._prevalidated:
+            return None
+
+        # Unveränderte Abschnitte übernimmt reuse_unchanged_sections ohne LLM-Aufruf
+        previous = (self.state.get("section_results") or {}).get(section) or {}
+        if previous.get("input_hash") == input_fingerprint(self.state, section, self._seen):
+            return None
+
+        if pre_validation_enabled(self.state) and section in PRE_VALIDATION_SECTIONS:
+            errors = rule_based_validator.validate_section(section, dict(self._seen), state_raw_text(self.state))
+            if not errors:
+                print(f"Pre-validation of {section} found nothing - skipping LLM")
+                self._prevalidated[section] = dict(self._seen)
+                return None
+            self._findings[section] = errors
+        return section
+
+    def _validator(self) -> LLMRecipeValidator:
+        return LLMRecipeValidator(raise_transient_errors=True, session_collector=self.session_collector)
+
+    def on_field(self, key: str, value):
+        """Callback für stream_structured_invoke"""
+        section = self._section_for(key, value)
+        if section is None:
+            return
+
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=len(self._fields))
+        partial = {key: value}
+        print(f"Validating {section} early (streamed)")
+        future = self._executor.submit(self._timed, section, self._validator().validate_section,
+                                       section, partial, state_raw_text(self.state))
+        self._pending[section] = (dict(self._seen), future, time.time())
+
+    def aon_field(self, key: str, value):
+        """Callback für astream_structured_invoke (läuft im Event-Loop)"""
+        section = self._section_for(key, value)
+        if section is None:
+            return
+
+        partial = {key: value}
+        print(f"Validating {section} early (streamed, async)")
+        task = asyncio.get_running_loop().create_task(self._atimed(section, partial))
+        self._pending[section] = (dict(self._seen), task, time.time())
+
+    def _timed(self, section: str, validate, *args):
+        try:
+            return validate(*args)
+        finally:
+            self._finished[section] = time.time()
+
+    async def _atimed(self, section: str, partial: dict):
+        try:
+            return await self._validator().avalidate_section(section, partial, state_raw_text(self.state))
+        finally:
+            self._finished[section] = time.time()
+
+    def collect(self, update: dict) -> dict:
+        """
+        Wartet auf die vorgezogenen Prüfungen und gibt die section_results der neuen Iteration zurück.
+        update ist das (partielle) Update des Transformers.
+        """
+        stream_end = time.time()
+        # Fingerprints und Ergebnisse wie im Graph über den vollständigen State (pre_validate usw.)
+        new_state = {**self.state, **update}
+        results = self._prevalidated_results(new_state)
+        try:
+            for section, (seen, future, start) in self._pending.items():
+                try:
+                    result = future.result()
+                except TRANSIENT_LLM_ERRORS + (BudgetExceededError,) as e:
+                    print(f"Early validation of {section} failed ({e}) - validating in graph")
+                    continue
+                self._add_result(results, new_state, section, seen, result, start, stream_end)
+        finally:
+            self.close()
+        return results
+
+    async def acollect(self, update: dict) -> dict:
+        stream_end = time.time()
+        new_state = {**self.state, **update}
+        results = self._prevalidated_results(new_state)
+        try:
+            for section, (seen, task, start) in self._pending.items():
+                try:
+                    result = await task
+                except TRANSIENT_LLM_ERRORS + (BudgetExceededError,) as e:
+                    print(f"Early validation of {section} failed ({e}) - validating in graph")
+                    continue
+                self._add_result(results, new_state, section, seen, result, start, stream_end)
+        finally:
+            self.close()
+        return results
+
+    def _prevalidated_results(self, new_state: AgentState) -> dict:
+        final_output = new_state["current_json_output"]
+        return {
+            section: _prevalidated_result(new_state, section, final_output)
+            for section, seen in self._prevalidated.items()
+            if input_fingerprint(new_state, section, seen) == input_fingerprint(new_state, section, final_output)
+        }
+
+    def _add_result(self, results: dict, new_state: AgentState, section: str, seen: dict,
+                    result: tuple, start: float, stream_end: float):
+        # Nur übernehmen, wenn das fertige JSON genau die geprüfte Eingabe enthält
+        final_output = new_state["current_json_output"]
+        if input_fingerprint(new_state, section, seen) != input_fingerprint(new_state, section, final_output):
+            return
+
+        overlap = max(0.0, min(self._finished.get(section, stream_end), stream_end) - start)
+        self.session_collector.record_early_validation(overlap)
+        results.update(_section_update(new_state, section, result, self._findings.get(section))["section_results"])
+
+    def close(self):
+        """Bricht offene Prüfungen ab (z.B. nach einem Parse-Fehler des Transformers)"""
+        for _, pending, _ in self._pending.values():
+            if not pending.done():
+                pending.cancel()
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None